@@ -12,7 +12,8 @@ from alembic.config import Config
 config = context.config  # type: ignore[assignment]
 
 if config.config_file_name is not None:
-    fileConfig(config.config_file_name)
+    # Keep app loggers (compass.*) working when migrations run in-process.
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
 
 target_metadata = Base.metadata
 
@@ -0,0 +1,42 @@
+"""Add avatar thumbnails and content-hash dedup of avatar blobs.
+
+Revision ID: 0005_avatar_thumbnails
+Revises: 0004_safety_features
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = "0005_avatar_thumbnails"
+down_revision: Union[str, None] = "0004_safety_features"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # --- Avatar blobs, keyed by SHA-256 of the uploaded bytes ---
+    op.create_table(
+        "avatar_blobs",
+        sa.Column("content_hash", sa.Text(), primary_key=True),
+        sa.Column("url", sa.Text(), nullable=False),
+        sa.Column("thumbnails", postgresql.JSONB(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+    )
+
+    # --- Users: denormalized thumbnail URLs for friends-list reads ---
+    op.add_column("users", sa.Column("profile_picture_thumbnails", postgresql.JSONB(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("users", "profile_picture_thumbnails")
+    op.drop_table("avatar_blobs")
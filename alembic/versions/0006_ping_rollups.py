@@ -0,0 +1,60 @@
+"""Add hourly ping rollups and a high-water mark table for incremental jobs.
+
+Revision ID: 0006_ping_rollups
+Revises: 0005_avatar_thumbnails
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0006_ping_rollups"
+down_revision: Union[str, None] = "0005_avatar_thumbnails"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # --- Per fob, per UTC hour ping aggregates ---
+    op.create_table(
+        "ping_rollups",
+        sa.Column(
+            "fob_uid",
+            sa.Text(),
+            sa.ForeignKey("fobs.fob_uid", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("hour", sa.DateTime(timezone=True), primary_key=True),
+        sa.Column("ping_count", sa.Integer(), nullable=False),
+        sa.Column("first_received_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_received_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("min_lat", sa.Float(precision=53), nullable=False),
+        sa.Column("max_lat", sa.Float(precision=53), nullable=False),
+        sa.Column("min_lng", sa.Float(precision=53), nullable=False),
+        sa.Column("max_lng", sa.Float(precision=53), nullable=False),
+        # Sums rather than a centroid so batches can be merged incrementally
+        sa.Column("sum_lat", sa.Float(precision=53), nullable=False),
+        sa.Column("sum_lng", sa.Float(precision=53), nullable=False),
+        sa.Column("max_status", sa.Integer(), nullable=False),
+    )
+
+    # --- High-water marks for incremental background jobs ---
+    op.create_table(
+        "job_watermarks",
+        sa.Column("name", sa.Text(), primary_key=True),
+        sa.Column("high_water_id", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("job_watermarks")
+    op.drop_table("ping_rollups")
@@ -0,0 +1,36 @@
+"""Add a grid cell column to incidents for nearby queries.
+
+Revision ID: 0007_incident_cells
+Revises: 0006_ping_rollups
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0007_incident_cells"
+down_revision: Union[str, None] = "0006_ping_rollups"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 0.01 degree grid: row * 36000 + col (see app.geo.cell_id)
+    op.add_column("incidents", sa.Column("cell", sa.BigInteger(), nullable=True))
+    op.execute(
+        """
+        UPDATE incidents SET cell =
+            LEAST(floor((lat + 90) / 0.01), 17999)::bigint * 36000
+            + LEAST(floor((lng + 180) / 0.01), 35999)::bigint
+        """
+    )
+    op.alter_column("incidents", "cell", nullable=False)
+    op.create_index("ix_incidents_cell_created_at", "incidents", ["cell", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_incidents_cell_created_at", table_name="incidents")
+    op.drop_column("incidents", "cell")
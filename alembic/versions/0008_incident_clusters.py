@@ -0,0 +1,69 @@
+"""Cluster incident reports: incident_clusters table and incidents.cluster_id.
+
+Revision ID: 0008_incident_clusters
+Revises: 0007_incident_cells
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = "0008_incident_clusters"
+down_revision: Union[str, None] = "0007_incident_cells"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "incident_clusters",
+        sa.Column(
+            "id",
+            postgresql.UUID(as_uuid=False),
+            primary_key=True,
+            server_default=sa.text("gen_random_uuid()"),
+        ),
+        # Centroid of the attached reports, and its grid cell
+        sa.Column("lat", sa.Float(precision=53), nullable=False),
+        sa.Column("lng", sa.Float(precision=53), nullable=False),
+        sa.Column("cell", sa.BigInteger(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=False),
+        sa.Column("report_count", sa.Integer(), nullable=False, server_default=sa.text("1")),
+        sa.Column("first_reported_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_reported_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(
+        "ix_incident_clusters_cell_last_reported_at", "incident_clusters", ["cell", "last_reported_at"]
+    )
+
+    op.add_column(
+        "incidents",
+        sa.Column(
+            "cluster_id",
+            postgresql.UUID(as_uuid=False),
+            sa.ForeignKey("incident_clusters.id", ondelete="SET NULL"),
+            nullable=True,
+        ),
+    )
+    op.create_index("ix_incidents_cluster_id", "incidents", ["cluster_id"])
+
+    # Existing reports become single-report clusters (no retroactive merging).
+    op.execute(
+        """
+        INSERT INTO incident_clusters
+            (id, lat, lng, cell, description, report_count, first_reported_at, last_reported_at)
+        SELECT id, lat, lng, cell, description, 1, created_at, created_at FROM incidents
+        """
+    )
+    op.execute("UPDATE incidents SET cluster_id = id")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_incidents_cluster_id", table_name="incidents")
+    op.drop_column("incidents", "cluster_id")
+    op.drop_index("ix_incident_clusters_cell_last_reported_at", table_name="incident_clusters")
+    op.drop_table("incident_clusters")
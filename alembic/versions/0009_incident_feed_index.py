@@ -0,0 +1,30 @@
+"""Index the incident feed sort key.
+
+Revision ID: 0009_incident_feed_index
+Revises: 0008_incident_clusters
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0009_incident_feed_index"
+down_revision: Union[str, None] = "0008_incident_clusters"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keyset pagination of GET /incidents: ORDER BY first_reported_at DESC, id DESC
+    op.create_index(
+        "ix_incident_clusters_first_reported_at_desc",
+        "incident_clusters",
+        [sa.text("first_reported_at DESC"), sa.text("id DESC")],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_incident_clusters_first_reported_at_desc", table_name="incident_clusters")
@@ -0,0 +1,92 @@
+"""Geofences (safe zones), their enter/exit events and users.geofences_version.
+
+Revision ID: 0010_geofences
+Revises: 0009_incident_feed_index
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = "0010_geofences"
+down_revision: Union[str, None] = "0009_incident_feed_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "geofences",
+        sa.Column(
+            "id",
+            postgresql.UUID(as_uuid=False),
+            primary_key=True,
+            server_default=sa.text("gen_random_uuid()"),
+        ),
+        sa.Column(
+            "user_id",
+            postgresql.UUID(as_uuid=False),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("name", sa.Text(), nullable=False),
+        # Polygon as [[lat, lng], ...], implicitly closed
+        sa.Column("vertices", postgresql.JSONB(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+    )
+    op.create_index("ix_geofences_user_id", "geofences", ["user_id"])
+
+    op.create_table(
+        "geofence_events",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column(
+            "geofence_id",
+            postgresql.UUID(as_uuid=False),
+            sa.ForeignKey("geofences.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        # The fob's owner (who the zone belongs to) when the event happened
+        sa.Column(
+            "user_id",
+            postgresql.UUID(as_uuid=False),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("fob_uid", sa.Text(), nullable=False),
+        sa.Column("kind", sa.Text(), nullable=False),
+        sa.Column("lat", sa.Float(precision=53), nullable=False),
+        sa.Column("lng", sa.Float(precision=53), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.CheckConstraint("kind IN ('enter', 'exit')", name="geofence_event_kind"),
+    )
+    op.create_index(
+        "ix_geofence_events_user_id_created_at",
+        "geofence_events",
+        ["user_id", sa.text("created_at DESC")],
+    )
+    # Restores a fob's zone state (latest event per zone) after a restart.
+    op.create_index(
+        "ix_geofence_events_fob_uid_geofence_id_created_at",
+        "geofence_events",
+        ["fob_uid", "geofence_id", sa.text("created_at DESC")],
+    )
+
+    # Bumped on every zone change so ingest (which reads it with the fob) can
+    # tell when its cached zone index is stale; 0 means the user never had zones.
+    op.add_column(
+        "users",
+        sa.Column("geofences_version", sa.Integer(), nullable=False, server_default=sa.text("0")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "geofences_version")
+    op.drop_index("ix_geofence_events_fob_uid_geofence_id_created_at", table_name="geofence_events")
+    op.drop_index("ix_geofence_events_user_id_created_at", table_name="geofence_events")
+    op.drop_table("geofence_events")
+    op.drop_index("ix_geofences_user_id", table_name="geofences")
+    op.drop_table("geofences")
@@ -0,0 +1,55 @@
+"""SOS alerts fanned out to nearby friends.
+
+Revision ID: 0011_sos_alerts
+Revises: 0010_geofences
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = "0011_sos_alerts"
+down_revision: Union[str, None] = "0010_geofences"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sos_alerts",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        # The user in distress and the friend being alerted
+        sa.Column(
+            "user_id",
+            postgresql.UUID(as_uuid=False),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column(
+            "recipient_id",
+            postgresql.UUID(as_uuid=False),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("fob_uid", sa.Text(), nullable=False),
+        sa.Column("lat", sa.Float(precision=53), nullable=False),
+        sa.Column("lng", sa.Float(precision=53), nullable=False),
+        sa.Column("distance_m", sa.Float(precision=53), nullable=False),
+        # 1 = nearest of the friends alerted by this SOS
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+    )
+    op.create_index(
+        "ix_sos_alerts_recipient_id_created_at",
+        "sos_alerts",
+        ["recipient_id", sa.text("created_at DESC")],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_sos_alerts_recipient_id_created_at", table_name="sos_alerts")
+    op.drop_table("sos_alerts")
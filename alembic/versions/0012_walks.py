@@ -0,0 +1,65 @@
+"""SafeWalk sessions.
+
+Revision ID: 0012_walks
+Revises: 0011_sos_alerts
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = "0012_walks"
+down_revision: Union[str, None] = "0011_sos_alerts"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "walks",
+        sa.Column(
+            "id",
+            postgresql.UUID(as_uuid=False),
+            primary_key=True,
+            server_default=sa.text("gen_random_uuid()"),
+        ),
+        sa.Column(
+            "user_id",
+            postgresql.UUID(as_uuid=False),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("destination", sa.Text(), nullable=True),
+        sa.Column("dest_lat", sa.Float(precision=53), nullable=False),
+        sa.Column("dest_lng", sa.Float(precision=53), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.Column("expected_arrival_at", sa.DateTime(timezone=True), nullable=False),
+        # Check-ins are optional; when set, a missed one is counted every interval
+        sa.Column("checkin_interval_seconds", sa.Integer(), nullable=True),
+        sa.Column("checkin_due_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_checkin_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("missed_checkins", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("overdue_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("ended_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("end_reason", sa.Text(), nullable=True),
+        sa.CheckConstraint("end_reason IN ('arrived', 'cancelled')", name="walk_end_reason"),
+    )
+    # One active walk per user; also serves the scheduler's reload of active walks.
+    op.create_index(
+        "ux_walks_user_id_active",
+        "walks",
+        ["user_id"],
+        unique=True,
+        postgresql_where=sa.text("ended_at IS NULL"),
+    )
+    op.create_index("ix_walks_user_id_started_at", "walks", ["user_id", sa.text("started_at DESC")])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_walks_user_id_started_at", table_name="walks")
+    op.drop_index("ux_walks_user_id_active", table_name="walks")
+    op.drop_table("walks")
@@ -0,0 +1,75 @@
+"""Per-fob last-seen state and signal lost/restored events.
+
+Revision ID: 0013_fob_signal
+Revises: 0012_walks
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = "0013_fob_signal"
+down_revision: Union[str, None] = "0012_walks"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # --- Last ping per fob, maintained incrementally from pings ---
+    op.create_table(
+        "fob_signal",
+        sa.Column(
+            "fob_uid",
+            sa.Text(),
+            sa.ForeignKey("fobs.fob_uid", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("last_seen_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("lat", sa.Float(precision=53), nullable=False),
+        sa.Column("lng", sa.Float(precision=53), nullable=False),
+        # Set when the fob went quiet, cleared by its next ping
+        sa.Column("signal_lost_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    # Only fobs that still have a signal, oldest first: the detector reads just
+    # the ones that went quiet since its last run.
+    op.create_index(
+        "ix_fob_signal_last_seen_at_live",
+        "fob_signal",
+        ["last_seen_at"],
+        postgresql_where=sa.text("signal_lost_at IS NULL"),
+    )
+
+    op.create_table(
+        "fob_signal_events",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column("fob_uid", sa.Text(), nullable=False),
+        # The fob's owner when the event happened
+        sa.Column(
+            "user_id",
+            postgresql.UUID(as_uuid=False),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("kind", sa.Text(), nullable=False),
+        sa.Column("last_seen_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("lat", sa.Float(precision=53), nullable=False),
+        sa.Column("lng", sa.Float(precision=53), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.CheckConstraint("kind IN ('lost', 'restored')", name="fob_signal_event_kind"),
+    )
+    op.create_index(
+        "ix_fob_signal_events_user_id_created_at",
+        "fob_signal_events",
+        ["user_id", sa.text("created_at DESC")],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_fob_signal_events_user_id_created_at", table_name="fob_signal_events")
+    op.drop_table("fob_signal_events")
+    op.drop_index("ix_fob_signal_last_seen_at_live", table_name="fob_signal")
+    op.drop_table("fob_signal")
@@ -0,0 +1,41 @@
+"""Tower registry with per-tower ingest keys, and the tower on each ping.
+
+Revision ID: 0014_tower_keys
+Revises: 0013_fob_signal
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0014_tower_keys"
+down_revision: Union[str, None] = "0013_fob_signal"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 0002 dropped the original towers table; towers come back with their own keys.
+    op.create_table(
+        "towers",
+        sa.Column("id", sa.Text(), primary_key=True),
+        sa.Column("name", sa.Text(), nullable=True),
+        sa.Column("lat", sa.Float(precision=53), nullable=False),
+        sa.Column("lng", sa.Float(precision=53), nullable=False),
+        # Inactive towers are rejected (revocation)
+        sa.Column("active", sa.Boolean(), nullable=False, server_default=sa.text("true")),
+        # SHA-256 hex of the tower's key; the key itself is never stored
+        sa.Column("key_hash", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+    )
+    # NULL for pings sent with the shared key. No foreign key: checking it would
+    # lock the tower row on every ping.
+    op.add_column("pings", sa.Column("tower_id", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("pings", "tower_id")
+    op.drop_table("towers")
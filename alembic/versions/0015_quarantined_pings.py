@@ -0,0 +1,45 @@
+"""Pings quarantined as impossible movement.
+
+Revision ID: 0015_quarantined_pings
+Revises: 0014_tower_keys
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0015_quarantined_pings"
+down_revision: Union[str, None] = "0014_tower_keys"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Kept out of pings so maps, SOS fan-out and rollups never see them; the
+    # replay tool reads both tables to reconstruct what towers sent.
+    op.create_table(
+        "quarantined_pings",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column("fob_uid", sa.Text(), nullable=False),
+        sa.Column("lat", sa.Float(precision=53), nullable=False),
+        sa.Column("lng", sa.Float(precision=53), nullable=False),
+        sa.Column("status", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("received_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.Column("tower_id", sa.Text(), nullable=True),
+        # Distance from, and time since, the fob's last accepted ping
+        sa.Column("distance_m", sa.Float(precision=53), nullable=False),
+        sa.Column("elapsed_seconds", sa.Float(precision=53), nullable=False),
+    )
+    op.create_index(
+        "ix_quarantined_pings_fob_uid_received_at",
+        "quarantined_pings",
+        ["fob_uid", "received_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_quarantined_pings_fob_uid_received_at", table_name="quarantined_pings")
+    op.drop_table("quarantined_pings")
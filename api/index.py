@@ -1,11 +1,68 @@
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+import sys
+from contextlib import asynccontextmanager
 
-from app.routes import auth, friends, fob, map as map_routes, tower_ingest, incidents
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.routes import auth, friends, fob, map as map_routes, tower_ingest, incidents, geofences, alerts, walks
+from app.db import pool_stats
 from app.deps import error_response
+from app.fob_signal import run_signal_check
+from app.jobs import PeriodicJob
+from app.loop_monitor import LoopLagMonitor
+from app.metrics import MetricsMiddleware, render as render_metrics
+from app.request_id import RequestIDMiddleware
+from app import slow_queries  # noqa: F401  (registers the SQL comment/slow-query listeners)
+from app.rollups import run_rollups
+from app.settings import get_settings, install_reload_signal_handler
+from app.towers import TowerKeyListener
+from app.walks import WalkScheduler
+
+
+def background_jobs() -> list[PeriodicJob]:
+    """Periodic jobs enabled by their ``*_INTERVAL_SECONDS`` settings."""
+    settings = get_settings()
+    jobs = [
+        PeriodicJob("ping_rollups", settings.ROLLUP_INTERVAL_SECONDS, run_rollups),
+        PeriodicJob("fob_signal", settings.SIGNAL_CHECK_INTERVAL_SECONDS, run_signal_check),
+    ]
+    return [job for job in jobs if job.interval > 0]
 
 
-app = FastAPI(title="Compass SafeWalks API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # `kill -HUP <pid>` re-reads env-driven settings without a restart.
+    install_reload_signal_handler()
+    threshold_ms = get_settings().LOOP_LAG_THRESHOLD_MS
+    app.state.loop_monitor = LoopLagMonitor(threshold_ms=threshold_ms)
+    if threshold_ms > 0:
+        app.state.loop_monitor.start()
+    app.state.jobs = background_jobs()
+    for job in app.state.jobs:
+        job.start()
+    app.state.walk_scheduler = WalkScheduler(get_settings().WALK_TIMER_TICK_SECONDS)
+    if app.state.walk_scheduler.tick > 0:
+        app.state.walk_scheduler.start()
+    app.state.tower_key_listener = TowerKeyListener()
+    if get_settings().TOWER_KEY_LISTEN:
+        app.state.tower_key_listener.start()
+    yield
+    await app.state.tower_key_listener.stop()
+    for job in app.state.jobs:
+        await job.stop()
+    await app.state.walk_scheduler.stop()
+    await app.state.loop_monitor.stop()
+    # The shared blob HTTP client only exists if an upload happened; avoid
+    # importing app.storage (and httpx) just to shut it down.
+    storage = sys.modules.get("app.storage")
+    if storage is not None:
+        await storage.close_client()
+
+
+app = FastAPI(title="Compass SafeWalks API", version="1.0.0", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+# Added last so it runs outermost and the ID is set for everything inside.
+app.add_middleware(RequestIDMiddleware)
 
 
 @app.get("/")
@@ -19,6 +76,25 @@ def health():
     return {"ok": True}
 
 
+@app.get("/health/loop")
+def loop_health(request: Request):
+    """Event-loop stalls recorded since startup."""
+    monitor = getattr(request.app.state, "loop_monitor", None)
+    return monitor.snapshot() if monitor is not None else {"running": False}
+
+
+@app.get("/health/db")
+def db_health():
+    """Connection pool occupancy and checkout wait statistics."""
+    return pool_stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Request, DB and ingest metrics in Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.exception_handler(Exception)
 async def generic_exception_handler(request, exc):  # type: ignore[override]
     # Let HTTPException (including our error_response) pass through
@@ -43,4 +119,7 @@ app.include_router(fob.router)
 app.include_router(map_routes.router)
 app.include_router(tower_ingest.router)
 app.include_router(incidents.router)
+app.include_router(geofences.router)
+app.include_router(alerts.router)
+app.include_router(walks.router)
 
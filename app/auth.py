@@ -1,26 +1,36 @@
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-from jose import jwt, JWTError
-from passlib.context import CryptContext
-
 from .settings import get_settings
 
 
-# Use Argon2 for password hashing to avoid bcrypt backend issues and
-# 72-byte length limits while still using passlib, as allowed by spec.
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# passlib/argon2 and python-jose (which pulls in ``cryptography``) are imported
+# on first use instead of at module import to keep serverless cold starts short.
+_pwd_context = None
+
+
+def _get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+
+        # Use Argon2 for password hashing to avoid bcrypt backend issues and
+        # 72-byte length limits while still using passlib, as allowed by spec.
+        _pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+    return _pwd_context
 
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return _get_pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, password_hash: str) -> bool:
-    return pwd_context.verify(plain_password, password_hash)
+    return _get_pwd_context().verify(plain_password, password_hash)
 
 
 def create_access_token(user_id: str, username: str, expires_seconds: Optional[int] = None) -> str:
+    from jose import jwt
+
     settings = get_settings()
     if expires_seconds is None:
         expires_seconds = settings.JWT_EXP_SECONDS
@@ -38,9 +48,10 @@ def create_access_token(user_id: str, username: str, expires_seconds: Optional[i
 
 
 def decode_token(token: str) -> Optional[dict]:
+    from jose import jwt, JWTError
+
     try:
         payload = jwt.decode(token, get_settings().JWT_SECRET, algorithms=["HS256"])
         return payload
     except JWTError:
         return None
-
@@ -0,0 +1,47 @@
+"""Avatar image processing: decode, square-crop and encode WebP thumbnails.
+
+Imported lazily from the profile route (Pillow is not needed on cold start).
+Everything here is CPU-bound and synchronous; call it from a threadpool.
+"""
+import hashlib
+import io
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+THUMBNAIL_SIZES = (64, 128, 256)
+WEBP_QUALITY = 80
+
+# Refuse to decode images whose pixel count could blow up memory
+# (a 5 MB PNG can otherwise expand to gigabytes).
+MAX_IMAGE_PIXELS = 40_000_000
+
+
+class InvalidImage(Exception):
+    """The upload could not be decoded as an image."""
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_thumbnails(data: bytes, sizes: tuple[int, ...] = THUMBNAIL_SIZES) -> dict[str, bytes]:
+    """Return ``{"<size>": webp_bytes}`` square thumbnails for each size."""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.width * image.height > MAX_IMAGE_PIXELS:
+                raise InvalidImage("Image dimensions are too large")
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e)) from e
+
+    # Downscale once to the largest size, then derive smaller sizes from it.
+    largest = ImageOps.fit(image, (max(sizes), max(sizes)), Image.Resampling.LANCZOS)
+    thumbnails: dict[str, bytes] = {}
+    for size in sizes:
+        thumb = largest if size == largest.width else largest.resize((size, size), Image.Resampling.LANCZOS)
+        out = io.BytesIO()
+        thumb.save(out, format="WEBP", quality=WEBP_QUALITY, method=4)
+        thumbnails[str(size)] = out.getvalue()
+    return thumbnails
@@ -1,22 +1,247 @@
+import threading
+import time
 from contextlib import contextmanager
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine, exc, make_url, text
 from sqlalchemy.orm import sessionmaker, DeclarativeBase, Session
+from sqlalchemy.pool import NullPool, QueuePool
 
-from .settings import get_settings
+from .settings import Settings, get_settings
 
 
 class Base(DeclarativeBase):
     pass
 
 
-engine = create_engine(get_settings().DATABASE_URL, pool_pre_ping=True)
+class PoolMetrics:
+    """Process-wide connection pool counters (see ``pool_stats``)."""
 
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False, class_=Session)
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.overflow_checkouts = 0
+            self.timeouts = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+
+    def record_checkout(self, wait: float, overflow: bool) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.overflow_checkouts += overflow
+            self.wait_seconds_total += wait
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+
+pool_metrics = PoolMetrics()
+
+
+class _MeteredPool:
+    """Pool mixin timing how long each checkout waits for a connection."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_metrics.record_timeout()
+            raise
+        overflow = isinstance(self, QueuePool) and self.overflow() > 0
+        pool_metrics.record_checkout(time.perf_counter() - start, overflow)
+        return connection
+
+
+class MeteredQueuePool(_MeteredPool, QueuePool):
+    pass
+
+
+class MeteredNullPool(_MeteredPool, NullPool):
+    pass
+
+
+def engine_options(settings: Settings) -> dict:
+    """``create_engine`` keyword arguments for the configured ``DB_POOL_MODE``.
+
+    - ``queue``: a per-process QueuePool (long-running servers).
+    - ``null``: no pooling; each session opens and closes its own connection
+      (serverless, where per-instance pools exhaust Postgres under scale-out).
+    - ``pgbouncer``: no client-side pooling behind PgBouncer in transaction
+      mode, with driver-side prepared statements disabled.
+    """
+    mode = settings.DB_POOL_MODE
+    if mode == "queue":
+        return {
+            "poolclass": MeteredQueuePool,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        }
+    if mode == "null":
+        return {"poolclass": MeteredNullPool}
+    if mode == "pgbouncer":
+        # psycopg2 never uses server-side prepared statements; psycopg 3 and
+        # asyncpg do, and those break when PgBouncer swaps backends per transaction.
+        driver = make_url(settings.DATABASE_URL).get_driver_name()
+        connect_args = {
+            "psycopg": {"prepare_threshold": None},
+            "asyncpg": {"statement_cache_size": 0, "prepared_statement_cache_size": 0},
+        }.get(driver, {})
+        return {"poolclass": MeteredNullPool, "connect_args": connect_args}
+    raise ValueError(f"Unknown DB_POOL_MODE {mode!r} (expected queue, null or pgbouncer)")
+
+
+# The engine (and with it the psycopg2 driver) is created on first use rather
+# than at import time, so serverless cold starts don't pay for it up front.
+_engine: Engine | None = None
+_replica_engine: Engine | None = None
+_engine_lock = threading.Lock()
+
+SessionLocal = sessionmaker(autoflush=False, autocommit=False, expire_on_commit=False, class_=Session)
+
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                settings = get_settings()
+                _engine = create_engine(settings.DATABASE_URL, **engine_options(settings))
+                SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def get_replica_engine() -> Engine | None:
+    """Engine for ``DATABASE_REPLICA_URL``, or None when no replica is configured."""
+    global _replica_engine
+    settings = get_settings()
+    if not settings.DATABASE_REPLICA_URL:
+        return None
+    if _replica_engine is None:
+        with _engine_lock:
+            if _replica_engine is None:
+                _replica_engine = create_engine(settings.DATABASE_REPLICA_URL, **engine_options(settings))
+    return _replica_engine
+
+
+def dispose_engine() -> None:
+    """Close pooled connections; the next session builds fresh engines."""
+    global _engine, _replica_engine
+    with _engine_lock:
+        for engine in (_engine, _replica_engine):
+            if engine is not None:
+                engine.dispose()
+        _engine = _replica_engine = None
+    replica_lag.reset()
+
+
+# Seconds the replica is behind the primary. Zero when it has replayed
+# everything it received (an idle primary leaves the replay timestamp stale),
+# and zero when the "replica" isn't actually in recovery.
+REPLICA_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+class ReplicaLag:
+    """Replica lag, measured at most once per ``REPLICA_LAG_CHECK_SECONDS``."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.lag_seconds: float | None = None
+        self.checked_at = float("-inf")
+        self.reads = 0
+        self.fallbacks = 0
+
+    def measure(self, engine: Engine) -> float:
+        try:
+            with engine.connect() as conn:
+                return float(conn.execute(REPLICA_LAG_SQL).scalar_one())
+        except exc.DBAPIError:
+            # Unreachable replica: treat as infinitely behind.
+            return float("inf")
+
+    def current(self, engine: Engine) -> float:
+        interval = get_settings().REPLICA_LAG_CHECK_SECONDS
+        now = time.monotonic()
+        if now - self.checked_at >= interval:
+            with self._lock:
+                if now - self.checked_at >= interval:
+                    self.lag_seconds = self.measure(engine)
+                    self.checked_at = now
+        return self.lag_seconds
+
+    def use_replica(self, engine: Engine) -> bool:
+        settings = get_settings()
+        usable = (
+            not settings.REPLICA_FALLBACK_TO_PRIMARY
+            or self.current(engine) <= settings.REPLICA_MAX_LAG_SECONDS
+        )
+        with self._lock:
+            if usable:
+                self.reads += 1
+            else:
+                self.fallbacks += 1
+        return usable
+
+
+replica_lag = ReplicaLag()
+
+
+def pool_stats() -> dict:
+    """Pool occupancy and checkout counters for the current engine."""
+    stats = {
+        "mode": get_settings().DB_POOL_MODE,
+        "checkouts": pool_metrics.checkouts,
+        "overflow_checkouts": pool_metrics.overflow_checkouts,
+        "timeouts": pool_metrics.timeouts,
+        "checkout_wait_seconds_total": pool_metrics.wait_seconds_total,
+        "checkout_wait_seconds_max": pool_metrics.wait_seconds_max,
+    }
+    pool = _engine.pool if _engine is not None else None
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+        )
+    if get_settings().DATABASE_REPLICA_URL:
+        stats["replica"] = {
+            "lag_seconds": replica_lag.lag_seconds,
+            "reads": replica_lag.reads,
+            "fallbacks": replica_lag.fallbacks,
+        }
+    return stats
+
+
+def __getattr__(name: str):
+    # Backwards-compatible access to ``app.db.engine``.
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 @contextmanager
 def session_scope() -> Session:
+    get_engine()
     session = SessionLocal()
     try:
         yield session
@@ -29,9 +254,45 @@ def session_scope() -> Session:
 
 
 def get_db():
+    # Sessions check out a pooled connection on first query, not here.
+    get_engine()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+
+class ReadSession(Session):
+    """Session for read-only endpoints that picks its engine on first use.
+
+    Routes to ``DATABASE_REPLICA_URL`` when configured, falling back to the
+    primary while the replica lags by more than ``REPLICA_MAX_LAG_SECONDS``
+    (unless ``REPLICA_FALLBACK_TO_PRIMARY`` is off). Deciding lazily means
+    requests rejected before their first query (bad tokens) never run the lag
+    check or check out a connection. ``info["replica"]`` tells which was used.
+    """
+
+    _routed_bind: Engine | None = None
+
+    def get_bind(self, mapper=None, **kw):
+        if self._routed_bind is None:
+            replica = get_replica_engine()
+            if replica is not None and replica_lag.use_replica(replica):
+                self.info["replica"] = True
+                self._routed_bind = replica
+            else:
+                self._routed_bind = get_engine()
+        return self._routed_bind
+
+
+ReadSessionLocal = sessionmaker(autoflush=False, autocommit=False, expire_on_commit=False, class_=ReadSession)
+
+
+def get_read_db():
+    # Like get_db, the connection is only checked out by the first query.
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
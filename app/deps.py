@@ -1,11 +1,24 @@
+import hmac
+
 from fastapi import Depends, Header
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
 from .auth import decode_token
-from .db import get_db
+from .db import get_db, session_scope, get_read_db
+from .metrics import tower_auth_failures
 from .models import User
 from .settings import get_settings
+from .towers import tower_keys
+
+
+# Friends who share their location with the caller: the flag lives on the
+# friend's row, friendships(user_id=friend, friend_id=caller). A subquery for
+# ``user_id IN (...)``, bound to ``:current_user_id``.
+LOCATION_SHARERS_SQL = """
+    SELECT fs.user_id FROM friendships AS fs
+    WHERE fs.friend_id = :current_user_id AND fs.is_sharing_location = true
+"""
 
 
 def error_response(status_code: int, code: str, message: str, details: dict | None = None):
@@ -15,10 +28,7 @@ def error_response(status_code: int, code: str, message: str, details: dict | No
     raise HTTPException(status_code=status_code, detail=body)
 
 
-def get_current_user(
-    authorization: str | None = Header(None, alias="Authorization"),
-    db: Session = Depends(get_db),
-) -> User:
+def _authenticated_user_id(authorization: str | None) -> str:
     if not authorization or not authorization.lower().startswith("bearer "):
         error_response(status.HTTP_401_UNAUTHORIZED, "UNAUTHORIZED", "Missing bearer token")
 
@@ -31,20 +41,55 @@ def get_current_user(
     username = payload.get("username")
     if not user_id or not username:
         error_response(status.HTTP_401_UNAUTHORIZED, "UNAUTHORIZED", "Invalid token payload")
+    return user_id
 
+
+def get_current_user(
+    authorization: str | None = Header(None, alias="Authorization"),
+    db: Session = Depends(get_db),
+) -> User:
+    user_id = _authenticated_user_id(authorization)
     user = db.get(User, user_id)
     if not user:
         error_response(status.HTTP_401_UNAUTHORIZED, "UNAUTHORIZED", "User not found")
     return user
 
 
+def get_current_user_read(
+    authorization: str | None = Header(None, alias="Authorization"),
+    db: Session = Depends(get_read_db),
+) -> User:
+    """Like get_current_user, but loaded through the read-only (replica) session.
+
+    The returned user is read-only: write endpoints must use get_current_user.
+    """
+    user_id = _authenticated_user_id(authorization)
+    user = db.get(User, user_id)
+    if not user and db.info.get("replica"):
+        # Users who just signed up may not have replicated yet.
+        with session_scope() as primary:
+            user = primary.get(User, user_id)
+    if not user:
+        error_response(status.HTTP_401_UNAUTHORIZED, "UNAUTHORIZED", "User not found")
+    return user
+
+
 def verify_tower_key(
     x_tower_key: str | None = Header(None, alias="X-Tower-Key"),
-    db: Session = Depends(get_db),
-):
-    settings = get_settings()
-    if not x_tower_key or x_tower_key != settings.TOWER_SHARED_KEY:
-        error_response(status.HTTP_401_UNAUTHORIZED, "TOWER_UNAUTHORIZED", "Invalid tower key")
-    # This dependency just validates the shared key; individual routes still validate tower_id etc.
-    return True
+    x_tower_id: str | None = Header(None, alias="X-Tower-Id"),
+) -> str | None:
+    """Authenticate a tower; returns its id, or ``None`` if it used the shared key.
 
+    Towers that send ``X-Tower-Id`` must present their own key. Without it the
+    legacy ``TOWER_SHARED_KEY`` is accepted unless that is set to empty.
+    """
+    if x_tower_id is not None:
+        if x_tower_key and tower_keys.verify(x_tower_id, x_tower_key):
+            return x_tower_id
+        tower_auth_failures.inc(x_tower_id if tower_keys.known(x_tower_id) else "unknown")
+        error_response(status.HTTP_401_UNAUTHORIZED, "TOWER_UNAUTHORIZED", "Invalid tower key")
+    shared_key = get_settings().TOWER_SHARED_KEY
+    if not x_tower_key or not shared_key or not hmac.compare_digest(x_tower_key.encode(), shared_key.encode()):
+        tower_auth_failures.inc("shared")
+        error_response(status.HTTP_401_UNAUTHORIZED, "TOWER_UNAUTHORIZED", "Invalid tower key")
+    return None
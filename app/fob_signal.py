@@ -0,0 +1,176 @@
+"""Lost-signal detection for fobs.
+
+``fob_signal`` holds each fob's last ping. It is maintained like the ping
+rollups: a high-water mark on ``pings.id`` in ``job_watermarks`` means each
+run only reads pings that arrived since the last one and folds the newest per
+fob into its row; ``pings`` is never rescanned.
+
+A fob that hasn't pinged for ``SIGNAL_LOST_AFTER_SECONDS`` gets
+``signal_lost_at`` set and, if claimed, a ``lost`` event for its owner. The
+check reads ``ix_fob_signal_last_seen_at_live``, which only covers fobs whose
+signal isn't already lost, oldest first, so a run touches just the fobs that
+went quiet since the previous one whatever the fleet size. The next ping from
+a lost fob clears the flag and records a ``restored`` event; each transition
+is reported exactly once.
+
+Run from cron with ``python -m app.fob_signal`` or in-process by setting
+``SIGNAL_CHECK_INTERVAL_SECONDS``.
+"""
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .db import session_scope
+from .jobs import NEXT_PINGS, advance_watermark, lock_watermark
+from .metrics import fob_signal_events
+from .settings import get_settings
+
+
+logger = logging.getLogger("compass.signal")
+
+JOB_NAME = "fob_signal"
+
+# Every CTE sees the table as it was before the statement, so ``was_lost``
+# still has the flags the upsert clears. ``held_back`` tells whether a ping
+# past the settle window waits on an older open transaction, which may hold
+# newer pings of any fob.
+_TRACK_BATCH_SQL = text(
+    f"""
+    WITH next_pings AS ({NEXT_PINGS}),
+    batch AS (
+        SELECT id, fob_uid, lat, lng, status, received_at FROM next_pings WHERE NOT blocked
+    ),
+    latest AS (
+        SELECT DISTINCT ON (fob_uid) fob_uid, lat, lng, received_at
+        FROM batch
+        ORDER BY fob_uid, received_at DESC, id DESC
+    ),
+    was_lost AS (
+        SELECT s.fob_uid
+        FROM fob_signal AS s
+        JOIN latest ON latest.fob_uid = s.fob_uid
+        WHERE s.signal_lost_at IS NOT NULL AND latest.received_at > s.last_seen_at
+    ),
+    upserted AS (
+        INSERT INTO fob_signal AS s (fob_uid, last_seen_at, lat, lng)
+        SELECT fob_uid, received_at, lat, lng FROM latest
+        WHERE EXISTS (SELECT 1 FROM fobs WHERE fobs.fob_uid = latest.fob_uid)
+        ON CONFLICT (fob_uid) DO UPDATE SET
+            last_seen_at = EXCLUDED.last_seen_at,
+            lat = EXCLUDED.lat,
+            lng = EXCLUDED.lng,
+            signal_lost_at = NULL
+        WHERE EXCLUDED.last_seen_at > s.last_seen_at
+    ),
+    restored AS (
+        INSERT INTO fob_signal_events (fob_uid, user_id, kind, last_seen_at, lat, lng)
+        SELECT latest.fob_uid, fobs.owner_user_id, 'restored', latest.received_at, latest.lat, latest.lng
+        FROM latest
+        JOIN was_lost ON was_lost.fob_uid = latest.fob_uid
+        JOIN fobs ON fobs.fob_uid = latest.fob_uid
+        WHERE fobs.owner_user_id IS NOT NULL
+        RETURNING fob_uid, user_id, kind, last_seen_at
+    )
+    SELECT counts.processed, counts.max_id, counts.held_back,
+           restored.fob_uid, restored.user_id, restored.kind, restored.last_seen_at
+    FROM (
+        SELECT count(*) FILTER (WHERE NOT blocked) AS processed,
+               max(id) FILTER (WHERE NOT blocked) AS max_id,
+               coalesce(bool_or(blocked AND after_open_xact AND NOT young), false) AS held_back
+        FROM next_pings
+    ) AS counts
+    LEFT JOIN restored ON true
+    """
+)
+
+# Unclaimed fobs are flagged too (without an event) so they drop out of the
+# live index instead of being rechecked every run.
+_MARK_LOST_SQL = text(
+    """
+    WITH lost AS (
+        UPDATE fob_signal AS s
+        SET signal_lost_at = now()
+        WHERE s.signal_lost_at IS NULL
+          AND s.last_seen_at < now() - make_interval(secs => :lost_after_seconds)
+        RETURNING s.fob_uid, s.last_seen_at, s.lat, s.lng
+    )
+    INSERT INTO fob_signal_events (fob_uid, user_id, kind, last_seen_at, lat, lng)
+    SELECT lost.fob_uid, fobs.owner_user_id, 'lost', lost.last_seen_at, lost.lat, lost.lng
+    FROM lost
+    JOIN fobs ON fobs.fob_uid = lost.fob_uid
+    WHERE fobs.owner_user_id IS NOT NULL
+    RETURNING fob_uid, user_id, kind, last_seen_at
+    """
+)
+
+
+def track_last_seen(
+    db: Session, batch_size: int = 50_000, settle_seconds: float = 30.0
+) -> tuple[int, list, bool]:
+    """Fold the next batch of new pings into ``fob_signal``.
+
+    Returns the number of pings processed, the ``restored`` events recorded,
+    and whether the batch stopped at a ping held back by an older open
+    transaction (see ``app.jobs.NEXT_PINGS``). Runs in the caller's
+    transaction with the watermark row locked, so concurrent runs serialize.
+    """
+    high_water_id = lock_watermark(db, JOB_NAME)
+    rows = db.execute(
+        _TRACK_BATCH_SQL,
+        {"high_water_id": high_water_id, "batch_size": batch_size, "settle_seconds": settle_seconds},
+    ).all()
+    processed = rows[0].processed
+    if processed:
+        advance_watermark(db, JOB_NAME, rows[0].max_id)
+    return processed, [row for row in rows if row.fob_uid is not None], rows[0].held_back
+
+
+def mark_lost(db: Session, lost_after_seconds: float) -> list:
+    """Flag fobs quiet for ``lost_after_seconds``; returns the ``lost`` events recorded."""
+    return db.execute(_MARK_LOST_SQL, {"lost_after_seconds": lost_after_seconds}).all()
+
+
+def _report(events: list) -> None:
+    for event in events:
+        fob_signal_events.inc(event.kind)
+        if event.kind == "lost":
+            logger.warning(
+                "Fob %s (user %s) lost signal; last seen %s", event.fob_uid, event.user_id, event.last_seen_at
+            )
+        else:
+            logger.info("Fob %s (user %s) signal restored", event.fob_uid, event.user_id)
+
+
+def run_signal_check(max_batches: int = 20) -> int:
+    """Catch up on new pings, then flag fobs that went quiet; returns events recorded.
+
+    Fobs are only checked once every ping up to the settle window has been
+    folded in, so a backlog can't make a live fob look lost. When a long
+    transaction holds pings back, the check waits for a later run. Pings
+    inside the settle window are never folded in before the check, so
+    ``SIGNAL_LOST_AFTER_SECONDS`` must be well above ``ROLLUP_SETTLE_SECONDS``.
+    Batch size and settle window are the rollups' (``ROLLUP_BATCH_SIZE``,
+    ``ROLLUP_SETTLE_SECONDS``): both jobs follow ``pings`` the same way.
+    """
+    settings = get_settings()
+    total = 0
+    for _ in range(max_batches):
+        with session_scope() as db:
+            processed, events, held_back = track_last_seen(
+                db, settings.ROLLUP_BATCH_SIZE, settings.ROLLUP_SETTLE_SECONDS
+            )
+            caught_up = processed < settings.ROLLUP_BATCH_SIZE
+            if caught_up and held_back:
+                logger.info("Lost-signal check deferred: pings are held back by an open transaction")
+            elif caught_up:
+                events += mark_lost(db, settings.SIGNAL_LOST_AFTER_SECONDS)
+        _report(events)
+        total += len(events)
+        if caught_up:
+            break
+    return total
+
+
+if __name__ == "__main__":
+    print(f"Recorded {run_signal_check()} signal event(s)")
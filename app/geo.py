@@ -0,0 +1,73 @@
+"""Fixed lat/lng grid cells and vectorized distance helpers.
+
+Spatial rows store ``cell_id(lat, lng)`` in an indexed BIGINT column so
+proximity queries can prune candidates with ``cell = ANY(:cells)`` before
+filtering exactly in NumPy. Cells are ``CELL_DEG`` degrees square (about 1.1 km
+north-south; narrower east-west away from the equator).
+
+NumPy is imported on first use, not at module import.
+"""
+import math
+
+
+EARTH_RADIUS_M = 6_371_008.8
+METERS_PER_DEG_LAT = 111_320.0
+CELL_DEG = 0.01
+_ROWS = round(180 / CELL_DEG)
+_COLS = round(360 / CELL_DEG)
+
+
+def _row_col(lat: float, lng: float) -> tuple[int, int]:
+    row = min(int(math.floor((lat + 90) / CELL_DEG)), _ROWS - 1)
+    col = min(int(math.floor((lng + 180) / CELL_DEG)), _COLS - 1)
+    return row, col
+
+
+def cell_id(lat: float, lng: float) -> int:
+    row, col = _row_col(lat, lng)
+    return row * _COLS + col
+
+
+def cells_within(lat: float, lng: float, radius_m: float) -> list[int]:
+    """Cells overlapping the bounding box of a circle (a superset of the circle)."""
+    dlat = radius_m / METERS_PER_DEG_LAT
+    # Guard the longitude span near the poles, where it diverges.
+    cos_lat = max(math.cos(math.radians(min(abs(lat) + dlat, 90.0))), 1e-6)
+    dlng = min(radius_m / (METERS_PER_DEG_LAT * cos_lat), 180.0)
+    row_lo, _ = _row_col(max(lat - dlat, -90.0), lng)
+    row_hi, _ = _row_col(min(lat + dlat, 90.0), lng)
+    col_lo = math.floor((lng - dlng + 180) / CELL_DEG)
+    col_hi = math.floor((lng + dlng + 180) / CELL_DEG)
+    cols = {col % _COLS for col in range(col_lo, col_hi + 1)}  # wraps at the antimeridian
+    return [row * _COLS + col for row in range(row_lo, row_hi + 1) for col in sorted(cols)]
+
+
+def haversine_m(lat: float, lng: float, lats, lngs):
+    """Great-circle distance in meters from one point to arrays of points."""
+    import numpy as np
+
+    lat1 = math.radians(lat)
+    lat2 = np.radians(lats)
+    dlat = lat2 - lat1
+    dlng = np.radians(lngs) - math.radians(lng)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def distance_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in meters between two points (no NumPy)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dlng = math.radians(lng2 - lng1)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def pairwise_haversine_m(lats1, lngs1, lats2, lngs2):
+    """Great-circle distances in meters between matching elements of two point arrays."""
+    import numpy as np
+
+    phi1 = np.radians(lats1)
+    phi2 = np.radians(lats2)
+    dlng = np.radians(lngs2) - np.radians(lngs1)
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
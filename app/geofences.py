@@ -0,0 +1,287 @@
+"""Geofence (safe zone) evaluation for tower pings.
+
+Each user's zones are compiled into a ``ZoneIndex``: a uniform lat/lng grid
+over their zones in which every cell lists the zones that cover it entirely
+(no test needed) or partially (exact point-in-polygon test). The grid is
+sized per user so that a zone spans at most ``GRID_CELLS_PER_ZONE`` cells per
+side. Indexes are cached per user and keyed on ``users.geofences_version``,
+which ingest reads in the same query as the fob and which every zone change
+bumps, so a ping never queries zones unless they changed (in any process);
+users who never had zones (version 0) skip evaluation entirely.
+
+Per fob, ``fob_zone_states`` remembers the grid cell of its last ping and
+the zones it was in. A ping in the same cell as the last one, when that cell
+has no partially covered zones, cannot change anything and returns
+immediately; any other ping looks its zones up in the index, and if they
+match the remembered set, only the remembered cell changes. Only when the set
+differs, or the fob has no state for the owner's current index (first ping
+since a restart or eviction, a zone change, or a new owner), is the fob
+locked for the rest of the transaction (an advisory lock, so pings relayed by
+two towers at once, or handled by different processes, take turns) and the
+new set diffed against the fob's latest event per zone, so only real
+transitions write ``geofence_events`` rows, exactly once. A fob whose pings
+alternate between processes is diffed against each process's own memory
+until its set changes there.
+"""
+import itertools
+import logging
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from .metrics import geofence_events
+from .models import Geofence, GeofenceEvent
+
+
+logger = logging.getLogger("compass.geofence")
+
+GRID_CELLS_PER_ZONE = 16
+MIN_CELL_DEG = 1e-5
+MAX_CACHED_INDEXES = 50_000
+MAX_TRACKED_FOBS = 200_000
+
+_LATEST_EVENTS_SQL = text(
+    """
+    SELECT DISTINCT ON (geofence_id) geofence_id, kind
+    FROM geofence_events
+    WHERE fob_uid = :fob_uid AND user_id = :user_id
+    ORDER BY geofence_id, created_at DESC, id DESC
+    """
+)
+
+# First key of the two-key advisory locks, so fob locks can't collide with
+# other advisory lock users.
+FOB_ZONE_LOCK_NAMESPACE = 0x6E0F
+
+_LOCK_FOB_SQL = text("SELECT pg_advisory_xact_lock(:namespace, hashtext(:fob_uid))")
+
+_index_ids = itertools.count(1)
+
+
+def contains(lats, lngs, lat: float, lng: float) -> bool:
+    """Even-odd point-in-polygon test, treating lat/lng as planar (fine at zone scale)."""
+    inside = False
+    j = len(lats) - 1
+    for i in range(len(lats)):
+        yi, yj = lats[i], lats[j]
+        if (yi > lat) != (yj > lat) and lng < (lngs[j] - lngs[i]) * (lat - yi) / (yj - yi) + lngs[i]:
+            inside = not inside
+        j = i
+    return inside
+
+
+def _contains_many(lats, lngs, point_lats, point_lngs):
+    """``contains`` for arrays of points."""
+    import numpy as np
+
+    inside = np.zeros(len(point_lats), dtype=bool)
+    j = len(lats) - 1
+    for i in range(len(lats)):
+        yi, yj = lats[i], lats[j]
+        if yi != yj:
+            crosses = (yi > point_lats) != (yj > point_lats)
+            x = (lngs[j] - lngs[i]) * (point_lats - yi) / (yj - yi) + lngs[i]
+            inside ^= crosses & (point_lngs < x)
+        j = i
+    return inside
+
+
+@dataclass(frozen=True)
+class Zone:
+    id: str
+    name: str
+    lats: tuple[float, ...]
+    lngs: tuple[float, ...]
+
+
+class ZoneIndex:
+    """Grid lookup from a point to the zones containing it."""
+
+    def __init__(self, version: int, zones: list[Zone]) -> None:
+        import numpy as np
+
+        self.id = next(_index_ids)
+        self.version = version
+        self.zone_ids = frozenset(zone.id for zone in zones)
+        self.zones = {zone.id: zone for zone in zones}
+        spans = [max(max(z.lats) - min(z.lats), max(z.lngs) - min(z.lngs)) for z in zones]
+        self.cell_deg = max(max(spans, default=0.0) / GRID_CELLS_PER_ZONE, MIN_CELL_DEG)
+        # cell -> ((zone_id, needs_exact_test), ...)
+        cells: dict[tuple[int, int], list[tuple[str, bool]]] = {}
+        for zone in zones:
+            r0, c0 = self.cell(min(zone.lats), min(zone.lngs))
+            r1, c1 = self.cell(max(zone.lats), max(zone.lngs))
+            # Cells touched by an edge's bounding box may be partially covered;
+            # every other cell is entirely inside or outside, so its centre decides.
+            partial = set()
+            for i in range(len(zone.lats)):
+                ra, ca = self.cell(zone.lats[i - 1], zone.lngs[i - 1])
+                rb, cb = self.cell(zone.lats[i], zone.lngs[i])
+                for r in range(min(ra, rb), max(ra, rb) + 1):
+                    for c in range(min(ca, cb), max(ca, cb) + 1):
+                        partial.add((r, c))
+            rest = [(r, c) for r in range(r0, r1 + 1) for c in range(c0, c1 + 1) if (r, c) not in partial]
+            if rest:
+                centres = np.array(rest, dtype=float) + 0.5
+                inside = _contains_many(
+                    zone.lats, zone.lngs, centres[:, 0] * self.cell_deg, centres[:, 1] * self.cell_deg
+                )
+                for key, is_inside in zip(rest, inside):
+                    if is_inside:
+                        cells.setdefault(key, []).append((zone.id, False))
+            for key in partial:
+                cells.setdefault(key, []).append((zone.id, True))
+        self.cells = {key: tuple(entries) for key, entries in cells.items()}
+
+    def cell(self, lat: float, lng: float) -> tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)
+
+    def needs_exact_test(self, cell: tuple[int, int]) -> bool:
+        return any(exact for _, exact in self.cells.get(cell, ()))
+
+    def zones_at(self, lat: float, lng: float, cell: tuple[int, int]) -> frozenset[str]:
+        return frozenset(
+            zone_id
+            for zone_id, exact in self.cells.get(cell, ())
+            if not exact or contains(self.zones[zone_id].lats, self.zones[zone_id].lngs, lat, lng)
+        )
+
+
+def load_zones(db: Session, user_id: str) -> list[Zone]:
+    rows = db.scalars(select(Geofence).where(Geofence.user_id == user_id)).all()
+    return [
+        Zone(
+            id=row.id,
+            name=row.name,
+            lats=tuple(float(v[0]) for v in row.vertices),
+            lngs=tuple(float(v[1]) for v in row.vertices),
+        )
+        for row in rows
+    ]
+
+
+class ZoneIndexCache:
+    """LRU of each user's ``ZoneIndex``, valid while ``users.geofences_version`` matches."""
+
+    def __init__(self, max_users: int = MAX_CACHED_INDEXES) -> None:
+        self.max_users = max_users
+        self._indexes: OrderedDict[str, ZoneIndex] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, db: Session, user_id: str, version: int) -> ZoneIndex:
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None and index.version == version:
+                self._indexes.move_to_end(user_id)
+                self.hits += 1
+                return index
+            self.misses += 1
+        index = ZoneIndex(version, load_zones(db, user_id))
+        with self._lock:
+            self._indexes[user_id] = index
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+        return index
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+            self.hits = self.misses = 0
+
+
+zone_index_cache = ZoneIndexCache()
+
+
+@dataclass(frozen=True)
+class FobZoneState:
+    user_id: str
+    index_id: int
+    cell: tuple[int, int]
+    zones: frozenset[str]
+
+
+class FobZoneStates:
+    """Grid cell and zones of each fob's last evaluated ping (LRU)."""
+
+    def __init__(self, max_fobs: int = MAX_TRACKED_FOBS) -> None:
+        self.max_fobs = max_fobs
+        self._states: OrderedDict[str, FobZoneState] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, fob_uid: str) -> FobZoneState | None:
+        with self._lock:
+            return self._states.get(fob_uid)
+
+    def set(self, fob_uid: str, state: FobZoneState) -> None:
+        with self._lock:
+            self._states[fob_uid] = state
+            self._states.move_to_end(fob_uid)
+            while len(self._states) > self.max_fobs:
+                self._states.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._states.clear()
+
+
+fob_zone_states = FobZoneStates()
+
+
+@dataclass
+class ZoneUpdate:
+    """A fob's new zone state and the events to commit with its ping."""
+
+    fob_uid: str
+    state: FobZoneState
+    events: list[GeofenceEvent] = field(default_factory=list)
+
+    def apply(self) -> None:
+        """Record the new state; call after the ping and events are committed."""
+        fob_zone_states.set(self.fob_uid, self.state)
+        for event in self.events:
+            geofence_events.inc(event.kind)
+            logger.info("Fob %s %s geofence %s (user %s)", event.fob_uid, event.kind, event.geofence_id, event.user_id)
+
+
+def _zones_inside(db: Session, user_id: str, fob_uid: str) -> frozenset[str]:
+    rows = db.execute(_LATEST_EVENTS_SQL, {"fob_uid": fob_uid, "user_id": user_id})
+    return frozenset(str(row.geofence_id) for row in rows if row.kind == "enter")
+
+
+def evaluate_ping(
+    db: Session, user_id: str, geofences_version: int, fob_uid: str, lat: float, lng: float
+) -> ZoneUpdate | None:
+    """Diff a ping against the owner's zones; adds any events to ``db`` (the caller commits).
+
+    Returns ``None`` when nothing can have changed.
+    """
+    if not geofences_version:
+        return None
+    index = zone_index_cache.get(db, user_id, geofences_version)
+    cell = index.cell(lat, lng)
+    state = fob_zone_states.get(fob_uid)
+    known = state is not None and state.user_id == user_id and state.index_id == index.id
+    if known and state.cell == cell and not index.needs_exact_test(cell):
+        return None
+
+    current = index.zones_at(lat, lng, cell)
+    update = ZoneUpdate(fob_uid, FobZoneState(user_id, index.id, cell, current))
+    if (known and current == state.zones) or not index.zone_ids:
+        return update
+    db.execute(_LOCK_FOB_SQL, {"namespace": FOB_ZONE_LOCK_NAMESPACE, "fob_uid": fob_uid})
+    previous = _zones_inside(db, user_id, fob_uid)
+    # Zones deleted since the last ping get no exit event.
+    for kind, zone_ids in (("exit", (previous - current) & index.zone_ids), ("enter", current - previous)):
+        for zone_id in sorted(zone_ids):
+            update.events.append(
+                GeofenceEvent(geofence_id=zone_id, user_id=user_id, fob_uid=fob_uid, kind=kind, lat=lat, lng=lng)
+            )
+    db.add_all(update.events)
+    return update
@@ -0,0 +1,96 @@
+"""Write-time clustering of incident reports.
+
+A report within ``INCIDENT_CLUSTER_RADIUS_M`` of a cluster's centroid whose
+last report is at most ``INCIDENT_CLUSTER_WINDOW_MINUTES`` old attaches to the
+nearest such cluster (bumping its count, centroid and ``last_reported_at``);
+otherwise it starts a new cluster. Reads serve one row per cluster.
+
+Concurrent reports at the same spot are serialized with transaction-scoped
+advisory locks on the grid cells around the report, so they cannot both
+start a cluster. Any writer that could attach to a given cluster locks that
+cluster's cell.
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from .geo import cell_id, cells_within, haversine_m
+from .models import Incident, IncidentCluster
+from .settings import get_settings
+
+
+# First key of the two-key advisory locks, so cell locks can't collide with
+# other advisory lock users.
+CLUSTER_LOCK_NAMESPACE = 0x1C1D
+
+# Volatile target-list functions run after the sort, so locks are taken in
+# cell order and concurrent writers can't deadlock.
+_LOCK_CELLS_SQL = text(
+    "SELECT pg_advisory_xact_lock(:namespace, c::int) FROM unnest(CAST(:cells AS bigint[])) AS c ORDER BY c"
+)
+
+
+def report_incident(
+    db: Session, reporter_id: str, lat: float, lng: float, description: str
+) -> tuple[Incident, IncidentCluster, set[int]]:
+    """Store a report and attach it to (or start) a cluster; the caller commits.
+
+    Returns the incident, its cluster and the grid cells whose cluster rows
+    changed (for cache invalidation).
+    """
+    settings = get_settings()
+    radius_m = settings.INCIDENT_CLUSTER_RADIUS_M
+    now = datetime.now(timezone.utc)
+
+    cluster = None
+    if radius_m > 0:
+        cells = cells_within(lat, lng, radius_m)
+        db.execute(_LOCK_CELLS_SQL, {"namespace": CLUSTER_LOCK_NAMESPACE, "cells": cells})
+        cutoff = now - timedelta(minutes=settings.INCIDENT_CLUSTER_WINDOW_MINUTES)
+        candidates = db.scalars(
+            select(IncidentCluster).where(
+                IncidentCluster.cell.in_(cells), IncidentCluster.last_reported_at >= cutoff
+            )
+        ).all()
+        if candidates:
+            distances = haversine_m(lat, lng, [c.lat for c in candidates], [c.lng for c in candidates])
+            nearest = int(distances.argmin())
+            if distances[nearest] <= radius_m:
+                cluster = candidates[nearest]
+
+    if cluster is None:
+        cluster = IncidentCluster(
+            lat=lat,
+            lng=lng,
+            cell=cell_id(lat, lng),
+            description=description,
+            report_count=1,
+            first_reported_at=now,
+            last_reported_at=now,
+        )
+        db.add(cluster)
+        db.flush()
+        changed_cells = {cluster.cell}
+    else:
+        changed_cells = {cluster.cell}
+        n = cluster.report_count
+        cluster.lat = (cluster.lat * n + lat) / (n + 1)
+        cluster.lng = (cluster.lng * n + lng) / (n + 1)
+        cluster.cell = cell_id(cluster.lat, cluster.lng)
+        cluster.report_count = n + 1
+        cluster.last_reported_at = now
+        changed_cells.add(cluster.cell)
+
+    incident = Incident(
+        reporter_id=reporter_id,
+        lat=lat,
+        lng=lng,
+        description=description,
+        cell=cell_id(lat, lng),
+        cluster_id=cluster.id,
+        created_at=now,
+    )
+    db.add(incident)
+    db.flush()
+    return incident, cluster, changed_cells
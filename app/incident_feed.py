@@ -0,0 +1,157 @@
+"""Reverse-chronological incident feeds with keyset pagination.
+
+The global feed lists clusters (one row per incident, see
+``app.incident_clusters``) newest first by ``(first_reported_at, id)``;
+"my reports" lists the caller's own reports by ``(created_at, id)``. Cursors
+encode the last row's sort key, so each page is an index range scan instead of
+an ever-growing OFFSET, and rows inserted while paging don't shift later pages.
+
+Nearly every client asks for the first page of the global feed, so it is
+cached per page size. Entries are bucketed by ``FEED_CACHE_TTL_SECONDS`` (so
+they expire on bucket boundaries) and invalidated by any new report in this
+process.
+"""
+import base64
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .settings import get_settings
+
+
+FEED_SQL = text(
+    """
+    SELECT id, lat, lng, description, report_count, first_reported_at, last_reported_at
+    FROM incident_clusters
+    ORDER BY first_reported_at DESC, id DESC
+    LIMIT :limit
+    """
+)
+FEED_AFTER_SQL = text(
+    """
+    SELECT id, lat, lng, description, report_count, first_reported_at, last_reported_at
+    FROM incident_clusters
+    WHERE (first_reported_at, id) < (:cursor_at, CAST(:cursor_id AS uuid))
+    ORDER BY first_reported_at DESC, id DESC
+    LIMIT :limit
+    """
+)
+# Uses ix_incidents_reporter_id; one reporter's rows are few enough to sort.
+MINE_SQL = text(
+    """
+    SELECT id, reporter_id, lat, lng, description, created_at, cluster_id
+    FROM incidents
+    WHERE reporter_id = :reporter_id
+    ORDER BY created_at DESC, id DESC
+    LIMIT :limit
+    """
+)
+MINE_AFTER_SQL = text(
+    """
+    SELECT id, reporter_id, lat, lng, description, created_at, cluster_id
+    FROM incidents
+    WHERE reporter_id = :reporter_id
+      AND (created_at, id) < (:cursor_at, CAST(:cursor_id AS uuid))
+    ORDER BY created_at DESC, id DESC
+    LIMIT :limit
+    """
+)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(at: datetime, row_id: str) -> str:
+    raw = f"{at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(at), str(uuid.UUID(row_id))
+    except ValueError as exc:  # bad base64, separator, timestamp or UUID
+        raise InvalidCursor(cursor) from exc
+
+
+def _page(db: Session, first_sql, after_sql, sort_key: str, params: dict, limit: int, cursor: str | None):
+    if cursor is None:
+        rows = db.execute(first_sql, {**params, "limit": limit + 1}).mappings().all()
+    else:
+        cursor_at, cursor_id = decode_cursor(cursor)
+        rows = db.execute(
+            after_sql, {**params, "limit": limit + 1, "cursor_at": cursor_at, "cursor_id": cursor_id}
+        ).mappings().all()
+    page = [dict(row) for row in rows[:limit]]
+    next_cursor = encode_cursor(page[-1][sort_key], str(page[-1]["id"])) if len(rows) > limit else None
+    return page, next_cursor
+
+
+class FirstPageCache:
+    """First page of the global feed per page size, for one TTL bucket or until invalidated."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._pages: dict[int, tuple[int, int, list[dict], str | None]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, limit: int, bucket: int) -> tuple[list[dict], str | None] | None:
+        with self._lock:
+            entry = self._pages.get(limit)
+            if entry is not None and entry[0] == bucket and entry[1] == self._generation:
+                self.hits += 1
+                return entry[2], entry[3]
+            self.misses += 1
+            return None
+
+    def generation(self) -> int:
+        return self._generation
+
+    def put(self, limit: int, bucket: int, generation: int, page: list[dict], next_cursor: str | None) -> None:
+        with self._lock:
+            # Skip if a report landed while this page was being read.
+            if generation == self._generation:
+                self._pages[limit] = (bucket, generation, page, next_cursor)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._pages.clear()
+
+    def clear(self) -> None:
+        self.invalidate()
+        self.hits = self.misses = 0
+
+
+feed_first_page_cache = FirstPageCache()
+
+
+def feed_page(db: Session, limit: int, cursor: str | None = None) -> tuple[list[dict], str | None]:
+    """One page of clusters, newest first; returns ``(rows, next_cursor)``."""
+    ttl = get_settings().FEED_CACHE_TTL_SECONDS
+    if cursor is not None or ttl <= 0:
+        return _page(db, FEED_SQL, FEED_AFTER_SQL, "first_reported_at", {}, limit, cursor)
+
+    bucket = int(time.monotonic() // ttl)
+    cached = feed_first_page_cache.get(limit, bucket)
+    if cached is not None:
+        return cached
+    generation = feed_first_page_cache.generation()
+    page, next_cursor = _page(db, FEED_SQL, FEED_AFTER_SQL, "first_reported_at", {}, limit, None)
+    feed_first_page_cache.put(limit, bucket, generation, page, next_cursor)
+    return page, next_cursor
+
+
+def my_reports_page(
+    db: Session, reporter_id: str, limit: int, cursor: str | None = None
+) -> tuple[list[dict], str | None]:
+    """One page of ``reporter_id``'s own reports, newest first."""
+    return _page(db, MINE_SQL, MINE_AFTER_SQL, "created_at", {"reporter_id": reporter_id}, limit, cursor)
@@ -0,0 +1,106 @@
+"""In-process periodic background jobs.
+
+Jobs are plain synchronous callables run in the threadpool every
+``interval_seconds`` and are started/stopped by the app lifespan. On serverless
+deployments (where nothing runs between requests) leave the intervals at 0 and
+trigger the same callables from cron instead (see each job's ``__main__``).
+
+Jobs that follow ``pings`` incrementally keep a high-water mark on
+``pings.id`` in ``job_watermarks`` (see ``lock_watermark``).
+"""
+import asyncio
+import logging
+from typing import Callable
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+logger = logging.getLogger("compass.jobs")
+
+# The pings past a job's high-water mark, in id order, for a ``next_pings``
+# CTE. The mark only moves forward, so a batch has to stop just below the
+# first ping that isn't settled: one younger than :settle_seconds
+# (``young``), or one written by a transaction newer than the oldest still
+# running (``pg_snapshot_xmin``; ``after_open_xact``), which may hold lower
+# ids that aren't visible yet however old its ``received_at`` is. ``blocked``
+# marks that ping and everything after it, which wait for the next run.
+NEXT_PINGS = """
+    SELECT *, bool_or(young OR after_open_xact) OVER (ORDER BY id) AS blocked
+    FROM (
+        SELECT id, fob_uid, lat, lng, status, received_at,
+               received_at >= now() - make_interval(secs => :settle_seconds) AS young,
+               age(xmin) <= age((pg_snapshot_xmin(pg_current_snapshot())::text::bigint % 4294967296)::text::xid)
+               AS after_open_xact
+        FROM pings
+        WHERE id > :high_water_id
+        ORDER BY id
+        LIMIT :batch_size
+    ) AS candidates
+"""
+
+# The next batch of settled pings, for a ``batch`` CTE.
+NEW_PINGS_BATCH = f"""
+    SELECT id, fob_uid, lat, lng, status, received_at
+    FROM ({NEXT_PINGS}) AS ordered
+    WHERE NOT blocked
+"""
+
+_LOCK_WATERMARK_SQL = text(
+    """
+    INSERT INTO job_watermarks (name, high_water_id) VALUES (:name, 0)
+    ON CONFLICT (name) DO UPDATE SET name = EXCLUDED.name
+    RETURNING high_water_id
+    """
+)
+
+_ADVANCE_WATERMARK_SQL = text(
+    "UPDATE job_watermarks SET high_water_id = :high_water_id, updated_at = now() WHERE name = :name"
+)
+
+
+def lock_watermark(db: Session, name: str) -> int:
+    """Return job ``name``'s high-water mark, locking its row until the transaction ends.
+
+    Concurrent runs of the job serialize on the lock instead of processing
+    the same pings twice.
+    """
+    return db.execute(_LOCK_WATERMARK_SQL, {"name": name}).scalar_one()
+
+
+def advance_watermark(db: Session, name: str, high_water_id: int) -> None:
+    db.execute(_ADVANCE_WATERMARK_SQL, {"name": name, "high_water_id": high_water_id})
+
+
+class PeriodicJob:
+    def __init__(self, name: str, interval_seconds: float, fn: Callable[[], object]) -> None:
+        self.name = name
+        self.interval = interval_seconds
+        self.fn = fn
+        self.runs = 0
+        self.failures = 0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(), name=f"job:{self.name}")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await run_in_threadpool(self.fn)
+                self.runs += 1
+            except Exception:
+                self.failures += 1
+                logger.exception("Background job %s failed", self.name)
@@ -0,0 +1,64 @@
+"""Event-loop lag monitor.
+
+A background task sleeps for a short interval and measures how late it wakes
+up. Any overshoot beyond the threshold means something ran on the event loop
+without yielding (sync DB calls, CPU-bound work in an ``async def``); those
+stretches are logged on ``compass.loop`` and kept for ``GET /health/loop``.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+
+
+logger = logging.getLogger("compass.loop")
+
+
+class LoopLagMonitor:
+    def __init__(self, threshold_ms: float = 100.0, interval_ms: float = 50.0, history: int = 50) -> None:
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        # (unix time the stall ended, lag in seconds), most recent last
+        self.stalls: deque[tuple[float, float]] = deque(maxlen=history)
+        self.stall_count = 0
+        self.max_lag = 0.0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = loop.time() - started - self.interval
+            if lag > self.threshold:
+                self.record(lag)
+
+    def record(self, lag: float) -> None:
+        self.stalls.append((time.time(), lag))
+        self.stall_count += 1
+        self.max_lag = max(self.max_lag, lag)
+        logger.warning("Event loop blocked for %.0fms", lag * 1000)
+
+    def snapshot(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "threshold_ms": self.threshold * 1000,
+            "stall_count": self.stall_count,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "recent_stalls": [
+                {"at": at, "lag_ms": round(lag * 1000, 1)} for at, lag in self.stalls
+            ],
+        }
@@ -0,0 +1,253 @@
+"""Prometheus-style metrics, rendered in the text exposition format on ``/metrics``.
+
+A small in-process registry rather than ``prometheus_client``: counters and
+histograms keyed by label tuples, guarded by one lock each. ``MetricsMiddleware``
+records request count, latency and status per route template, plus how many
+queries each request ran and how long they took (via SQLAlchemy cursor events
+on every engine). Values are per process.
+
+With ``QUERY_REPEAT_WARN_THRESHOLD`` set, requests that run the same statement
+that many times are logged on ``compass.db`` (typically an N+1 loop).
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .request_id import current_request_id
+from .settings import get_settings
+
+
+logger = logging.getLogger("compass.db")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REGISTRY: list = []
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.labelnames:
+            values = [((), 0)]
+        for labels, value in values:
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (non-cumulative, last is +Inf), sum, count]
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels) -> int:
+        series = self._values.get(labels)
+        return series[2] if series else 0
+
+    def sum(self, *labels) -> float:
+        series = self._values.get(labels)
+        return series[1] if series else 0.0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            values = sorted((labels, ([*counts], total, n)) for labels, (counts, total, n) in self._values.items())
+        bucket_names = self.labelnames + ("le",)
+        for labels, (counts, total, n) in values:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(bucket_names, (*labels, le))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {n}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+http_requests = Counter(
+    "compass_http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status")
+)
+http_request_duration = Histogram(
+    "compass_http_request_duration_seconds", "HTTP request latency.", ("method", "route")
+)
+http_request_db_duration = Histogram(
+    "compass_http_request_db_seconds", "Time spent in SQL per HTTP request.", ("method", "route")
+)
+http_request_db_queries = Histogram(
+    "compass_http_request_db_queries", "SQL statements per HTTP request.", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+pings_ingested = Counter("compass_pings_ingested_total", "Tower pings stored.")
+fobs_auto_registered = Counter("compass_fobs_auto_registered_total", "Fobs registered by their first tower ping.")
+pings_quarantined = Counter(
+    "compass_pings_quarantined_total", "Tower pings quarantined as impossible movement, per tower.", ("tower",)
+)
+tower_pings = Counter("compass_tower_pings_total", "Pings ingested per tower (shared = the shared key).", ("tower",))
+tower_ingest_duration = Histogram(
+    "compass_tower_ingest_seconds", "Time to store and evaluate a ping, per tower.", ("tower",)
+)
+tower_auth_failures = Counter(
+    "compass_tower_auth_failures_total", "Rejected tower keys per tower (unknown = unregistered id).", ("tower",)
+)
+sos_events = Counter("compass_sos_events_total", "Pings received with SOS status.")
+sos_alerts = Counter("compass_sos_alerts_total", "SOS alerts delivered to nearby friends.")
+geofence_events = Counter("compass_geofence_events_total", "Fobs entering or leaving a geofence.", ("kind",))
+fob_signal_events = Counter("compass_fob_signal_events_total", "Claimed fobs losing or regaining signal.", ("kind",))
+walk_alerts = Counter("compass_walk_alerts_total", "Walks found overdue or missing a check-in.", ("kind",))
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- per-request DB accounting -----------------------------------------------
+
+
+class RequestDBStats:
+    """SQL executed on behalf of one request."""
+
+    __slots__ = ("queries", "seconds", "statements")
+
+    def __init__(self, track_statements: bool = False) -> None:
+        self.queries = 0
+        self.seconds = 0.0
+        # statement text -> executions, only kept when N+1 warnings are enabled
+        self.statements: dict[str, int] | None = {} if track_statements else None
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statements executed at least ``threshold`` times, most frequent first."""
+        if not self.statements:
+            return []
+        return sorted(
+            ((statement, n) for statement, n in self.statements.items() if n >= threshold),
+            key=lambda item: -item[1],
+        )
+
+
+# Tags queries with the request they run for. Set by the middleware for the
+# duration of a request; sync endpoints and dependencies run in the threadpool
+# with a copy of the context, which still refers to the same RequestDBStats.
+current_db_stats: ContextVar[RequestDBStats | None] = ContextVar("current_db_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_db_stats.get() is not None:
+        conn.info["query_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_db_stats.get()
+    started = conn.info.pop("query_started", None)
+    if stats is not None and started is not None:
+        stats.seconds += time.perf_counter() - started
+        stats.queries += 1
+        if stats.statements is not None:
+            stats.statements[statement] = stats.statements.get(statement, 0) + 1
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware; unmatched paths are grouped under one route label."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        repeat_threshold = get_settings().QUERY_REPEAT_WARN_THRESHOLD
+        stats = RequestDBStats(track_statements=repeat_threshold > 0)
+        token = current_db_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_db_stats.reset(token)
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "<unmatched>"
+            method = scope["method"]
+            http_requests.inc(method, template, str(status))
+            http_request_duration.observe(elapsed, method, template)
+            http_request_db_duration.observe(stats.seconds, method, template)
+            http_request_db_queries.observe(stats.queries, method, template)
+            for statement, n in stats.repeated(repeat_threshold):
+                logger.warning(
+                    "Possible N+1: %s %s (request %s) ran the same statement %d times: %s",
+                    method, template, current_request_id.get(), n, " ".join(statement.split())[:500],
+                )
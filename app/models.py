@@ -1,8 +1,8 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Boolean, CheckConstraint, DateTime, ForeignKey, Integer, Text, Index, text, Float, desc
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import BigInteger, Boolean, CheckConstraint, DateTime, ForeignKey, Integer, Text, Index, text, Float, desc
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from .db import Base
@@ -20,6 +20,10 @@ class User(Base):
     password_hash: Mapped[str] = mapped_column(Text, nullable=False)
     display_name: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     profile_picture_url: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # {"64": url, "128": url, "256": url} WebP thumbnails of profile_picture_url
+    profile_picture_thumbnails: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
+    # Bumped on every geofence change; ingest compares it against its cached zone index.
+    geofences_version: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, server_default=text("now()")
     )
@@ -93,6 +97,8 @@ class Ping(Base):
     received_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, server_default=text("now()")
     )
+    # The tower that relayed the ping; NULL when it used the shared key
+    tower_id: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
 
     fob: Mapped["Fob"] = relationship("Fob", back_populates="pings")
 
@@ -102,6 +108,46 @@ class Ping(Base):
     )
 
 
+class QuarantinedPing(Base):
+    """A tower ping held back as impossible movement (see app.movement)."""
+
+    __tablename__ = "quarantined_pings"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    fob_uid: Mapped[str] = mapped_column(Text, nullable=False)
+    lat: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    lng: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    status: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+    received_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("now()")
+    )
+    tower_id: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Distance from, and time since, the fob's last accepted ping
+    distance_m: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    elapsed_seconds: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+
+    __table_args__ = (
+        Index("ix_quarantined_pings_fob_uid_received_at", "fob_uid", "received_at"),
+    )
+
+
+class Tower(Base):
+    """A receiver that relays fob pings, authenticated by its own key."""
+
+    __tablename__ = "towers"
+
+    id: Mapped[str] = mapped_column(Text, primary_key=True)
+    name: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    lat: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    lng: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    active: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default=text("true"))
+    # SHA-256 hex of the tower's key (see app.towers)
+    key_hash: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("now()")
+    )
+
+
 class Incident(Base):
     __tablename__ = "incidents"
 
@@ -118,6 +164,13 @@ class Incident(Base):
     lat: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
     lng: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
     description: Mapped[str] = mapped_column(Text, nullable=False)
+    # Grid cell of (lat, lng), see app.geo.cell_id
+    cell: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    cluster_id: Mapped[Optional[str]] = mapped_column(
+        UUID(as_uuid=False),
+        ForeignKey("incident_clusters.id", ondelete="SET NULL"),
+        nullable=True,
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, server_default=text("now()")
     )
@@ -126,5 +179,247 @@ class Incident(Base):
 
     __table_args__ = (
         Index("ix_incidents_reporter_id", "reporter_id"),
+        Index("ix_incidents_cell_created_at", "cell", "created_at"),
+        Index("ix_incidents_cluster_id", "cluster_id"),
+    )
+
+
+class IncidentCluster(Base):
+    """Reports of the same incident: within R meters and T minutes of each other."""
+
+    __tablename__ = "incident_clusters"
+
+    id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        primary_key=True,
+        server_default=text("gen_random_uuid()"),
+    )
+    # Centroid of the attached reports, and its grid cell
+    lat: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    lng: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    cell: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # Description of the first report
+    description: Mapped[str] = mapped_column(Text, nullable=False)
+    report_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("1"))
+    first_reported_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_reported_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_incident_clusters_cell_last_reported_at", "cell", "last_reported_at"),
+        Index("ix_incident_clusters_first_reported_at_desc", desc("first_reported_at"), desc("id")),
     )
 
+
+class Geofence(Base):
+    """A user's safe zone: a polygon of [lat, lng] vertices."""
+
+    __tablename__ = "geofences"
+
+    id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        primary_key=True,
+        server_default=text("gen_random_uuid()"),
+    )
+    user_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    name: Mapped[str] = mapped_column(Text, nullable=False)
+    # [[lat, lng], ...], implicitly closed
+    vertices: Mapped[list] = mapped_column(JSONB, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("now()")
+    )
+
+    __table_args__ = (Index("ix_geofences_user_id", "user_id"),)
+
+
+class GeofenceEvent(Base):
+    """A fob entering or leaving one of its owner's geofences."""
+
+    __tablename__ = "geofence_events"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    geofence_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        ForeignKey("geofences.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    user_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    fob_uid: Mapped[str] = mapped_column(Text, nullable=False)
+    kind: Mapped[str] = mapped_column(Text, nullable=False)  # "enter" | "exit"
+    lat: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    lng: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("now()")
+    )
+
+    __table_args__ = (
+        CheckConstraint("kind IN ('enter', 'exit')", name="geofence_event_kind"),
+        Index("ix_geofence_events_user_id_created_at", "user_id", desc("created_at")),
+        Index("ix_geofence_events_fob_uid_geofence_id_created_at", "fob_uid", "geofence_id", desc("created_at")),
+    )
+
+
+class SosAlert(Base):
+    """An SOS from ``user_id`` delivered to a friend who was nearby at the time."""
+
+    __tablename__ = "sos_alerts"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    user_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    recipient_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    fob_uid: Mapped[str] = mapped_column(Text, nullable=False)
+    lat: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    lng: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    distance_m: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    # 1 = nearest of the friends alerted by this SOS
+    priority: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("now()")
+    )
+
+    __table_args__ = (Index("ix_sos_alerts_recipient_id_created_at", "recipient_id", desc("created_at")),)
+
+
+class Walk(Base):
+    """A SafeWalk: a user heading to a destination, expected by ``expected_arrival_at``."""
+
+    __tablename__ = "walks"
+
+    id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        primary_key=True,
+        server_default=text("gen_random_uuid()"),
+    )
+    user_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    destination: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    dest_lat: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    dest_lng: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    started_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("now()")
+    )
+    expected_arrival_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    # Check-ins are optional; when set, a missed one is counted every interval
+    checkin_interval_seconds: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    checkin_due_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_checkin_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    missed_checkins: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+    overdue_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    ended_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    end_reason: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # "arrived" | "cancelled"
+
+    __table_args__ = (
+        CheckConstraint("end_reason IN ('arrived', 'cancelled')", name="walk_end_reason"),
+        Index("ux_walks_user_id_active", "user_id", unique=True, postgresql_where=text("ended_at IS NULL")),
+        Index("ix_walks_user_id_started_at", "user_id", desc("started_at")),
+    )
+
+
+class AvatarBlob(Base):
+    """An uploaded avatar and its thumbnails, keyed by SHA-256 of the original bytes."""
+
+    __tablename__ = "avatar_blobs"
+
+    content_hash: Mapped[str] = mapped_column(Text, primary_key=True)
+    url: Mapped[str] = mapped_column(Text, nullable=False)
+    thumbnails: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("now()")
+    )
+
+
+class PingRollup(Base):
+    """Hourly per-fob aggregate of pings, filled incrementally by app.rollups."""
+
+    __tablename__ = "ping_rollups"
+
+    fob_uid: Mapped[str] = mapped_column(
+        Text, ForeignKey("fobs.fob_uid", ondelete="CASCADE"), primary_key=True
+    )
+    hour: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    ping_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    first_received_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_received_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    min_lat: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    max_lat: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    min_lng: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    max_lng: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    sum_lat: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    sum_lng: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    max_status: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class JobWatermark(Base):
+    """High-water mark (last processed id) for an incremental background job."""
+
+    __tablename__ = "job_watermarks"
+
+    name: Mapped[str] = mapped_column(Text, primary_key=True)
+    high_water_id: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=text("0"))
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("now()")
+    )
+
+
+class FobSignal(Base):
+    """A fob's last ping, filled incrementally by app.fob_signal."""
+
+    __tablename__ = "fob_signal"
+
+    fob_uid: Mapped[str] = mapped_column(
+        Text, ForeignKey("fobs.fob_uid", ondelete="CASCADE"), primary_key=True
+    )
+    last_seen_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    lat: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    lng: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    # Set when the fob went quiet, cleared by its next ping
+    signal_lost_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_fob_signal_last_seen_at_live", "last_seen_at", postgresql_where=text("signal_lost_at IS NULL")),
+    )
+
+
+class FobSignalEvent(Base):
+    """A claimed fob losing its signal (no pings for a while) or getting it back."""
+
+    __tablename__ = "fob_signal_events"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    fob_uid: Mapped[str] = mapped_column(Text, nullable=False)
+    user_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    kind: Mapped[str] = mapped_column(Text, nullable=False)  # "lost" | "restored"
+    # Its last ping before going quiet (lost) or its latest ping on coming back (restored)
+    last_seen_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    lat: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    lng: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("now()")
+    )
+
+    __table_args__ = (
+        CheckConstraint("kind IN ('lost', 'restored')", name="fob_signal_event_kind"),
+        Index("ix_fob_signal_events_user_id_created_at", "user_id", desc("created_at")),
+    )
@@ -0,0 +1,187 @@
+"""Impossible-movement filter for tower pings.
+
+Tower noise sometimes places a fob kilometres away for a single ping. Ingest
+compares every ping with the fob's last accepted point and quarantines it
+(``quarantined_pings``, so maps, SOS fan-out and rollups never see it) when
+reaching it would take more than ``MOVEMENT_MAX_SPEED_MPS``. The first
+``MOVEMENT_NOISE_M`` of any move are free, so jitter between pings seconds
+apart isn't flagged.
+
+A fob that really did move (or whose last accepted point was itself noise)
+isn't locked out: a quarantined ping is remembered, and the next ping that is
+plausible from it is accepted, so a relocation costs one quarantined ping.
+SOS pings are never quarantined.
+
+``movement_filter`` keeps each fob's last accepted point in memory (LRU), so
+screening a ping needs no query. A fob it doesn't know (first ping, or first
+since a restart or eviction) is accepted as is. Each worker process has its
+own cache; a fob whose pings alternate between workers is compared with older
+points, which only makes the filter more lenient.
+
+``MovementFilter.check_batch`` applies the same rule to whole batches with
+NumPy; ``scripts/replay_movement_filter.py`` uses it to measure the flag and
+false-positive rates of a threshold on recorded pings.
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from .geo import distance_m, pairwise_haversine_m
+from .settings import get_settings
+
+
+MAX_TRACKED_FOBS = 200_000
+
+
+@dataclass(frozen=True)
+class Fix:
+    lat: float
+    lng: float
+    at: float  # unix time
+
+
+@dataclass(frozen=True)
+class Jump:
+    """An implausible move from a fob's last accepted point."""
+
+    distance_m: float
+    seconds: float
+
+
+def plausible(fix: Fix, lat: float, lng: float, at: float, max_speed_mps: float, noise_m: float) -> bool:
+    return distance_m(fix.lat, fix.lng, lat, lng) - noise_m <= max_speed_mps * max(at - fix.at, 0.0)
+
+
+class MovementFilter:
+    """Last accepted point per fob (LRU), plus the last quarantined one since."""
+
+    def __init__(self, max_fobs: int = MAX_TRACKED_FOBS) -> None:
+        self.max_fobs = max_fobs
+        self._fixes: OrderedDict[str, tuple[Fix, Fix | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._fixes)
+
+    def get(self, fob_uid: str) -> tuple[Fix, Fix | None] | None:
+        with self._lock:
+            return self._fixes.get(fob_uid)
+
+    def check(
+        self, fob_uid: str, lat: float, lng: float, at: float, max_speed_mps: float, noise_m: float
+    ) -> Jump | None:
+        """The implausible move this ping implies, or ``None`` to accept it."""
+        fixes = self.get(fob_uid)
+        if fixes is None:
+            return None
+        accepted, quarantined = fixes
+        if plausible(accepted, lat, lng, at, max_speed_mps, noise_m):
+            return None
+        # Agrees with the ping quarantined before it: the fob really moved.
+        if quarantined is not None and plausible(quarantined, lat, lng, at, max_speed_mps, noise_m):
+            return None
+        return Jump(distance_m(accepted.lat, accepted.lng, lat, lng), at - accepted.at)
+
+    def record(self, fob_uid: str, lat: float, lng: float, at: float, accepted: bool) -> None:
+        """Remember a ping's outcome; call after it is committed."""
+        fix = Fix(lat, lng, at)
+        with self._lock:
+            if accepted:
+                self._fixes[fob_uid] = (fix, None)
+            else:
+                fixes = self._fixes.get(fob_uid)
+                if fixes is None:
+                    return
+                self._fixes[fob_uid] = (fixes[0], fix)
+            self._fixes.move_to_end(fob_uid)
+            while len(self._fixes) > self.max_fobs:
+                self._fixes.popitem(last=False)
+
+    def check_batch(self, fob_uids, lats, lngs, ats, max_speed_mps: float, noise_m: float, always_accept=None):
+        """Screen and record a batch of pings; returns a boolean array, True where accepted.
+
+        Pings where the optional boolean array ``always_accept`` is true (SOS
+        pings, at ingest) are accepted unscreened. Gives the same verdicts as
+        ``check`` and ``record`` on each ping in time order. A fob's pings
+        depend on each other, so the batch is processed in rounds: round ``k``
+        screens every fob's ``k``-th ping at once, and the number of rounds is
+        the most pings any one fob has.
+        """
+        import numpy as np
+
+        lats = np.asarray(lats, dtype=float)
+        lngs = np.asarray(lngs, dtype=float)
+        ats = np.asarray(ats, dtype=float)
+        n = len(ats)
+        forced = np.zeros(n, dtype=bool) if always_accept is None else np.asarray(always_accept, dtype=bool)
+        accepted = np.ones(n, dtype=bool)
+        if n == 0:
+            return accepted
+        uids, fob_idx = np.unique(np.asarray(fob_uids, dtype=object).astype(str), return_inverse=True)
+
+        # Per-fob state: last accepted and last quarantined point (NaN when unknown).
+        state = np.full((6, len(uids)), np.nan)
+        with self._lock:
+            for i, fob_uid in enumerate(uids):
+                fixes = self._fixes.get(fob_uid)
+                if fixes is not None:
+                    state[:3, i] = fixes[0].lat, fixes[0].lng, fixes[0].at
+                    if fixes[1] is not None:
+                        state[3:, i] = fixes[1].lat, fixes[1].lng, fixes[1].at
+        acc_lat, acc_lng, acc_at, q_lat, q_lng, q_at = state
+
+        order = np.lexsort((ats, fob_idx))
+        sorted_fobs = fob_idx[order]
+        starts = np.flatnonzero(np.r_[True, sorted_fobs[1:] != sorted_fobs[:-1]])
+        rank = np.arange(n) - np.repeat(starts, np.diff(np.r_[starts, n]))
+        by_round = order[np.argsort(rank, kind="stable")]
+        round_sizes = np.bincount(rank)
+
+        offset = 0
+        for size in round_sizes:
+            idx = by_round[offset:offset + size]
+            offset += size
+            f = fob_idx[idx]
+            lat, lng, at = lats[idx], lngs[idx], ats[idx]
+            ok = np.isnan(acc_at[f]) | forced[idx]
+            for s_lat, s_lng, s_at in ((acc_lat, acc_lng, acc_at), (q_lat, q_lng, q_at)):
+                known = ~np.isnan(s_at[f])
+                moved = pairwise_haversine_m(s_lat[f], s_lng[f], lat, lng) - noise_m
+                with np.errstate(invalid="ignore"):
+                    ok |= known & (moved <= max_speed_mps * np.maximum(at - s_at[f], 0.0))
+            accepted[idx] = ok
+            # As in record(): an accepted ping replaces the last accepted point
+            # and forgets the quarantined one; a quarantined ping replaces that.
+            acc_lat[f] = np.where(ok, lat, acc_lat[f])
+            acc_lng[f] = np.where(ok, lng, acc_lng[f])
+            acc_at[f] = np.where(ok, at, acc_at[f])
+            q_lat[f] = np.where(ok, np.nan, lat)
+            q_lng[f] = np.where(ok, np.nan, lng)
+            q_at[f] = np.where(ok, np.nan, at)
+
+        with self._lock:
+            for i, fob_uid in enumerate(uids):
+                accepted_fix = Fix(float(acc_lat[i]), float(acc_lng[i]), float(acc_at[i]))
+                quarantined_fix = None
+                if not np.isnan(q_at[i]):
+                    quarantined_fix = Fix(float(q_lat[i]), float(q_lng[i]), float(q_at[i]))
+                self._fixes[fob_uid] = (accepted_fix, quarantined_fix)
+                self._fixes.move_to_end(fob_uid)
+            while len(self._fixes) > self.max_fobs:
+                self._fixes.popitem(last=False)
+        return accepted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._fixes.clear()
+
+
+movement_filter = MovementFilter()
+
+
+def screen_ping(fob_uid: str, lat: float, lng: float, at: float) -> Jump | None:
+    """Check a ping against ``movement_filter`` with the configured limits; ``None`` accepts it."""
+    settings = get_settings()
+    if settings.MOVEMENT_MAX_SPEED_MPS <= 0:
+        return None
+    return movement_filter.check(fob_uid, lat, lng, at, settings.MOVEMENT_MAX_SPEED_MPS, settings.MOVEMENT_NOISE_M)
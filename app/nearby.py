@@ -0,0 +1,146 @@
+"""Nearby incident clusters: grid-cell pruning, a per-cell TTL cache and exact filtering.
+
+Reads return one row per cluster (see ``app.incident_clusters``), matched on
+the cluster centroid and its ``last_reported_at``. Candidates come from the
+grid cells covering the search circle (index
+``ix_incident_clusters_cell_last_reported_at``). For the common case (``since``
+within the last ``CACHE_WINDOW``) each cell's clusters from that window are cached
+in-process for ``INCIDENT_CACHE_TTL_SECONDS``, so many viewers polling the same
+campus area share one query per cell and TTL; older ``since`` values query
+Postgres directly. The exact radius and ``since`` filters run vectorized in
+NumPy.
+
+A new report invalidates its cluster's cell(s) in the reporting process; other processes
+see it after at most one TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .geo import cells_within, haversine_m
+from .settings import get_settings
+
+
+NEARBY_MAX_AGE = timedelta(days=7)
+DEFAULT_LOOKBACK = timedelta(hours=24)
+# Slightly wider than the default lookback so default queries always hit the cache.
+CACHE_WINDOW = DEFAULT_LOOKBACK + timedelta(hours=1)
+MAX_CACHED_CELLS = 4096
+
+NEARBY_CELLS_SQL = text(
+    """
+    SELECT id, lat, lng, cell, description, report_count, first_reported_at, last_reported_at
+    FROM incident_clusters
+    WHERE cell = ANY(:cells) AND last_reported_at >= :since
+    """
+)
+
+
+class CellEntry:
+    """Clusters of one cell, with columns as arrays for vectorized filtering."""
+
+    __slots__ = ("rows", "lats", "lngs", "last_reported", "fetched_at")
+
+    def __init__(self, rows: list[dict], fetched_at: float) -> None:
+        import numpy as np
+
+        self.rows = rows
+        self.lats = np.fromiter((row["lat"] for row in rows), dtype=float, count=len(rows))
+        self.lngs = np.fromiter((row["lng"] for row in rows), dtype=float, count=len(rows))
+        self.last_reported = np.fromiter(
+            (row["last_reported_at"].timestamp() for row in rows), dtype=float, count=len(rows)
+        )
+        self.fetched_at = fetched_at
+
+
+class IncidentCellCache:
+    """LRU of ``CellEntry`` by cell id, each valid for ``ttl`` seconds."""
+
+    def __init__(self, max_cells: int = MAX_CACHED_CELLS) -> None:
+        self.max_cells = max_cells
+        self._entries: OrderedDict[int, CellEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, cells: list[int], ttl: float) -> tuple[dict[int, CellEntry], list[int]]:
+        now = time.monotonic()
+        found: dict[int, CellEntry] = {}
+        missing: list[int] = []
+        with self._lock:
+            for cell in cells:
+                entry = self._entries.get(cell)
+                if entry is not None and now - entry.fetched_at < ttl:
+                    self._entries.move_to_end(cell)
+                    found[cell] = entry
+                else:
+                    missing.append(cell)
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def put_many(self, entries: dict[int, CellEntry]) -> None:
+        with self._lock:
+            for cell, entry in entries.items():
+                self._entries[cell] = entry
+                self._entries.move_to_end(cell)
+            while len(self._entries) > self.max_cells:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, cell: int) -> None:
+        with self._lock:
+            self._entries.pop(cell, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+incident_cell_cache = IncidentCellCache()
+
+
+def _load_cells(db: Session, cells: list[int], since: datetime) -> dict[int, CellEntry]:
+    fetched_at = time.monotonic()
+    by_cell: dict[int, list[dict]] = {cell: [] for cell in cells}
+    for row in db.execute(NEARBY_CELLS_SQL, {"cells": cells, "since": since}).mappings():
+        by_cell[row["cell"]].append(dict(row))
+    return {cell: CellEntry(cell_rows, fetched_at) for cell, cell_rows in by_cell.items()}
+
+
+def nearby_clusters(
+    db: Session, lat: float, lng: float, radius_m: float, since: datetime, limit: int = 200
+) -> list[tuple[dict, float]]:
+    """Clusters centred within ``radius_m`` of (lat, lng) reported on at or after ``since``.
+
+    Returns ``(row, distance_m)`` pairs, nearest first.
+    """
+    import numpy as np
+
+    ttl = get_settings().INCIDENT_CACHE_TTL_SECONDS
+    cells = cells_within(lat, lng, radius_m)
+    cache_since = datetime.now(timezone.utc) - CACHE_WINDOW
+    if ttl > 0 and since >= cache_since:
+        entries, missing = incident_cell_cache.get_many(cells, ttl)
+        if missing:
+            loaded = _load_cells(db, missing, cache_since)
+            incident_cell_cache.put_many(loaded)
+            entries.update(loaded)
+    else:
+        entries = _load_cells(db, cells, since)
+
+    candidates = [entry for entry in entries.values() if entry.rows]
+    if not candidates:
+        return []
+    rows = [row for entry in candidates for row in entry.rows]
+    distances = haversine_m(
+        lat, lng, np.concatenate([e.lats for e in candidates]), np.concatenate([e.lngs for e in candidates])
+    )
+    last_reported = np.concatenate([e.last_reported for e in candidates])
+    (matches,) = np.nonzero((distances <= radius_m) & (last_reported >= since.timestamp()))
+    nearest = matches[np.argsort(distances[matches], kind="stable")][:limit]
+    return [(rows[i], float(distances[i])) for i in nearest]
@@ -0,0 +1,57 @@
+"""Request correlation IDs.
+
+``RequestIDMiddleware`` takes the caller's ``X-Request-ID`` (if it looks sane)
+or generates one, echoes it on the response and exposes it through
+``current_request_id`` for the duration of the request. The slow-query log and
+the SQL comments added to each statement (see ``app.slow_queries``) use it to
+tie database activity back to the request.
+"""
+import re
+import uuid
+from contextvars import ContextVar
+
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Restricted so IDs are safe to embed in SQL comments and log lines.
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._-]{1,128}")
+
+current_request_id: ContextVar[str | None] = ContextVar("current_request_id", default=None)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+class RequestIDMiddleware:
+    """Pure ASGI middleware; install outermost so every other layer sees the ID."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._header = REQUEST_ID_HEADER.lower().encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == self._header:
+                candidate = value.decode("latin-1")
+                if _VALID_REQUEST_ID.fullmatch(candidate):
+                    request_id = candidate
+                break
+        if request_id is None:
+            request_id = new_request_id()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), (self._header, request_id.encode())]
+            await send(message)
+
+        token = current_request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request_id.reset(token)
@@ -0,0 +1,129 @@
+"""Hourly ping rollups.
+
+``ping_rollups`` holds one row per fob per UTC hour (count, first/last
+received_at, bounding box, coordinate sums for the centroid, max status). It is
+filled incrementally from ``pings`` using a high-water mark on ``pings.id``
+stored in ``job_watermarks``, so each run only reads new pings and multi-week
+history reads a few hundred rollup rows instead of every raw ping.
+
+Run from cron with ``python -m app.rollups`` or in-process by setting
+``ROLLUP_INTERVAL_SECONDS``.
+"""
+from datetime import datetime
+from typing import Literal
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .db import session_scope
+from .jobs import NEW_PINGS_BATCH, advance_watermark, lock_watermark
+from .settings import get_settings
+
+
+JOB_NAME = "ping_rollups"
+
+_ROLLUP_BATCH_SQL = text(
+    f"""
+    WITH batch AS ({NEW_PINGS_BATCH}),
+    merged AS (
+        INSERT INTO ping_rollups AS r (
+            fob_uid, hour, ping_count, first_received_at, last_received_at,
+            min_lat, max_lat, min_lng, max_lng, sum_lat, sum_lng, max_status
+        )
+        SELECT
+            fob_uid,
+            date_trunc('hour', received_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+            count(*), min(received_at), max(received_at),
+            min(lat), max(lat), min(lng), max(lng), sum(lat), sum(lng), max(status)
+        FROM batch
+        GROUP BY 1, 2
+        ON CONFLICT (fob_uid, hour) DO UPDATE SET
+            ping_count = r.ping_count + EXCLUDED.ping_count,
+            first_received_at = LEAST(r.first_received_at, EXCLUDED.first_received_at),
+            last_received_at = GREATEST(r.last_received_at, EXCLUDED.last_received_at),
+            min_lat = LEAST(r.min_lat, EXCLUDED.min_lat),
+            max_lat = GREATEST(r.max_lat, EXCLUDED.max_lat),
+            min_lng = LEAST(r.min_lng, EXCLUDED.min_lng),
+            max_lng = GREATEST(r.max_lng, EXCLUDED.max_lng),
+            sum_lat = r.sum_lat + EXCLUDED.sum_lat,
+            sum_lng = r.sum_lng + EXCLUDED.sum_lng,
+            max_status = GREATEST(r.max_status, EXCLUDED.max_status)
+    )
+    SELECT count(*) AS processed, max(id) AS max_id FROM batch
+    """
+)
+
+_HISTORY_SQL = text(
+    """
+    SELECT
+        date_trunc(:bucket, hour AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket_start,
+        sum(ping_count) AS ping_count,
+        min(first_received_at) AS first_received_at,
+        max(last_received_at) AS last_received_at,
+        min(min_lat) AS min_lat,
+        max(max_lat) AS max_lat,
+        min(min_lng) AS min_lng,
+        max(max_lng) AS max_lng,
+        sum(sum_lat) / sum(ping_count) AS centroid_lat,
+        sum(sum_lng) / sum(ping_count) AS centroid_lng,
+        max(max_status) AS max_status
+    FROM ping_rollups
+    WHERE fob_uid = :fob_uid
+      AND hour >= date_trunc('hour', CAST(:since AS timestamptz) AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+      AND hour < :until
+    GROUP BY 1
+    ORDER BY 1
+    """
+)
+
+
+def rollup_pings(db: Session, batch_size: int = 50_000, settle_seconds: float = 30.0) -> int:
+    """Fold the next batch of new pings into ``ping_rollups``; returns pings processed.
+
+    Runs in the caller's transaction. The watermark row is locked for the
+    duration, so concurrent runs serialize instead of double counting.
+    """
+    high_water_id = lock_watermark(db, JOB_NAME)
+    row = db.execute(
+        _ROLLUP_BATCH_SQL,
+        {"high_water_id": high_water_id, "batch_size": batch_size, "settle_seconds": settle_seconds},
+    ).one()
+    if row.processed:
+        advance_watermark(db, JOB_NAME, row.max_id)
+    return row.processed
+
+
+def run_rollups(max_batches: int = 20) -> int:
+    """Catch up on new pings, one committed batch at a time."""
+    settings = get_settings()
+    total = 0
+    for _ in range(max_batches):
+        with session_scope() as db:
+            processed = rollup_pings(db, settings.ROLLUP_BATCH_SIZE, settings.ROLLUP_SETTLE_SECONDS)
+        total += processed
+        if processed < settings.ROLLUP_BATCH_SIZE:
+            break
+    return total
+
+
+def fob_history(
+    db: Session,
+    fob_uid: str,
+    since: datetime,
+    until: datetime,
+    bucket: Literal["hour", "day"] = "hour",
+) -> list[dict]:
+    """Per-bucket activity for ``fob_uid`` in [since, until), from rollups only.
+
+    Pings newer than the last rollup run are not included.
+    """
+    if bucket not in ("hour", "day"):
+        raise ValueError("bucket must be 'hour' or 'day'")
+    rows = db.execute(
+        _HISTORY_SQL, {"bucket": bucket, "fob_uid": fob_uid, "since": since, "until": until}
+    ).mappings().all()
+    return [dict(row) for row in rows]
+
+
+if __name__ == "__main__":
+    print(f"Rolled up {run_rollups()} pings")
@@ -0,0 +1,216 @@
+"""Incident density along a walking route.
+
+A route is a polyline of (lat, lng) vertices. Incident clusters (one row per
+incident, see ``app.incident_clusters``) whose centroid lies within
+``buffer_m`` of any segment count towards the route, each weighted by
+``0.5 ** (age / half_life)`` of its ``last_reported_at``.
+
+Candidates come from the grid cells covering the corridor (index
+``ix_incident_clusters_cell_last_reported_at``). A corridor can hold tens of
+thousands of clusters, and decoding that many result rows costs far more than
+the query, so Postgres packs the three columns into binary float8 arrays
+(``ROUTE_CANDIDATES_SQL``) that load straight into NumPy.
+
+Distances are computed in a local equirectangular projection around the
+route, which is accurate to well under a meter at walking-route scale. Rather
+than a full candidates x segments matrix, candidates are sorted along the
+route's longer axis and each segment only pairs with the slice of candidates
+inside its buffered extent on that axis; all pairs are then evaluated in one
+vectorized pass (in chunks of at most ``MAX_PAIRS_PER_CHUNK``).
+"""
+import math
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .geo import METERS_PER_DEG_LAT, cells_within
+
+
+# Vertices are sampled at most this far apart when collecting corridor cells;
+# each sample covers buffer_m + COVER_STEP_M / 2 so the samples' cells cover the corridor.
+COVER_STEP_M = 500.0
+# Segments are indexed in squares of max(buffer_m, MIN_GRID_M) meters.
+MIN_GRID_M = 25.0
+MAX_PAIRS_PER_CHUNK = 2_000_000
+MAX_ROUTE_LENGTH_M = 50_000.0
+
+ROUTE_CANDIDATES_SQL = text(
+    """
+    SELECT string_agg(float8send(lat), ''::bytea) AS lats,
+           string_agg(float8send(lng), ''::bytea) AS lngs,
+           string_agg(float8send(extract(epoch FROM last_reported_at)::float8), ''::bytea) AS last_reported
+    FROM incident_clusters
+    WHERE cell = ANY(:cells) AND last_reported_at >= :since
+    """
+)
+
+
+class RouteTooLong(ValueError):
+    pass
+
+
+@dataclass
+class RouteScore:
+    length_m: float
+    incident_count: int
+    score: float  # time-decayed incident count
+    density_per_km2: float  # score per km^2 of corridor
+    segment_scores: list[float]  # score attributed to each segment (nearest segment wins)
+
+
+def corridor_cells(lats, lngs, buffer_m: float) -> list[int]:
+    """Grid cells covering every point within ``buffer_m`` of the polyline.
+
+    Raises ``RouteTooLong`` past ``MAX_ROUTE_LENGTH_M``.
+    """
+    cells: set[int] = set()
+    total = 0.0
+    for i in range(len(lats)):
+        cells.update(cells_within(lats[i], lngs[i], buffer_m))
+    for i in range(len(lats) - 1):
+        dlat, dlng = lats[i + 1] - lats[i], _wrap(lngs[i + 1] - lngs[i])
+        cos_lat = math.cos(math.radians((lats[i] + lats[i + 1]) / 2))
+        length = math.hypot(dlat, dlng * cos_lat) * METERS_PER_DEG_LAT
+        total += length
+        if total > MAX_ROUTE_LENGTH_M:
+            raise RouteTooLong(total)
+        steps = math.ceil(length / COVER_STEP_M)
+        for k in range(1, steps):
+            f = k / steps
+            cells.update(cells_within(lats[i] + dlat * f, _wrap(lngs[i] + dlng * f), buffer_m + COVER_STEP_M / 2))
+    return sorted(cells)
+
+
+def _wrap(dlng):
+    return (dlng + 180.0) % 360.0 - 180.0
+
+
+def _project(lat0: float, lng0: float, lats, lngs):
+    """Meters east/north of (lat0, lng0)."""
+    import numpy as np
+
+    scale = METERS_PER_DEG_LAT * math.cos(math.radians(lat0))
+    x = _wrap(np.asarray(lngs, dtype=float) - lng0) * scale
+    y = (np.asarray(lats, dtype=float) - lat0) * METERS_PER_DEG_LAT
+    return x, y
+
+
+def score_points(
+    route_lats,
+    route_lngs,
+    lats,
+    lngs,
+    last_reported,
+    buffer_m: float,
+    now_ts: float,
+    half_life_s: float,
+) -> RouteScore:
+    """Score candidate points (arrays) against a route; the pure-NumPy core of ``score_route``."""
+    import numpy as np
+
+    route_lats = np.asarray(route_lats, dtype=float)
+    route_lngs = np.asarray(route_lngs, dtype=float)
+    lat0, lng0 = float(route_lats.mean()), float(route_lngs[0])
+    rx, ry = _project(lat0, lng0, route_lats, route_lngs)
+    ax, ay, dx, dy = rx[:-1], ry[:-1], np.diff(rx), np.diff(ry)
+    seg_len2 = dx * dx + dy * dy
+    seg_len = np.sqrt(seg_len2)
+    length_m = float(seg_len.sum())
+    n_segments = len(seg_len)
+
+    qx, qy = _project(lat0, lng0, lats, lngs)
+    best = np.full(len(qx), np.inf)
+    best_segment = np.zeros(len(qx), dtype=np.int64)
+
+    # Index segments by a grid of ``g``-meter squares: split each segment into
+    # pieces no longer than g and register it in every square its pieces'
+    # buffered bounding boxes touch (at most 3x3 per piece).
+    g = max(buffer_m, MIN_GRID_M)
+    x0, y0 = rx.min() - buffer_m, ry.min() - buffer_m
+    nx = int((rx.max() + buffer_m - x0) // g) + 1
+    pieces = np.maximum(np.ceil(seg_len / g), 1).astype(np.int64)
+    piece_seg = np.repeat(np.arange(n_segments), pieces)
+    k = np.arange(len(piece_seg)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    t0, t1 = k / pieces[piece_seg], (k + 1) / pieces[piece_seg]
+    px0, px1 = ax[piece_seg] + t0 * dx[piece_seg], ax[piece_seg] + t1 * dx[piece_seg]
+    py0, py1 = ay[piece_seg] + t0 * dy[piece_seg], ay[piece_seg] + t1 * dy[piece_seg]
+    ix0 = ((np.minimum(px0, px1) - buffer_m - x0) // g).astype(np.int64)
+    ix1 = ((np.maximum(px0, px1) + buffer_m - x0) // g).astype(np.int64)
+    iy0 = ((np.minimum(py0, py1) - buffer_m - y0) // g).astype(np.int64)
+    iy1 = ((np.maximum(py0, py1) + buffer_m - y0) // g).astype(np.int64)
+    width, squares = ix1 - ix0 + 1, (ix1 - ix0 + 1) * (iy1 - iy0 + 1)
+    j = np.arange(squares.sum()) - np.repeat(np.cumsum(squares) - squares, squares)
+    owner = np.repeat(np.arange(len(piece_seg)), squares)
+    square = (iy0[owner] + j // width[owner]) * nx + ix0[owner] + j % width[owner]
+    entries = np.unique(square * n_segments + piece_seg[owner])
+    entry_square, entry_seg = entries // n_segments, entries % n_segments
+
+    # Pair each candidate with the segments registered in its square.
+    cx, cy = ((qx - x0) // g).astype(np.int64), ((qy - y0) // g).astype(np.int64)
+    starts = np.searchsorted(entry_square, cy * nx + cx, side="left")
+    counts = np.searchsorted(entry_square, cy * nx + cx, side="right") - starts
+    counts[(cx < 0) | (cx >= nx) | (cy < 0)] = 0
+
+    first = 0
+    while first < len(qx):
+        # Grow the chunk until it would exceed the pair budget (at least one candidate).
+        cum = np.cumsum(counts[first:])
+        last = first + max(int(np.searchsorted(cum, MAX_PAIRS_PER_CHUNK, side="right")), 1)
+        chunk_counts = counts[first:last]
+        total = int(chunk_counts.sum())
+        if total:
+            cand = np.repeat(np.arange(first, last), chunk_counts)
+            offsets = np.cumsum(chunk_counts) - chunk_counts
+            segs = entry_seg[np.arange(total) + np.repeat(starts[first:last] - offsets, chunk_counts)]
+
+            px, py = qx[cand] - ax[segs], qy[cand] - ay[segs]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                t = (px * dx[segs] + py * dy[segs]) / seg_len2[segs]
+            t = np.clip(np.nan_to_num(t, nan=0.0), 0.0, 1.0)
+            dist = np.hypot(px - t * dx[segs], py - t * dy[segs])
+
+            # Nearest segment per candidate: min distance, then the segment that attains it.
+            np.minimum.at(best, cand, dist)
+            attained = dist == best[cand]
+            best_segment[cand[attained]] = segs[attained]
+        first = last
+
+    inside = best <= buffer_m
+    ages = np.maximum(now_ts - np.asarray(last_reported, dtype=float)[inside], 0.0)
+    weights = np.power(0.5, ages / half_life_s)
+    score = float(weights.sum())
+    segment_scores = np.bincount(best_segment[inside], weights=weights, minlength=n_segments)
+    area_km2 = (2 * buffer_m * length_m + math.pi * buffer_m * buffer_m) / 1e6
+    return RouteScore(
+        length_m=length_m,
+        incident_count=int(inside.sum()),
+        score=score,
+        density_per_km2=score / area_km2,
+        segment_scores=[float(s) for s in segment_scores],
+    )
+
+
+def score_route(
+    db: Session,
+    route_lats: list[float],
+    route_lngs: list[float],
+    buffer_m: float,
+    since: datetime,
+    now: datetime,
+    half_life_s: float,
+) -> RouteScore:
+    """Time-decayed density of clusters reported on since ``since`` within ``buffer_m`` of the route."""
+    import numpy as np
+
+    row = db.execute(
+        ROUTE_CANDIDATES_SQL, {"cells": corridor_cells(route_lats, route_lngs, buffer_m), "since": since}
+    ).one()
+    # float8send is big-endian; string_agg over no rows is NULL.
+    lats, lngs, last_reported = (
+        np.frombuffer(column or b"", dtype=">f8").astype(float) for column in row
+    )
+    return score_points(
+        route_lats, route_lngs, lats, lngs, last_reported, buffer_m, now.timestamp(), half_life_s
+    )
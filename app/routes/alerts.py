@@ -0,0 +1,98 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..db import get_read_db
+from ..deps import LOCATION_SHARERS_SQL, get_current_user_read
+from ..models import User
+
+
+router = APIRouter(prefix="/alerts", tags=["alerts"])
+
+
+class SosAlertOut(BaseModel):
+    id: int
+    user_id: str  # the friend in distress
+    username: str
+    fob_uid: str
+    lat: float
+    lng: float
+    distance_m: float  # from the caller's last known position
+    priority: int  # 1 = the nearest friend alerted by this SOS
+    created_at: datetime
+
+
+class SosAlertsResponse(BaseModel):
+    alerts: list[SosAlertOut]
+
+
+class SignalEventOut(BaseModel):
+    id: int
+    user_id: str
+    username: str
+    fob_uid: str
+    kind: str  # "lost" | "restored"
+    last_seen_at: datetime
+    lat: float
+    lng: float
+    created_at: datetime
+
+
+class SignalEventsResponse(BaseModel):
+    events: list[SignalEventOut]
+
+
+SOS_ALERTS_SQL = text(
+    """
+    SELECT a.id, a.user_id, u.username, a.fob_uid, a.lat, a.lng, a.distance_m, a.priority, a.created_at
+    FROM sos_alerts AS a
+    JOIN users AS u ON u.id = a.user_id
+    WHERE a.recipient_id = :current_user_id
+    ORDER BY a.created_at DESC, a.id DESC
+    LIMIT :limit
+    """
+)
+
+
+# The caller's own fob plus those of friends who share their location with them.
+SIGNAL_EVENTS_SQL = text(
+    f"""
+    SELECT e.id, e.user_id, u.username, e.fob_uid, e.kind, e.last_seen_at, e.lat, e.lng, e.created_at
+    FROM fob_signal_events AS e
+    JOIN users AS u ON u.id = e.user_id
+    WHERE e.user_id = :current_user_id
+       OR e.user_id IN ({LOCATION_SHARERS_SQL})
+    ORDER BY e.created_at DESC, e.id DESC
+    LIMIT :limit
+    """
+)
+
+
+@router.get("/sos", response_model=SosAlertsResponse)
+def list_sos_alerts(
+    limit: int = Query(50, ge=1, le=100),
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db),
+):
+    """SOS alerts sent to the caller because they were near a friend in distress, newest first."""
+    rows = db.execute(SOS_ALERTS_SQL, {"current_user_id": current_user.id, "limit": limit}).mappings().all()
+    return SosAlertsResponse(
+        alerts=[
+            SosAlertOut(**{**row, "user_id": str(row["user_id"]), "distance_m": round(row["distance_m"], 1)})
+            for row in rows
+        ]
+    )
+
+
+@router.get("/signal", response_model=SignalEventsResponse)
+def list_signal_events(
+    limit: int = Query(50, ge=1, le=100),
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db),
+):
+    """Fobs of the caller and of friends sharing their location with them losing or regaining signal, newest first."""
+    rows = db.execute(SIGNAL_EVENTS_SQL, {"current_user_id": current_user.id, "limit": limit}).mappings().all()
+    return SignalEventsResponse(events=[SignalEventOut(**{**row, "user_id": str(row["user_id"])}) for row in rows])
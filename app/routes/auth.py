@@ -1,12 +1,15 @@
+import asyncio
+
 from fastapi import APIRouter, Depends, status, File, Form, UploadFile
 from pydantic import BaseModel
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 from ..auth import hash_password, verify_password, create_access_token
 from ..db import get_db
-from ..deps import error_response, get_current_user
-from ..models import User
+from ..deps import error_response, get_current_user, get_current_user_read
+from ..models import AvatarBlob, User
 from ..settings import get_settings
 
 
@@ -34,6 +37,7 @@ class ProfileOut(BaseModel):
     username: str
     display_name: str | None = None
     profile_picture_url: str | None = None
+    profile_picture_thumbnails: dict[str, str] | None = None
 
 
 _ALLOWED_BLOB_HOSTS = {"public.blob.vercel-storage.com", "blob.vercel-storage.com"}
@@ -48,7 +52,6 @@ def signup(payload: SignupRequest, db: Session = Depends(get_db)):
     user = User(username=payload.username, password_hash=hash_password(payload.password))
     db.add(user)
     db.commit()
-    db.refresh(user)
 
     token = create_access_token(user_id=user.id, username=user.username)
     return AuthResponse(access_token=token, user=UserOut(id=user.id, username=user.username))
@@ -66,7 +69,7 @@ def login(payload: SignupRequest, db: Session = Depends(get_db)):
 
 @router.get("/me", response_model=ProfileOut)
 def get_profile(
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_read),
 ):
     """Get the current user's profile."""
     return ProfileOut(
@@ -74,9 +77,64 @@ def get_profile(
         username=current_user.username,
         display_name=current_user.display_name,
         profile_picture_url=current_user.profile_picture_url,
+        profile_picture_thumbnails=current_user.profile_picture_thumbnails,
     )
 
 
+async def _put_avatar_blob(pathname: str, content: bytes, content_type: str, token: str) -> str:
+    """Upload one avatar object and return its public URL."""
+    from .. import storage
+
+    try:
+        upload_response = await storage.put_blob(pathname, content, content_type, token)
+    except Exception as e:
+        error_response(
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+            "UPLOAD_ERROR",
+            f"Upload failed: {str(e)}",
+        )
+
+    if upload_response.status_code not in (200, 201):
+        error_response(
+            status.HTTP_502_BAD_GATEWAY,
+            "UPLOAD_FAILED",
+            f"Failed to upload to blob storage: {upload_response.status_code} {upload_response.text}",
+        )
+
+    # Use the actual URL returned by Vercel Blob
+    public_blob_url = upload_response.json().get("url", "")
+    if not public_blob_url:
+        error_response(
+            status.HTTP_502_BAD_GATEWAY,
+            "UPLOAD_FAILED",
+            "Blob storage did not return a URL",
+        )
+    return public_blob_url
+
+
+def _save_profile(
+    db: Session, user: User, display_name: str | None, avatar: AvatarBlob | None, new_avatar: bool
+) -> None:
+    if avatar is not None:
+        if new_avatar:
+            # Concurrent identical uploads race to the same row; either one wins.
+            db.execute(
+                pg_insert(AvatarBlob)
+                .values(content_hash=avatar.content_hash, url=avatar.url, thumbnails=avatar.thumbnails)
+                .on_conflict_do_nothing(index_elements=[AvatarBlob.content_hash])
+            )
+        user.profile_picture_url = avatar.url
+        user.profile_picture_thumbnails = avatar.thumbnails
+
+    # Update display name if provided
+    if display_name is not None:
+        user.display_name = display_name
+
+    # Save changes to database
+    db.add(user)
+    db.commit()
+
+
 @router.patch("/me", response_model=ProfileOut)
 async def update_profile(
     display_name: str | None = Form(None),
@@ -85,10 +143,13 @@ async def update_profile(
     db: Session = Depends(get_db),
 ):
     """Update the current user's display_name and/or profile_picture via multipart/form-data."""
-    import time
-    from urllib.parse import quote
-    import httpx
-    
+    from fastapi.concurrency import run_in_threadpool
+
+    from .. import avatars, storage
+
+    avatar: AvatarBlob | None = None
+    new_avatar = False
+
     # Handle profile picture upload if provided
     if profile_picture is not None:
         settings = get_settings()
@@ -101,84 +162,72 @@ async def update_profile(
             )
 
         # Validate file type
-        allowed_types = {"image/jpeg", "image/png", "image/webp"}
-        if not profile_picture.content_type or profile_picture.content_type not in allowed_types:
+        if profile_picture.content_type not in storage.AVATAR_TYPES:
             error_response(
                 status.HTTP_400_BAD_REQUEST,
                 "INVALID_FILE_TYPE",
                 "File must be an image (JPEG, PNG, or WebP)",
             )
-        
-        # Validate file size (max 5MB)
-        MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
-        file_content = await profile_picture.read()
-        if len(file_content) > MAX_FILE_SIZE:
+
+        # Validate file size (max 5MB). Reject up front when the multipart
+        # parser already knows the size; otherwise reading aborts as soon as
+        # the limit is crossed.
+        if profile_picture.size is not None and profile_picture.size > storage.MAX_AVATAR_BYTES:
             error_response(
                 status.HTTP_400_BAD_REQUEST,
                 "FILE_TOO_LARGE",
                 "File size must be less than 5MB",
             )
-        
         try:
-            # Generate unique filename with timestamp
-            timestamp = int(time.time())
-            file_ext = profile_picture.filename.split(".")[-1] if "." in profile_picture.filename else "jpg"
-            safe_filename = f"{current_user.id}_{timestamp}.{file_ext}"
-            blob_filename = f"avatars/{safe_filename}"
-            
-            # Server-side upload directly to Vercel Blob using httpx
-            blob_url = f"https://blob.vercel-storage.com/{quote(blob_filename)}"
-            
-            async with httpx.AsyncClient() as client:
-                upload_response = await client.put(
-                    blob_url,
-                    content=file_content,
-                    headers={
-                        "Authorization": f"Bearer {token}",
-                        "Content-Type": profile_picture.content_type,
-                        "x-content-type": profile_picture.content_type,
-                    },
-                    timeout=30.0
-                )
-            
-            if upload_response.status_code in [200, 201]:
-                # Use the actual URL returned by Vercel Blob (includes content hash)
-                blob_resp = upload_response.json()
-                public_blob_url = blob_resp.get("url", "")
-                if not public_blob_url:
-                    error_response(
-                        status.HTTP_502_BAD_GATEWAY,
-                        "UPLOAD_FAILED",
-                        "Blob storage did not return a URL",
-                    )
-                current_user.profile_picture_url = public_blob_url
-            else:
-                error_response(
-                    status.HTTP_502_BAD_GATEWAY,
-                    "UPLOAD_FAILED",
-                    f"Failed to upload to blob storage: {upload_response.status_code} {upload_response.text}",
-                )
-                
-        except Exception as e:
+            file_content = await storage.read_upload(profile_picture, storage.MAX_AVATAR_BYTES)
+        except storage.UploadTooLarge:
             error_response(
-                status.HTTP_500_INTERNAL_SERVER_ERROR,
-                "UPLOAD_ERROR",
-                f"Upload failed: {str(e)}",
+                status.HTTP_400_BAD_REQUEST,
+                "FILE_TOO_LARGE",
+                "File size must be less than 5MB",
             )
 
-    # Update display name if provided
-    if display_name is not None:
-        current_user.display_name = display_name
+        # Identical uploads (same bytes) reuse the existing blob and thumbnails.
+        content_hash = avatars.content_hash(file_content)
+        avatar = await run_in_threadpool(db.get, AvatarBlob, content_hash)
+        if avatar is None:
+            new_avatar = True
+            try:
+                thumbnails = await run_in_threadpool(avatars.make_thumbnails, file_content)
+            except avatars.InvalidImage:
+                error_response(
+                    status.HTTP_400_BAD_REQUEST,
+                    "INVALID_IMAGE",
+                    "File could not be decoded as an image",
+                )
 
-    # Save changes to database
-    db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
+            sizes = list(thumbnails)
+            urls = await asyncio.gather(
+                _put_avatar_blob(
+                    storage.avatar_pathname(content_hash, storage.AVATAR_TYPES[profile_picture.content_type]),
+                    file_content,
+                    profile_picture.content_type,
+                    token,
+                ),
+                *(
+                    _put_avatar_blob(
+                        storage.avatar_pathname(f"{content_hash}_{size}", "webp"),
+                        thumbnails[size],
+                        "image/webp",
+                        token,
+                    )
+                    for size in sizes
+                ),
+            )
+            avatar = AvatarBlob(content_hash=content_hash, url=urls[0], thumbnails=dict(zip(sizes, urls[1:])))
+
+    # The session is synchronous; keep its I/O off the event loop.
+    await run_in_threadpool(_save_profile, db, current_user, display_name, avatar, new_avatar)
 
     return ProfileOut(
         id=current_user.id,
         username=current_user.username,
         display_name=current_user.display_name,
         profile_picture_url=current_user.profile_picture_url,
+        profile_picture_thumbnails=current_user.profile_picture_thumbnails,
     )
-
@@ -1,12 +1,16 @@
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional
+
 from fastapi import APIRouter, Depends, status
 from pydantic import BaseModel
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from ..db import get_db
-from ..deps import error_response, get_current_user
+from ..db import get_db, get_read_db
+from ..deps import error_response, get_current_user, get_current_user_read
 from ..models import Fob, User
+from ..rollups import fob_history
 
 
 router = APIRouter(prefix="/fob", tags=["fob"])
@@ -20,6 +24,31 @@ class FobResponse(BaseModel):
     fob_uid: str
 
 
+class HistoryBucket(BaseModel):
+    bucket_start: datetime
+    ping_count: int
+    first_received_at: datetime
+    last_received_at: datetime
+    min_lat: float
+    max_lat: float
+    min_lng: float
+    max_lng: float
+    centroid_lat: float
+    centroid_lng: float
+    max_status: int  # 0=Safe, 1=Not Safe, 2=SOS
+
+
+class FobHistoryResponse(BaseModel):
+    fob_uid: str
+    bucket: str
+    since: datetime
+    until: datetime
+    buckets: list[HistoryBucket]
+
+
+MAX_HISTORY_DAYS = 366
+
+
 @router.post("/claim", response_model=FobResponse, status_code=status.HTTP_201_CREATED)
 def claim_fob(
     payload: FobClaimRequest,
@@ -46,17 +75,47 @@ def claim_fob(
     except IntegrityError:
         db.rollback()
         error_response(status.HTTP_409_CONFLICT, "FOB_CONFLICT", "Fob already claimed")
-    db.refresh(fob)
     return FobResponse(fob_uid=fob.fob_uid)
 
 
 @router.get("/me", response_model=FobResponse)
 def get_my_fob(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db),
 ):
     fob = db.scalar(select(Fob).where(Fob.owner_user_id == current_user.id))
     if not fob:
         error_response(status.HTTP_404_NOT_FOUND, "FOB_NOT_FOUND", "No fob for user")
     return FobResponse(fob_uid=fob.fob_uid)
 
+
+@router.get("/me/history", response_model=FobHistoryResponse)
+def get_my_fob_history(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    bucket: Literal["hour", "day"] = "hour",
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db),
+):
+    """Hourly or daily activity for the caller's fob, served from ping rollups."""
+    fob = db.scalar(select(Fob).where(Fob.owner_user_id == current_user.id))
+    if not fob:
+        error_response(status.HTTP_404_NOT_FOUND, "FOB_NOT_FOUND", "No fob for user")
+
+    until = until or datetime.now(timezone.utc)
+    since = since or until - timedelta(days=7)
+    if since >= until or until - since > timedelta(days=MAX_HISTORY_DAYS):
+        error_response(
+            status.HTTP_400_BAD_REQUEST,
+            "INVALID_RANGE",
+            f"since must be before until and at most {MAX_HISTORY_DAYS} days earlier",
+        )
+
+    buckets = fob_history(db, fob.fob_uid, since, until, bucket)
+    return FobHistoryResponse(
+        fob_uid=fob.fob_uid,
+        bucket=bucket,
+        since=since,
+        until=until,
+        buckets=[HistoryBucket(**row) for row in buckets],
+    )
@@ -4,10 +4,11 @@ from typing import Optional
 from fastapi import APIRouter, Depends, status
 from pydantic import BaseModel
 from sqlalchemy import select, delete, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
-from ..db import get_db
-from ..deps import error_response, get_current_user
+from ..db import get_db, get_read_db
+from ..deps import error_response, get_current_user, get_current_user_read
 from ..models import Friendship, User
 
 
@@ -23,6 +24,7 @@ class FriendOut(BaseModel):
     username: str
     display_name: str | None = None
     profile_picture_url: str | None = None
+    profile_picture_thumbnails: dict[str, str] | None = None
     latest_ping_received_at: datetime | None = None
 
 
@@ -63,12 +65,17 @@ def add_friend(
     if not friend:
         error_response(status.HTTP_404_NOT_FOUND, "USER_NOT_FOUND", "Friend user not found")
 
-    # Idempotent: merge rows; if exist, nothing changes
-    for (user_id, friend_id) in ((current_user.id, friend.id), (friend.id, current_user.id)):
-        exists = db.get(Friendship, {"user_id": user_id, "friend_id": friend_id})
-        if not exists:
-            db.add(Friendship(user_id=user_id, friend_id=friend_id))
-
+    # Idempotent: both directions in one statement; existing rows are left as is
+    db.execute(
+        pg_insert(Friendship)
+        .values(
+            [
+                {"user_id": current_user.id, "friend_id": friend.id},
+                {"user_id": friend.id, "friend_id": current_user.id},
+            ]
+        )
+        .on_conflict_do_nothing(index_elements=["user_id", "friend_id"])
+    )
     db.commit()
     return FriendAddResponse(
         added=True,
@@ -77,6 +84,7 @@ def add_friend(
             username=friend.username,
             display_name=friend.display_name,
             profile_picture_url=friend.profile_picture_url,
+            profile_picture_thumbnails=friend.profile_picture_thumbnails,
         ),
     )
 
@@ -100,33 +108,39 @@ def remove_friend(
     return FriendRemoveResponse(removed=True)
 
 
+# Join friends with their latest ping received_at via fobs -> pings.
+# Built once so SQLAlchemy's compiled cache is reused across requests.
+FRIENDS_WITH_LATEST_PING_SQL = text(
+    """
+SELECT
+    u.id,
+    u.username,
+    u.display_name,
+    u.profile_picture_url,
+    u.profile_picture_thumbnails,
+    latest_ping.received_at AS latest_ping_received_at
+FROM friendships f
+JOIN users u ON u.id = f.friend_id
+LEFT JOIN LATERAL (
+    SELECT p.received_at
+    FROM fobs
+    JOIN pings p ON p.fob_uid = fobs.fob_uid
+    WHERE fobs.owner_user_id = u.id
+    ORDER BY p.received_at DESC
+    LIMIT 1
+) latest_ping ON true
+WHERE f.user_id = :current_user_id
+ORDER BY u.username
+"""
+)
+
+
 @router.get("", response_model=FriendListResponse)
 def list_friends(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db),
 ):
-    # Join friends with their latest ping received_at via fobs -> pings
-    sql = """
-    SELECT
-        u.id,
-        u.username,
-        u.display_name,
-        u.profile_picture_url,
-        latest_ping.received_at AS latest_ping_received_at
-    FROM friendships f
-    JOIN users u ON u.id = f.friend_id
-    LEFT JOIN LATERAL (
-        SELECT p.received_at
-        FROM fobs
-        JOIN pings p ON p.fob_uid = fobs.fob_uid
-        WHERE fobs.owner_user_id = u.id
-        ORDER BY p.received_at DESC
-        LIMIT 1
-    ) latest_ping ON true
-    WHERE f.user_id = :current_user_id
-    ORDER BY u.username
-    """
-    rows = db.execute(text(sql), {"current_user_id": current_user.id}).mappings().all()
+    rows = db.execute(FRIENDS_WITH_LATEST_PING_SQL, {"current_user_id": current_user.id}).mappings().all()
 
     friends = [
         FriendOut(
@@ -134,6 +148,7 @@ def list_friends(
             username=row["username"],
             display_name=row["display_name"],
             profile_picture_url=row["profile_picture_url"],
+            profile_picture_thumbnails=row["profile_picture_thumbnails"],
             latest_ping_received_at=row["latest_ping_received_at"],
         )
         for row in rows
@@ -0,0 +1,180 @@
+import math
+import uuid
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Query, status
+from pydantic import BaseModel
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.orm import Session
+
+from ..db import get_db, get_read_db
+from ..deps import LOCATION_SHARERS_SQL, error_response, get_current_user, get_current_user_read
+from ..geo import METERS_PER_DEG_LAT
+from ..models import Geofence, User
+
+
+router = APIRouter(prefix="/geofences", tags=["geofences"])
+
+
+class GeofencePoint(BaseModel):
+    lat: float
+    lng: float
+
+
+class GeofenceCreateRequest(BaseModel):
+    name: str
+    points: list[GeofencePoint]
+
+
+class GeofenceOut(BaseModel):
+    id: str
+    name: str
+    points: list[GeofencePoint]
+    created_at: datetime
+
+
+class GeofenceListResponse(BaseModel):
+    geofences: list[GeofenceOut]
+
+
+class GeofenceDeleteResponse(BaseModel):
+    deleted: bool
+
+
+class GeofenceEventOut(BaseModel):
+    id: int
+    geofence_id: str
+    geofence_name: str
+    user_id: str
+    username: str
+    fob_uid: str
+    kind: str  # "enter" | "exit"
+    lat: float
+    lng: float
+    created_at: datetime
+
+
+class GeofenceEventsResponse(BaseModel):
+    events: list[GeofenceEventOut]
+
+
+MAX_GEOFENCES_PER_USER = 50
+MAX_GEOFENCE_POINTS = 100
+MAX_GEOFENCE_SPAN_M = 5000
+
+# The caller's own events plus those of friends who share their location with them.
+GEOFENCE_EVENTS_SQL = text(
+    f"""
+    SELECT e.id, e.geofence_id, g.name AS geofence_name, e.user_id, u.username,
+           e.fob_uid, e.kind, e.lat, e.lng, e.created_at
+    FROM geofence_events AS e
+    JOIN geofences AS g ON g.id = e.geofence_id
+    JOIN users AS u ON u.id = e.user_id
+    WHERE e.user_id = :current_user_id
+       OR e.user_id IN ({LOCATION_SHARERS_SQL})
+    ORDER BY e.created_at DESC, e.id DESC
+    LIMIT :limit
+    """
+)
+
+
+def _geofence_out(geofence: Geofence) -> GeofenceOut:
+    return GeofenceOut(
+        id=geofence.id,
+        name=geofence.name,
+        points=[GeofencePoint(lat=lat, lng=lng) for lat, lng in geofence.vertices],
+        created_at=geofence.created_at,
+    )
+
+
+def _bump_version(db: Session, user_id: str) -> None:
+    # Tells every process's ingest path that this user's cached zone index is stale.
+    db.execute(update(User).where(User.id == user_id).values(geofences_version=User.geofences_version + 1))
+
+
+@router.post("", response_model=GeofenceOut, status_code=status.HTTP_201_CREATED)
+def create_geofence(
+    payload: GeofenceCreateRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Add a safe zone; the caller's fob gets enter/exit events for it."""
+    points = payload.points
+    if not payload.name.strip():
+        error_response(status.HTTP_400_BAD_REQUEST, "INVALID_GEOFENCE", "Name must not be empty")
+    if not 3 <= len(points) <= MAX_GEOFENCE_POINTS:
+        error_response(
+            status.HTTP_400_BAD_REQUEST, "INVALID_GEOFENCE", f"A geofence needs 3 to {MAX_GEOFENCE_POINTS} points"
+        )
+    if any(not (-90 <= p.lat <= 90 and -180 <= p.lng <= 180) for p in points):
+        error_response(status.HTTP_400_BAD_REQUEST, "INVALID_GEOFENCE", "Point out of range")
+    lats, lngs = [p.lat for p in points], [p.lng for p in points]
+    cos_lat = math.cos(math.radians(max(abs(min(lats)), abs(max(lats)))))
+    span_m = max(max(lats) - min(lats), (max(lngs) - min(lngs)) * cos_lat) * METERS_PER_DEG_LAT
+    if span_m > MAX_GEOFENCE_SPAN_M:
+        error_response(
+            status.HTTP_400_BAD_REQUEST, "INVALID_GEOFENCE", f"A geofence must span at most {MAX_GEOFENCE_SPAN_M} m"
+        )
+
+    count = db.scalar(select(func.count()).select_from(Geofence).where(Geofence.user_id == current_user.id))
+    if count >= MAX_GEOFENCES_PER_USER:
+        error_response(
+            status.HTTP_409_CONFLICT, "GEOFENCE_LIMIT", f"At most {MAX_GEOFENCES_PER_USER} geofences per user"
+        )
+
+    geofence = Geofence(
+        user_id=current_user.id, name=payload.name.strip(), vertices=[[p.lat, p.lng] for p in points]
+    )
+    db.add(geofence)
+    _bump_version(db, current_user.id)
+    db.commit()
+    return _geofence_out(geofence)
+
+
+@router.get("", response_model=GeofenceListResponse)
+def list_geofences(
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db),
+):
+    """The caller's geofences, oldest first."""
+    rows = db.scalars(
+        select(Geofence).where(Geofence.user_id == current_user.id).order_by(Geofence.created_at, Geofence.id)
+    ).all()
+    return GeofenceListResponse(geofences=[_geofence_out(row) for row in rows])
+
+
+@router.get("/events", response_model=GeofenceEventsResponse)
+def list_geofence_events(
+    limit: int = Query(50, ge=1, le=100),
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db),
+):
+    """Recent enter/exit events for the caller and friends sharing their location with them, newest first."""
+    rows = db.execute(GEOFENCE_EVENTS_SQL, {"current_user_id": current_user.id, "limit": limit}).mappings().all()
+    return GeofenceEventsResponse(
+        events=[
+            GeofenceEventOut(**{**row, "geofence_id": str(row["geofence_id"]), "user_id": str(row["user_id"])})
+            for row in rows
+        ]
+    )
+
+
+@router.delete("/{geofence_id}", response_model=GeofenceDeleteResponse)
+def delete_geofence(
+    geofence_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Remove one of the caller's geofences (and its events)."""
+    try:
+        geofence_id = str(uuid.UUID(geofence_id))
+    except ValueError:
+        error_response(status.HTTP_404_NOT_FOUND, "GEOFENCE_NOT_FOUND", "Geofence not found")
+    deleted = db.execute(
+        delete(Geofence).where(Geofence.id == geofence_id, Geofence.user_id == current_user.id)
+    ).rowcount
+    if not deleted:
+        error_response(status.HTTP_404_NOT_FOUND, "GEOFENCE_NOT_FOUND", "Geofence not found")
+    _bump_version(db, current_user.id)
+    db.commit()
+    return GeofenceDeleteResponse(deleted=True)
@@ -1,12 +1,17 @@
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Optional
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, status
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
-from ..db import get_db
-from ..deps import get_current_user
-from ..models import Incident, User
+from ..db import get_db, get_read_db
+from ..deps import error_response, get_current_user, get_current_user_read
+from ..incident_clusters import report_incident
+from ..incident_feed import InvalidCursor, feed_first_page_cache, feed_page, my_reports_page
+from ..models import User
+from ..nearby import DEFAULT_LOOKBACK, NEARBY_MAX_AGE, incident_cell_cache, nearby_clusters
+from ..route_score import MAX_ROUTE_LENGTH_M, RouteTooLong, score_route
 
 
 router = APIRouter(prefix="/incidents", tags=["incidents"])
@@ -25,30 +30,248 @@ class IncidentOut(BaseModel):
     lng: float
     description: str
     created_at: datetime
+    cluster_id: Optional[str] = None
 
 
-@router.post("", response_model=IncidentOut, status_code=status.HTTP_201_CREATED)
+class ClusterOut(BaseModel):
+    id: str
+    lat: float  # centroid of the attached reports
+    lng: float
+    description: str  # from the first report
+    report_count: int
+    first_reported_at: datetime
+    last_reported_at: datetime
+
+
+class ClusterFeedResponse(BaseModel):
+    results: list[ClusterOut]
+    next_cursor: Optional[str] = None
+
+
+class MyIncidentsResponse(BaseModel):
+    results: list[IncidentOut]
+    next_cursor: Optional[str] = None
+
+
+class IncidentReportOut(IncidentOut):
+    cluster: ClusterOut
+
+
+class NearbyCluster(ClusterOut):
+    distance_m: float
+
+
+class NearbyIncidentsResponse(BaseModel):
+    lat: float
+    lng: float
+    radius_m: float
+    since: datetime
+    results: list[NearbyCluster]
+
+
+class RoutePoint(BaseModel):
+    lat: float
+    lng: float
+
+
+class RouteScoreRequest(BaseModel):
+    points: list[RoutePoint]
+    buffer_m: float = 50
+    since: Optional[datetime] = None
+    half_life_hours: float = 6
+
+
+class RouteScoreResponse(BaseModel):
+    buffer_m: float
+    since: datetime
+    half_life_hours: float
+    length_m: float
+    incident_count: int  # clusters within the corridor
+    score: float  # incident_count with each cluster weighted by 0.5 ** (age / half-life)
+    density_per_km2: float  # score per km^2 of corridor
+    segment_scores: list[float]  # score per segment (points[i] -> points[i + 1])
+
+
+MAX_NEARBY_RADIUS_M = 5000
+MAX_PAGE_SIZE = 100
+MAX_ROUTE_POINTS = 1000
+MAX_ROUTE_BUFFER_M = 500
+
+
+def _cluster_out(row: dict) -> ClusterOut:
+    return ClusterOut(
+        id=str(row["id"]),
+        lat=row["lat"],
+        lng=row["lng"],
+        description=row["description"],
+        report_count=row["report_count"],
+        first_reported_at=row["first_reported_at"],
+        last_reported_at=row["last_reported_at"],
+    )
+
+
+def _resolve_since(since: Optional[datetime], now: datetime) -> datetime:
+    since = since or now - DEFAULT_LOOKBACK
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if since < now - NEARBY_MAX_AGE:
+        error_response(
+            status.HTTP_400_BAD_REQUEST,
+            "INVALID_RANGE",
+            f"since must be within the last {NEARBY_MAX_AGE.days} days",
+        )
+    return since
+
+
+@router.post("", response_model=IncidentReportOut, status_code=status.HTTP_201_CREATED)
 def create_incident(
     payload: IncidentCreateRequest,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    """Report a community safety incident at a given location."""
-    incident = Incident(
-        reporter_id=current_user.id,
-        lat=payload.lat,
-        lng=payload.lng,
-        description=payload.description,
+    """Report a community safety incident; nearby recent reports share a cluster."""
+    incident, cluster, changed_cells = report_incident(
+        db, current_user.id, payload.lat, payload.lng, payload.description
     )
-    db.add(incident)
     db.commit()
-    db.refresh(incident)
+    for cell in changed_cells:
+        incident_cell_cache.invalidate(cell)
+    feed_first_page_cache.invalidate()
 
-    return IncidentOut(
+    return IncidentReportOut(
         id=incident.id,
         reporter_id=incident.reporter_id,
         lat=incident.lat,
         lng=incident.lng,
         description=incident.description,
         created_at=incident.created_at,
+        cluster_id=cluster.id,
+        cluster=ClusterOut(
+            id=cluster.id,
+            lat=cluster.lat,
+            lng=cluster.lng,
+            description=cluster.description,
+            report_count=cluster.report_count,
+            first_reported_at=cluster.first_reported_at,
+            last_reported_at=cluster.last_reported_at,
+        ),
+    )
+
+
+@router.get("/nearby", response_model=NearbyIncidentsResponse)
+def list_nearby_incidents(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_m: float = Query(1000, gt=0, le=MAX_NEARBY_RADIUS_M),
+    since: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db),
+):
+    """Incident clusters within ``radius_m`` of a point active since ``since`` (default: last 24h), nearest first."""
+    since = _resolve_since(since, datetime.now(timezone.utc))
+    results = nearby_clusters(db, lat, lng, radius_m, since)
+    return NearbyIncidentsResponse(
+        lat=lat,
+        lng=lng,
+        radius_m=radius_m,
+        since=since,
+        results=[
+            NearbyCluster(**_cluster_out(row).model_dump(), distance_m=round(distance, 1))
+            for row, distance in results
+        ],
+    )
+
+
+@router.post("/route-score", response_model=RouteScoreResponse)
+def score_incident_route(
+    payload: RouteScoreRequest,
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db),
+):
+    """Time-decayed density of incident clusters within ``buffer_m`` of a walking route."""
+    now = datetime.now(timezone.utc)
+    since = _resolve_since(payload.since, now)
+    points = payload.points
+    if not 2 <= len(points) <= MAX_ROUTE_POINTS:
+        error_response(
+            status.HTTP_400_BAD_REQUEST, "INVALID_ROUTE", f"A route needs 2 to {MAX_ROUTE_POINTS} points"
+        )
+    if any(not (-90 <= p.lat <= 90 and -180 <= p.lng <= 180) for p in points):
+        error_response(status.HTTP_400_BAD_REQUEST, "INVALID_ROUTE", "Route point out of range")
+    if not 0 < payload.buffer_m <= MAX_ROUTE_BUFFER_M:
+        error_response(
+            status.HTTP_400_BAD_REQUEST, "INVALID_RANGE", f"buffer_m must be in (0, {MAX_ROUTE_BUFFER_M}]"
+        )
+    if payload.half_life_hours <= 0:
+        error_response(status.HTTP_400_BAD_REQUEST, "INVALID_RANGE", "half_life_hours must be positive")
+
+    try:
+        result = score_route(
+            db,
+            [p.lat for p in points],
+            [p.lng for p in points],
+            payload.buffer_m,
+            since,
+            now,
+            payload.half_life_hours * 3600,
+        )
+    except RouteTooLong:
+        error_response(
+            status.HTTP_400_BAD_REQUEST,
+            "INVALID_ROUTE",
+            f"Route is longer than {MAX_ROUTE_LENGTH_M / 1000:g} km",
+        )
+    return RouteScoreResponse(
+        buffer_m=payload.buffer_m,
+        since=since,
+        half_life_hours=payload.half_life_hours,
+        length_m=round(result.length_m, 1),
+        incident_count=result.incident_count,
+        score=round(result.score, 4),
+        density_per_km2=round(result.density_per_km2, 4),
+        segment_scores=[round(s, 4) for s in result.segment_scores],
+    )
+
+
+@router.get("", response_model=ClusterFeedResponse)
+def list_incidents(
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db),
+):
+    """Incident clusters, newest first. Pass ``next_cursor`` back as ``cursor`` for the next page."""
+    try:
+        rows, next_cursor = feed_page(db, limit, cursor)
+    except InvalidCursor:
+        error_response(status.HTTP_400_BAD_REQUEST, "INVALID_CURSOR", "Malformed pagination cursor")
+    return ClusterFeedResponse(results=[_cluster_out(row) for row in rows], next_cursor=next_cursor)
+
+
+@router.get("/mine", response_model=MyIncidentsResponse)
+def list_my_incidents(
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db),
+):
+    """The caller's own reports, newest first."""
+    try:
+        rows, next_cursor = my_reports_page(db, current_user.id, limit, cursor)
+    except InvalidCursor:
+        error_response(status.HTTP_400_BAD_REQUEST, "INVALID_CURSOR", "Malformed pagination cursor")
+    return MyIncidentsResponse(
+        results=[
+            IncidentOut(
+                id=str(row["id"]),
+                reporter_id=str(row["reporter_id"]),
+                lat=row["lat"],
+                lng=row["lng"],
+                description=row["description"],
+                created_at=row["created_at"],
+                cluster_id=str(row["cluster_id"]) if row["cluster_id"] else None,
+            )
+            for row in rows
+        ],
+        next_cursor=next_cursor,
     )
@@ -1,18 +1,40 @@
 import logging
+import time
 
 from fastapi import APIRouter, Depends, status
 from pydantic import BaseModel
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
 
 from ..db import get_db
 from ..deps import verify_tower_key
-from ..models import Ping, Fob
+from ..geofences import evaluate_ping
+from ..metrics import (
+    fobs_auto_registered,
+    pings_ingested,
+    pings_quarantined,
+    sos_alerts,
+    sos_events,
+    tower_ingest_duration,
+    tower_pings,
+)
+from ..models import Ping, Fob, QuarantinedPing, User
+from ..movement import movement_filter, screen_ping
+from ..sos import fan_out_sos
 
 
 logger = logging.getLogger("compass.tower")
 
 router = APIRouter(prefix="/tower", tags=["tower"])
 
+# The owner's geofences_version comes along so zone checks need no extra query.
+# Built once so each ping reuses the compiled statement.
+FOB_WITH_GEOFENCES_VERSION = (
+    select(Fob, User.geofences_version)
+    .outerjoin(User, User.id == Fob.owner_user_id)
+    .where(Fob.fob_uid == bindparam("fob_uid"))
+)
+
 
 class TowerPingRequest(BaseModel):
     fob_uid: str
@@ -23,17 +45,49 @@ class TowerPingRequest(BaseModel):
 
 class TowerPingResponse(BaseModel):
     stored: bool
+    quarantined: bool = False
 
 
 @router.post("/pings", response_model=TowerPingResponse, status_code=status.HTTP_201_CREATED)
 def ingest_ping(
     payload: TowerPingRequest,
-    _: bool = Depends(verify_tower_key),
+    tower_id: str | None = Depends(verify_tower_key),
     db: Session = Depends(get_db),
 ):
+    started = time.perf_counter()
+    received_at = time.time()
+    tower = tower_id or "shared"
+
+    # Impossible movement is screened from memory, before any query; SOS always goes through.
+    jump = None if payload.status == 2 else screen_ping(payload.fob_uid, payload.lat, payload.lng, received_at)
+    if jump is not None:
+        db.add(
+            QuarantinedPing(
+                fob_uid=payload.fob_uid,
+                lat=payload.lat,
+                lng=payload.lng,
+                status=payload.status,
+                tower_id=tower_id,
+                distance_m=jump.distance_m,
+                elapsed_seconds=jump.seconds,
+            )
+        )
+        db.commit()
+        movement_filter.record(payload.fob_uid, payload.lat, payload.lng, received_at, accepted=False)
+        pings_quarantined.inc(tower)
+        logger.info(
+            "Quarantined ping from fob %s: %.0f m in %.1f s", payload.fob_uid, jump.distance_m, jump.seconds
+        )
+        tower_pings.inc(tower)
+        tower_ingest_duration.observe(time.perf_counter() - started, tower)
+        return TowerPingResponse(stored=True, quarantined=True)
+
+    row = db.execute(FOB_WITH_GEOFENCES_VERSION, {"fob_uid": payload.fob_uid}).first()
+    fob, geofences_version = row if row is not None else (None, 0)
+
     # Auto-register fob if it doesn't exist yet
-    fob = db.get(Fob, payload.fob_uid)
-    if not fob:
+    auto_registered = fob is None
+    if auto_registered:
         fob = Fob(fob_uid=payload.fob_uid)
         db.add(fob)
         db.flush()
@@ -43,19 +97,50 @@ def ingest_ping(
         lat=payload.lat,
         lng=payload.lng,
         status=payload.status,
+        tower_id=tower_id,
     )
     db.add(ping)
+    owner_id = fob.owner_user_id
+    zone_update = None
+    if owner_id is not None:
+        zone_update = evaluate_ping(db, owner_id, geofences_version, payload.fob_uid, payload.lat, payload.lng)
     db.commit()
+    pings_ingested.inc()
+    movement_filter.record(payload.fob_uid, payload.lat, payload.lng, received_at, accepted=True)
+    if zone_update is not None:
+        zone_update.apply()
+    if auto_registered:
+        fobs_auto_registered.inc()
 
     # If SOS, log a prominent warning so ops can act on it
     if payload.status == 2:
-        owner_id = fob.owner_user_id or "unregistered"
+        sos_events.inc()
         logger.warning(
             "🚨 SOS ALERT: User %s at %s, %s",
-            owner_id,
+            owner_id or "unregistered",
             payload.lat,
             payload.lng,
         )
+        # Alert nearby friends in a second transaction, so a failure here can't lose the ping.
+        if owner_id is not None:
+            try:
+                alerts = fan_out_sos(db, owner_id, payload.fob_uid, payload.lat, payload.lng)
+                db.commit()
+            except Exception:
+                # The ping is stored; a 500 would make the tower send it again.
+                db.rollback()
+                logger.exception("SOS fan-out failed for user %s", owner_id)
+                alerts = []
+            if alerts:
+                sos_alerts.inc(amount=len(alerts))
+                logger.warning(
+                    "SOS from user %s alerted %d nearby friend(s); nearest %.0f m",
+                    owner_id,
+                    len(alerts),
+                    alerts[0][1],
+                )
 
+    tower_pings.inc(tower)
+    tower_ingest_duration.observe(time.perf_counter() - started, tower)
     return TowerPingResponse(stored=True)
 
@@ -0,0 +1,205 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, status
+from pydantic import BaseModel
+from sqlalchemy import select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..db import get_db, get_read_db
+from ..deps import LOCATION_SHARERS_SQL, error_response, get_current_user, get_current_user_read
+from ..models import User, Walk
+from ..walks import CHECKIN, schedule_walk, walk_timers
+
+
+router = APIRouter(prefix="/walks", tags=["walks"])
+
+
+class WalkStartRequest(BaseModel):
+    destination: Optional[str] = None
+    dest_lat: float
+    dest_lng: float
+    eta_minutes: float
+    checkin_interval_minutes: Optional[float] = None
+
+
+class WalkEndRequest(BaseModel):
+    arrived: bool = True
+
+
+class WalkOut(BaseModel):
+    id: str
+    status: str  # "active" | "overdue" | "ended"
+    destination: Optional[str]
+    dest_lat: float
+    dest_lng: float
+    started_at: datetime
+    expected_arrival_at: datetime
+    checkin_interval_seconds: Optional[int]
+    checkin_due_at: Optional[datetime]
+    last_checkin_at: Optional[datetime]
+    missed_checkins: int
+    overdue_at: Optional[datetime]
+    ended_at: Optional[datetime]
+    end_reason: Optional[str]  # "arrived" | "cancelled"
+
+
+class CurrentWalkResponse(BaseModel):
+    walk: Optional[WalkOut]
+
+
+class FriendWalkOut(WalkOut):
+    user_id: str
+    username: str
+
+
+class FriendWalksResponse(BaseModel):
+    walks: list[FriendWalkOut]
+
+
+MAX_WALK_MINUTES = 12 * 60
+MIN_CHECKIN_MINUTES = 1
+MAX_CHECKIN_MINUTES = 120
+
+# Active walks of friends who share their location with the caller.
+FRIEND_WALKS_SQL = text(
+    f"""
+    SELECT w.*, u.username
+    FROM walks AS w
+    JOIN users AS u ON u.id = w.user_id
+    WHERE w.user_id IN ({LOCATION_SHARERS_SQL})
+      AND w.ended_at IS NULL
+    ORDER BY w.expected_arrival_at, w.id
+    """
+)
+
+
+def _walk_out(walk) -> dict:
+    if walk.ended_at is not None:
+        walk_status = "ended"
+    elif walk.overdue_at is not None:
+        walk_status = "overdue"
+    else:
+        walk_status = "active"
+    return {
+        "id": str(walk.id),
+        "status": walk_status,
+        **{field: getattr(walk, field) for field in WalkOut.model_fields if field not in ("id", "status")},
+    }
+
+
+def _active_walk(db: Session, user_id: str, walk_id: str) -> Walk:
+    try:
+        walk_id = str(uuid.UUID(walk_id))
+    except ValueError:
+        error_response(status.HTTP_404_NOT_FOUND, "WALK_NOT_FOUND", "Walk not found")
+    walk = db.scalar(
+        select(Walk).where(Walk.id == walk_id, Walk.user_id == user_id, Walk.ended_at.is_(None)).with_for_update()
+    )
+    if walk is None:
+        error_response(status.HTTP_404_NOT_FOUND, "WALK_NOT_FOUND", "No active walk with that id")
+    return walk
+
+
+@router.post("", response_model=WalkOut, status_code=status.HTTP_201_CREATED)
+def start_walk(
+    payload: WalkStartRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Start a walk; it is flagged overdue if not ended by the expected arrival time."""
+    if not (-90 <= payload.dest_lat <= 90 and -180 <= payload.dest_lng <= 180):
+        error_response(status.HTTP_400_BAD_REQUEST, "INVALID_WALK", "Destination out of range")
+    if not 0 < payload.eta_minutes <= MAX_WALK_MINUTES:
+        error_response(
+            status.HTTP_400_BAD_REQUEST, "INVALID_WALK", f"eta_minutes must be in (0, {MAX_WALK_MINUTES}]"
+        )
+    interval = payload.checkin_interval_minutes
+    if interval is not None and not MIN_CHECKIN_MINUTES <= interval <= MAX_CHECKIN_MINUTES:
+        error_response(
+            status.HTTP_400_BAD_REQUEST,
+            "INVALID_WALK",
+            f"checkin_interval_minutes must be in [{MIN_CHECKIN_MINUTES}, {MAX_CHECKIN_MINUTES}]",
+        )
+
+    now = datetime.now(timezone.utc)
+    interval_seconds = round(interval * 60) if interval is not None else None
+    walk = Walk(
+        user_id=current_user.id,
+        destination=(payload.destination or "").strip() or None,
+        dest_lat=payload.dest_lat,
+        dest_lng=payload.dest_lng,
+        started_at=now,
+        expected_arrival_at=now + timedelta(minutes=payload.eta_minutes),
+        checkin_interval_seconds=interval_seconds,
+        checkin_due_at=now + timedelta(seconds=interval_seconds) if interval_seconds else None,
+        missed_checkins=0,
+    )
+    db.add(walk)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        error_response(status.HTTP_409_CONFLICT, "WALK_ACTIVE", "End the current walk before starting another")
+    schedule_walk(walk.id, walk.expected_arrival_at, None, walk.checkin_due_at)
+    return _walk_out(walk)
+
+
+@router.get("/current", response_model=CurrentWalkResponse)
+def get_current_walk(
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db),
+):
+    """The caller's active walk, if any."""
+    walk = db.scalar(select(Walk).where(Walk.user_id == current_user.id, Walk.ended_at.is_(None)))
+    return CurrentWalkResponse(walk=_walk_out(walk) if walk is not None else None)
+
+
+@router.get("/friends", response_model=FriendWalksResponse)
+def list_friend_walks(
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db),
+):
+    """Active walks of friends sharing their location with the caller, soonest expected arrival first."""
+    rows = db.execute(FRIEND_WALKS_SQL, {"current_user_id": current_user.id}).all()
+    return FriendWalksResponse(
+        walks=[
+            FriendWalkOut(**_walk_out(row), user_id=str(row.user_id), username=row.username) for row in rows
+        ]
+    )
+
+
+@router.post("/{walk_id}/checkin", response_model=WalkOut)
+def check_in(
+    walk_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Check in on an active walk, pushing the next check-in deadline back a full interval."""
+    walk = _active_walk(db, current_user.id, walk_id)
+    now = datetime.now(timezone.utc)
+    walk.last_checkin_at = now
+    if walk.checkin_interval_seconds:
+        walk.checkin_due_at = now + timedelta(seconds=walk.checkin_interval_seconds)
+    db.commit()
+    if walk.checkin_due_at is not None:
+        walk_timers.schedule(walk.id, CHECKIN, walk.checkin_due_at.timestamp())
+    return _walk_out(walk)
+
+
+@router.post("/{walk_id}/end", response_model=WalkOut)
+def end_walk(
+    walk_id: str,
+    payload: WalkEndRequest = WalkEndRequest(),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """End an active walk (arrived, or cancelled with ``arrived: false``)."""
+    walk = _active_walk(db, current_user.id, walk_id)
+    walk.ended_at = datetime.now(timezone.utc)
+    walk.end_reason = "arrived" if payload.arrived else "cancelled"
+    db.commit()
+    walk_timers.cancel(walk.id)
+    return _walk_out(walk)
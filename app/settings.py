@@ -1,4 +1,7 @@
 import os
+import signal
+import threading
+from typing import Any
 
 
 class Settings:
@@ -6,7 +9,41 @@ class Settings:
     JWT_SECRET: str
     JWT_EXP_SECONDS: int
     TOWER_SHARED_KEY: str
+    TOWER_KEY_CACHE_SECONDS: float
+    TOWER_KEY_LISTEN: bool
     BLOB_READ_WRITE_TOKEN: str
+    BLOB_API_URL: str
+    LOOP_LAG_THRESHOLD_MS: float
+    DB_POOL_MODE: str
+    DB_POOL_SIZE: int
+    DB_MAX_OVERFLOW: int
+    DB_POOL_TIMEOUT: float
+    DB_POOL_RECYCLE: int
+    DB_POOL_PRE_PING: bool
+    DATABASE_REPLICA_URL: str
+    REPLICA_MAX_LAG_SECONDS: float
+    REPLICA_LAG_CHECK_SECONDS: float
+    REPLICA_FALLBACK_TO_PRIMARY: bool
+    ROLLUP_INTERVAL_SECONDS: float
+    ROLLUP_BATCH_SIZE: int
+    ROLLUP_SETTLE_SECONDS: float
+    SIGNAL_CHECK_INTERVAL_SECONDS: float
+    SIGNAL_LOST_AFTER_SECONDS: float
+    QUERY_REPEAT_WARN_THRESHOLD: int
+    SLOW_QUERY_MS: float
+    SQL_REQUEST_ID_COMMENTS: bool
+    INCIDENT_CACHE_TTL_SECONDS: float
+    INCIDENT_CLUSTER_RADIUS_M: float
+    INCIDENT_CLUSTER_WINDOW_MINUTES: float
+    FEED_CACHE_TTL_SECONDS: float
+    SOS_ALERT_RADIUS_M: float
+    SOS_POSITION_MAX_AGE_MINUTES: float
+    SOS_ALERT_COOLDOWN_SECONDS: float
+    WALK_TIMER_TICK_SECONDS: float
+    MOVEMENT_MAX_SPEED_MPS: float
+    MOVEMENT_NOISE_M: float
+
+    _frozen: bool = False
 
     def __init__(self) -> None:
         self.DATABASE_URL = os.getenv(
@@ -15,12 +52,112 @@ class Settings:
         )
         self.JWT_SECRET = os.environ.get("JWT_SECRET", "dev-secret-change-me")
         self.JWT_EXP_SECONDS = int(os.environ.get("JWT_EXP_SECONDS", "3600"))
+        # Accepted from towers that don't send X-Tower-Id; empty requires per-tower keys.
         self.TOWER_SHARED_KEY = os.environ.get("TOWER_SHARED_KEY", "dev-tower-key")
+        # How long per-tower key changes (new, rotated, revoked) can take to reach a process.
+        self.TOWER_KEY_CACHE_SECONDS = float(os.environ.get("TOWER_KEY_CACHE_SECONDS", "30"))
+        # LISTEN for tower key changes so they apply at once; needs a long-running process.
+        self.TOWER_KEY_LISTEN = os.environ.get("TOWER_KEY_LISTEN", "false").lower() in ("1", "true", "yes")
         self.BLOB_READ_WRITE_TOKEN = os.environ.get("BLOB_READ_WRITE_TOKEN", "")
+        self.BLOB_API_URL = os.environ.get("BLOB_API_URL", "https://blob.vercel-storage.com").rstrip("/")
+        # Event-loop stalls longer than this are logged; 0 disables the monitor.
+        self.LOOP_LAG_THRESHOLD_MS = float(os.environ.get("LOOP_LAG_THRESHOLD_MS", "100"))
+        # Connection pooling: "queue" (default), "null" (serverless) or "pgbouncer".
+        self.DB_POOL_MODE = os.environ.get("DB_POOL_MODE", "queue").lower()
+        self.DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+        self.DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+        self.DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+        self.DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+        self.DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+        # Optional read replica for read-only GET endpoints.
+        self.DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL", "")
+        self.REPLICA_MAX_LAG_SECONDS = float(os.environ.get("REPLICA_MAX_LAG_SECONDS", "10"))
+        self.REPLICA_LAG_CHECK_SECONDS = float(os.environ.get("REPLICA_LAG_CHECK_SECONDS", "5"))
+        self.REPLICA_FALLBACK_TO_PRIMARY = (
+            os.environ.get("REPLICA_FALLBACK_TO_PRIMARY", "true").lower() in ("1", "true", "yes")
+        )
+        # Hourly ping rollups; 0 disables the in-process job (use cron instead).
+        self.ROLLUP_INTERVAL_SECONDS = float(os.environ.get("ROLLUP_INTERVAL_SECONDS", "0"))
+        self.ROLLUP_BATCH_SIZE = int(os.environ.get("ROLLUP_BATCH_SIZE", "50000"))
+        self.ROLLUP_SETTLE_SECONDS = float(os.environ.get("ROLLUP_SETTLE_SECONDS", "30"))
+        # Lost-signal detection; 0 disables the in-process job (use cron instead).
+        self.SIGNAL_CHECK_INTERVAL_SECONDS = float(os.environ.get("SIGNAL_CHECK_INTERVAL_SECONDS", "0"))
+        # A fob with no ping for this long has lost its signal; keep it well above
+        # ROLLUP_SETTLE_SECONDS, since pings that recent aren't counted yet.
+        self.SIGNAL_LOST_AFTER_SECONDS = float(os.environ.get("SIGNAL_LOST_AFTER_SECONDS", "300"))
+        # Warn when one request runs the same SQL this many times (N+1); 0 disables.
+        self.QUERY_REPEAT_WARN_THRESHOLD = int(os.environ.get("QUERY_REPEAT_WARN_THRESHOLD", "0"))
+        # Statements slower than this are logged as JSON on compass.sql; 0 disables.
+        self.SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "250"))
+        # Append /* request_id='...' */ to SQL run during a request.
+        self.SQL_REQUEST_ID_COMMENTS = (
+            os.environ.get("SQL_REQUEST_ID_COMMENTS", "true").lower() in ("1", "true", "yes")
+        )
+        # Per-cell cache of recent incidents for nearby queries; 0 disables.
+        self.INCIDENT_CACHE_TTL_SECONDS = float(os.environ.get("INCIDENT_CACHE_TTL_SECONDS", "15"))
+        # Reports this close (meters) to a cluster reported on within the window
+        # attach to it instead of starting a new one; radius 0 disables merging.
+        self.INCIDENT_CLUSTER_RADIUS_M = float(os.environ.get("INCIDENT_CLUSTER_RADIUS_M", "100"))
+        self.INCIDENT_CLUSTER_WINDOW_MINUTES = float(os.environ.get("INCIDENT_CLUSTER_WINDOW_MINUTES", "30"))
+        # Cache lifetime of the first page of GET /incidents; 0 disables.
+        self.FEED_CACHE_TTL_SECONDS = float(os.environ.get("FEED_CACHE_TTL_SECONDS", "10"))
+        # An SOS alerts friends (that the sender shares location with) whose latest
+        # ping is this close and this recent; 0 radius disables the fan-out.
+        self.SOS_ALERT_RADIUS_M = float(os.environ.get("SOS_ALERT_RADIUS_M", "1000"))
+        self.SOS_POSITION_MAX_AGE_MINUTES = float(os.environ.get("SOS_POSITION_MAX_AGE_MINUTES", "15"))
+        # A friend already alerted about the same fob within this window isn't alerted again.
+        self.SOS_ALERT_COOLDOWN_SECONDS = float(os.environ.get("SOS_ALERT_COOLDOWN_SECONDS", "300"))
+        # How often the in-process walk scheduler checks its timers for overdue walks
+        # and missed check-ins; 0 disables it (serverless: run app.walks from cron).
+        self.WALK_TIMER_TICK_SECONDS = float(os.environ.get("WALK_TIMER_TICK_SECONDS", "1"))
+        # Pings implying a faster move than this from the fob's last accepted point
+        # are quarantined, beyond a free allowance for tower noise; 0 disables.
+        self.MOVEMENT_MAX_SPEED_MPS = float(os.environ.get("MOVEMENT_MAX_SPEED_MPS", "70"))
+        self.MOVEMENT_NOISE_M = float(os.environ.get("MOVEMENT_NOISE_M", "250"))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if self._frozen:
+            raise AttributeError(f"Settings snapshot is read-only; use reload_settings() to change {name}")
+        super().__setattr__(name, value)
+
+
+_settings: Settings | None = None
+# Reentrant: the SIGHUP handler runs reload_settings() on the main thread,
+# possibly while that thread is already inside it.
+_reload_lock = threading.RLock()
 
 
 def get_settings() -> Settings:
-    # Intentionally *not* cached so tests (and long-running processes)
-    # can pick up env var changes such as TOWER_SHARED_KEY overrides.
-    return Settings()
+    # Hot paths (tower key checks, JWT encode/decode) read a process-wide
+    # snapshot instead of re-parsing os.environ on every request. Call
+    # reload_settings() to pick up env var changes.
+    settings = _settings
+    if settings is None:
+        settings = reload_settings()
+    return settings
+
+
+def reload_settings(**overrides: Any) -> Settings:
+    """Rebuild the settings snapshot from the environment.
+
+    Keyword arguments override individual values (handy in tests), e.g.
+    ``reload_settings(TOWER_SHARED_KEY="test-key")``.
+    """
+    global _settings
+    with _reload_lock:
+        settings = Settings()
+        for name, value in overrides.items():
+            if not hasattr(settings, name):
+                raise AttributeError(f"Unknown setting {name}")
+            setattr(settings, name, value)
+        settings._frozen = True
+        _settings = settings
+    return settings
+
 
+def install_reload_signal_handler() -> bool:
+    """Reload settings on SIGHUP. Returns False where that isn't possible."""
+    if not hasattr(signal, "SIGHUP") or threading.current_thread() is not threading.main_thread():
+        return False
+    signal.signal(signal.SIGHUP, lambda signum, frame: reload_settings())
+    return True
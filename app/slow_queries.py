@@ -0,0 +1,83 @@
+"""Slow-query log and request-ID SQL comments.
+
+Every statement run during a request gets a trailing
+``/* request_id='...' */`` comment, so it can be matched to the request in
+``pg_stat_activity`` and the Postgres logs (pg_stat_statements ignores
+comments, so grouping is unaffected). Statements slower than ``SLOW_QUERY_MS``
+are logged on ``compass.sql`` as one JSON object per line with the SQL,
+redacted parameters, duration and request ID.
+"""
+import json
+import logging
+import re
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .request_id import current_request_id
+from .settings import get_settings
+
+
+logger = logging.getLogger("compass.sql")
+
+# Parameter names whose values never reach the log: credentials, and
+# coordinates (user locations).
+_REDACTED_PARAM = re.compile(r"password|secret|token|key|hash|lat|lng", re.IGNORECASE)
+MAX_PARAM_CHARS = 64
+MAX_STATEMENT_CHARS = 2000
+
+
+def redact_value(name, value):
+    if isinstance(name, str) and _REDACTED_PARAM.search(name):
+        return "<redacted>"
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    text = str(value)
+    return text if len(text) <= MAX_PARAM_CHARS else text[:MAX_PARAM_CHARS] + "..."
+
+
+def redact_params(parameters):
+    """JSON-safe copy of DBAPI parameters with sensitive values masked."""
+    if isinstance(parameters, dict):
+        return {name: redact_value(name, value) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: log the first row and how many there were
+            return {"rows": len(parameters), "first": redact_params(parameters[0])}
+        return [redact_value(None, value) for value in parameters]
+    return None
+
+
+@event.listens_for(Engine, "before_cursor_execute", retval=True)
+def _tag_and_time(conn, cursor, statement, parameters, context, executemany):
+    request_id = current_request_id.get()
+    if request_id is not None and get_settings().SQL_REQUEST_ID_COMMENTS:
+        statement = f"{statement} /* request_id='{request_id}' */"
+    if context is not None:
+        context._compass_started = time.perf_counter()
+    return statement, parameters
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _log_slow(conn, cursor, statement, parameters, context, executemany):
+    threshold_ms = get_settings().SLOW_QUERY_MS
+    started = getattr(context, "_compass_started", None)
+    if threshold_ms <= 0 or started is None:
+        return
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms < threshold_ms:
+        return
+    logger.warning(
+        json.dumps(
+            {
+                "event": "slow_query",
+                "request_id": current_request_id.get(),
+                "duration_ms": round(duration_ms, 1),
+                "statement": " ".join(statement.split())[:MAX_STATEMENT_CHARS],
+                "params": redact_params(parameters),
+                "executemany": executemany,
+            },
+            default=str,
+        )
+    )
@@ -0,0 +1,83 @@
+"""SOS fan-out to nearby friends.
+
+When a fob reports SOS, every friend its owner shares their location with
+whose own fob's latest ping is recent (``SOS_POSITION_MAX_AGE_MINUTES``) and
+within ``SOS_ALERT_RADIUS_M`` gets an ``sos_alerts`` row, prioritized by
+distance (1 = nearest).
+
+It is one statement over the owner's friend set: each friend's latest
+position is a ``LIMIT 1`` probe of ``ix_pings_fob_uid_received_at_desc``, so
+the cost grows with the number of friends, not with ping history. Friends
+already alerted about the same fob within ``SOS_ALERT_COOLDOWN_SECONDS`` are
+skipped, so a fob that keeps reporting SOS doesn't re-alert everyone on
+every ping but does alert friends who come into range later.
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .geo import EARTH_RADIUS_M
+from .settings import get_settings
+
+
+FAN_OUT_SQL = text(
+    f"""
+    WITH nearby AS (
+        SELECT fs.friend_id AS recipient_id,
+               2 * {EARTH_RADIUS_M} * asin(sqrt(
+                   power(sin(radians(latest.lat - :lat) / 2), 2)
+                   + cos(radians(:lat)) * cos(radians(latest.lat))
+                     * power(sin(radians(latest.lng - :lng) / 2), 2)
+               )) AS distance_m
+        FROM friendships AS fs
+        JOIN fobs ON fobs.owner_user_id = fs.friend_id
+        CROSS JOIN LATERAL (
+            SELECT p.lat, p.lng, p.received_at
+            FROM pings AS p
+            WHERE p.fob_uid = fobs.fob_uid
+            ORDER BY p.received_at DESC
+            LIMIT 1
+        ) AS latest
+        WHERE fs.user_id = :user_id
+          AND fs.is_sharing_location = true
+          AND latest.received_at >= :fresh_since
+          AND NOT EXISTS (
+              SELECT 1 FROM sos_alerts AS a
+              WHERE a.recipient_id = fs.friend_id
+                AND a.fob_uid = :fob_uid
+                AND a.created_at >= :cooldown_since
+          )
+    )
+    INSERT INTO sos_alerts (user_id, recipient_id, fob_uid, lat, lng, distance_m, priority)
+    SELECT :user_id, recipient_id, :fob_uid, :lat, :lng, distance_m,
+           row_number() OVER (ORDER BY distance_m, recipient_id)
+    FROM nearby
+    WHERE distance_m <= :radius_m
+    RETURNING recipient_id, distance_m, priority
+    """
+)
+
+
+def fan_out_sos(db: Session, user_id: str, fob_uid: str, lat: float, lng: float) -> list[tuple[str, float, int]]:
+    """Alert ``user_id``'s nearby friends of an SOS at (lat, lng); the caller commits.
+
+    Returns ``(recipient_id, distance_m, priority)`` per alert, nearest first.
+    """
+    settings = get_settings()
+    if settings.SOS_ALERT_RADIUS_M <= 0:
+        return []
+    now = datetime.now(timezone.utc)
+    rows = db.execute(
+        FAN_OUT_SQL,
+        {
+            "user_id": user_id,
+            "fob_uid": fob_uid,
+            "lat": lat,
+            "lng": lng,
+            "radius_m": settings.SOS_ALERT_RADIUS_M,
+            "fresh_since": now - timedelta(minutes=settings.SOS_POSITION_MAX_AGE_MINUTES),
+            "cooldown_since": now - timedelta(seconds=settings.SOS_ALERT_COOLDOWN_SECONDS),
+        },
+    ).all()
+    return sorted(((str(r.recipient_id), r.distance_m, r.priority) for r in rows), key=lambda alert: alert[2])
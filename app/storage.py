@@ -0,0 +1,92 @@
+"""Vercel Blob storage client.
+
+This module is imported lazily by the profile route so that httpx (and its TLS
+setup) is only loaded on the first upload rather than on every cold start.
+
+Uploads share one application-lifetime ``httpx.AsyncClient`` (keep-alive,
+HTTP/2 when ``h2`` is installed) so repeat uploads reuse the pooled TLS
+connection. The client is created on first use and closed by the app lifespan.
+
+Avatar pathnames are content-addressed (SHA-256 of the upload), so identical
+uploads resolve to the same blob.
+"""
+import importlib.util
+from typing import AsyncIterable, AsyncIterator
+from urllib.parse import quote
+
+import httpx
+from fastapi import UploadFile
+
+from .settings import get_settings
+
+
+MAX_AVATAR_BYTES = 5 * 1024 * 1024  # 5MB
+# Accepted avatar content types and the extension each is stored under.
+AVATAR_TYPES = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp"}
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised mid-stream once an upload exceeds its size limit."""
+
+
+_client: httpx.AsyncClient | None = None
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0),
+            timeout=30.0,
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+
+
+def avatar_pathname(content_hash: str, ext: str) -> str:
+    # Content-addressed so identical uploads map to the same blob
+    return f"avatars/{content_hash}.{ext}"
+
+
+async def iter_upload(
+    upload: UploadFile, max_bytes: int, chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """Yield ``upload`` in chunks, raising UploadTooLarge past ``max_bytes``."""
+    total = 0
+    while chunk := await upload.read(chunk_size):
+        total += len(chunk)
+        if total > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+        yield chunk
+
+
+async def read_upload(upload: UploadFile, max_bytes: int) -> bytes:
+    """Buffer ``upload`` (at most ``max_bytes``), aborting early past the limit."""
+    return b"".join([chunk async for chunk in iter_upload(upload, max_bytes)])
+
+
+async def put_blob(
+    pathname: str, content: bytes | AsyncIterable[bytes], content_type: str, token: str
+) -> httpx.Response:
+    """Server-side upload directly to Vercel Blob at exactly ``pathname``."""
+    return await get_client().put(
+        f"{get_settings().BLOB_API_URL}/{quote(pathname)}",
+        content=content,
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Content-Type": content_type,
+            "x-content-type": content_type,
+            # Pathnames are content-addressed: keep them stable, and let a
+            # retried upload of the same content overwrite a partial one.
+            "x-add-random-suffix": "0",
+            "x-allow-overwrite": "1",
+        },
+    )
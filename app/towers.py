@@ -0,0 +1,207 @@
+"""Per-tower ingest keys.
+
+Each tower has its own random key, stored only as a SHA-256 digest (keys are
+32 random bytes, so a slow password hash would add cost without adding
+safety). Towers send ``X-Tower-Id`` and ``X-Tower-Key``.
+
+``tower_keys`` holds the digests of every active tower in memory and reloads
+them from ``towers`` every ``TOWER_KEY_CACHE_SECONDS``, or sooner when a tower
+it doesn't know shows up (at most once per ``MIN_RELOAD_SECONDS``), so
+verifying a ping needs no database round trip and a new, rotated or revoked
+key takes effect within the cache lifetime. Digests are compared with
+``hmac.compare_digest``, and unknown towers are compared against a dummy
+digest, so response times don't reveal keys or which towers exist.
+
+Adding a tower, rotating its key or revoking it also sends a
+``tower_keys_changed`` notification. With ``TOWER_KEY_LISTEN`` on, each
+process runs a ``TowerKeyListener`` that marks the cache stale as soon as the
+change commits, so a revoked key stops working on the next ping instead of up
+to ``TOWER_KEY_CACHE_SECONDS`` later.
+
+Manage towers with ``scripts/towers.py``.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import secrets
+import threading
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import make_url, select, text, update
+from sqlalchemy.orm import Session
+
+from .db import session_scope
+from .models import Tower
+from .settings import get_settings
+
+
+logger = logging.getLogger("compass.towers")
+
+MIN_RELOAD_SECONDS = 5.0
+KEYS_CHANGED_CHANNEL = "tower_keys_changed"
+LISTEN_RETRY_SECONDS = 5.0
+
+_ACTIVE_TOWER_KEYS_SQL = text("SELECT id, key_hash FROM towers WHERE active")
+# Delivered to listeners when the transaction commits (and not at all on rollback).
+_NOTIFY_KEYS_CHANGED_SQL = text(f"SELECT pg_notify('{KEYS_CHANGED_CHANNEL}', '')")
+
+_NO_KEY = hashlib.sha256(b"").hexdigest()
+
+
+def hash_key(key: str) -> str:
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def new_key() -> str:
+    return secrets.token_urlsafe(32)
+
+
+class TowerKeyCache:
+    """Active towers' key digests, reloaded periodically."""
+
+    def __init__(self) -> None:
+        self._hashes: dict[str, str] = {}
+        self._loaded_at = float("-inf")
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def _reload_if(self, loaded_at: float) -> None:
+        with self._lock:
+            if self._loaded_at != loaded_at:
+                return  # another thread just reloaded
+            with session_scope() as db:
+                rows = db.execute(_ACTIVE_TOWER_KEYS_SQL).all()
+            self._hashes = {row.id: row.key_hash for row in rows}
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+
+    def verify(self, tower_id: str, key: str) -> bool:
+        """Whether ``key`` is ``tower_id``'s current key and the tower is active."""
+        loaded_at = self._loaded_at
+        age = time.monotonic() - loaded_at
+        if age >= get_settings().TOWER_KEY_CACHE_SECONDS or (
+            tower_id not in self._hashes and age >= MIN_RELOAD_SECONDS
+        ):
+            self._reload_if(loaded_at)
+        stored = self._hashes.get(tower_id)
+        matches = hmac.compare_digest(hash_key(key), stored or _NO_KEY)
+        return matches and stored is not None
+
+    def known(self, tower_id: str) -> bool:
+        return tower_id in self._hashes
+
+    def invalidate(self) -> None:
+        """Reload on the next ``verify``; the digests in hand stay until then."""
+        with self._lock:
+            self._loaded_at = float("-inf")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._hashes = {}
+            self._loaded_at = float("-inf")
+
+
+tower_keys = TowerKeyCache()
+
+
+class TowerKeyListener:
+    """Invalidates ``tower_keys`` on each ``tower_keys_changed`` notification.
+
+    Holds one connection outside the pool, watched with ``loop.add_reader``.
+    After connecting (or reconnecting, when notifications may have been
+    missed) it invalidates the cache as well.
+    """
+
+    def __init__(self, cache: TowerKeyCache = tower_keys) -> None:
+        self.cache = cache
+        self.notifications = 0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="tower_key_listener")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    @staticmethod
+    def _connect():
+        import psycopg2
+
+        url = make_url(get_settings().DATABASE_URL).set(drivername="postgresql")
+        conn = psycopg2.connect(url.render_as_string(hide_password=False))
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {KEYS_CHANGED_CHANNEL}")
+        return conn
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                conn = await run_in_threadpool(self._connect)
+            except Exception:
+                logger.exception("Tower key listener could not connect")
+                await asyncio.sleep(LISTEN_RETRY_SECONDS)
+                continue
+            self.cache.invalidate()
+            readable = asyncio.Event()
+            loop.add_reader(conn.fileno(), readable.set)
+            try:
+                while True:
+                    await readable.wait()
+                    readable.clear()
+                    conn.poll()
+                    if conn.notifies:
+                        self.notifications += len(conn.notifies)
+                        conn.notifies.clear()
+                        self.cache.invalidate()
+            except Exception:
+                logger.exception("Tower key listener lost its connection")
+            finally:
+                loop.remove_reader(conn.fileno())
+                conn.close()
+            await asyncio.sleep(LISTEN_RETRY_SECONDS)
+
+
+def notify_keys_changed(db: Session) -> None:
+    """Tell ``TowerKeyListener``s to reload once the caller commits."""
+    db.execute(_NOTIFY_KEYS_CHANGED_SQL)
+
+
+def create_tower(db: Session, tower_id: str, name: str | None, lat: float, lng: float) -> str:
+    """Register an active tower; returns its key (only its digest is stored). The caller commits."""
+    key = new_key()
+    db.add(Tower(id=tower_id, name=name, lat=lat, lng=lng, key_hash=hash_key(key)))
+    notify_keys_changed(db)
+    return key
+
+
+def rotate_key(db: Session, tower_id: str) -> str | None:
+    """Give a tower a new key, invalidating the old one; ``None`` if there is no such tower."""
+    key = new_key()
+    updated = db.execute(update(Tower).where(Tower.id == tower_id).values(key_hash=hash_key(key))).rowcount
+    if not updated:
+        return None
+    notify_keys_changed(db)
+    return key
+
+
+def set_active(db: Session, tower_id: str, active: bool) -> bool:
+    """Enable or revoke a tower; ``False`` if there is no such tower."""
+    updated = db.execute(update(Tower).where(Tower.id == tower_id).values(active=active)).rowcount
+    if updated:
+        notify_keys_changed(db)
+    return bool(updated)
+
+
+def list_towers(db: Session) -> list[Tower]:
+    return list(db.scalars(select(Tower).order_by(Tower.id)))
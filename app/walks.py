@@ -0,0 +1,263 @@
+"""Timers for active SafeWalks: overdue arrivals and missed check-ins.
+
+Every active walk has up to two deadlines, its ``expected_arrival_at`` and
+(when check-ins are on) its ``checkin_due_at``. ``walk_timers`` keeps them in
+a binary heap, so scheduling, rescheduling and firing a deadline cost
+O(log n) and an idle tick is a peek at the heap's head; the database is only
+touched when a deadline actually passes. Rescheduling and cancelling leave
+the old heap entry in place and it is skipped when it surfaces (the heap is
+rebuilt once stale entries outnumber live ones).
+
+``WalkScheduler`` is started by the app lifespan. It reloads every active
+walk's deadlines on startup, so restarts lose nothing (retrying with backoff
+while the database is unreachable, and firing nothing until it succeeds),
+then checks the heap every ``WALK_TIMER_TICK_SECONDS``. Firing is a conditional ``UPDATE`` that
+only matches a walk still past that deadline, so walks ended or checked in
+through another process (or fired by another worker that also loaded them)
+are never flagged twice. Walks started through another process after this
+one loaded are timed by that process.
+
+On serverless deployments set ``WALK_TIMER_TICK_SECONDS=0`` and run
+``python -m app.walks`` from cron instead.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .db import session_scope
+from .metrics import walk_alerts
+
+
+logger = logging.getLogger("compass.walks")
+
+OVERDUE = "overdue"
+CHECKIN = "missed_checkin"
+LOAD_RETRY_MAX_SECONDS = 60.0
+
+_ACTIVE_WALKS_SQL = text(
+    """
+    SELECT id, expected_arrival_at, overdue_at, checkin_due_at
+    FROM walks
+    WHERE ended_at IS NULL
+    """
+)
+
+_MARK_OVERDUE_SQL = text(
+    """
+    UPDATE walks SET overdue_at = :now
+    WHERE id = :walk_id AND ended_at IS NULL AND overdue_at IS NULL AND expected_arrival_at <= :now
+    RETURNING user_id
+    """
+)
+
+# Counts every interval that passed since the deadline (e.g. while the server
+# was down) and moves the deadline past ``now`` in one step.
+_MISSED_CHECKIN_SQL = text(
+    """
+    UPDATE walks
+    SET missed_checkins = missed_checkins + missed.n,
+        checkin_due_at = checkin_due_at + make_interval(secs => missed.n * checkin_interval_seconds)
+    FROM (
+        SELECT 1 + floor(extract(epoch FROM :now - checkin_due_at) / checkin_interval_seconds)::int AS n
+        FROM walks WHERE id = :walk_id
+    ) AS missed
+    WHERE id = :walk_id AND ended_at IS NULL AND checkin_due_at <= :now
+    RETURNING user_id, checkin_due_at, missed.n
+    """
+)
+
+_CHECKIN_DUE_SQL = text("SELECT checkin_due_at FROM walks WHERE id = :walk_id AND ended_at IS NULL")
+
+
+class WalkTimers:
+    """Deadline heap keyed by (walk_id, kind), with lazy deletion."""
+
+    def __init__(self) -> None:
+        # (due, seq, walk_id, kind); an entry is live while _due[(walk_id, kind)] == (due, seq)
+        self._heap: list[tuple[float, int, str, str]] = []
+        self._due: dict[tuple[str, str], tuple[float, int]] = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def schedule(self, walk_id: str, kind: str, due: float) -> None:
+        """Set (or move) a walk's ``kind`` deadline to ``due`` (unix time)."""
+        with self._lock:
+            seq = next(self._seq)
+            self._due[(walk_id, kind)] = (due, seq)
+            heapq.heappush(self._heap, (due, seq, walk_id, kind))
+            self._compact()
+
+    def cancel(self, walk_id: str, kind: str | None = None) -> None:
+        """Drop one of a walk's deadlines, or all of them."""
+        with self._lock:
+            for k in (kind,) if kind else (OVERDUE, CHECKIN):
+                self._due.pop((walk_id, k), None)
+            self._compact()
+
+    def next_due(self) -> float | None:
+        with self._lock:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> list[tuple[str, str, float]]:
+        """Remove and return ``(walk_id, kind, due)`` for every deadline at or before ``now``."""
+        fired = []
+        with self._lock:
+            while True:
+                self._drop_stale()
+                if not self._heap or self._heap[0][0] > now:
+                    return fired
+                due, _, walk_id, kind = heapq.heappop(self._heap)
+                del self._due[(walk_id, kind)]
+                fired.append((walk_id, kind, due))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._heap.clear()
+            self._due.clear()
+
+    def _drop_stale(self) -> None:
+        heap = self._heap
+        while heap and self._due.get((heap[0][2], heap[0][3])) != (heap[0][0], heap[0][1]):
+            heapq.heappop(heap)
+
+    def _compact(self) -> None:
+        if len(self._heap) > 2 * len(self._due) + 1024:
+            self._heap = [(due, seq, walk_id, kind) for (walk_id, kind), (due, seq) in self._due.items()]
+            heapq.heapify(self._heap)
+
+
+walk_timers = WalkTimers()
+
+
+def schedule_walk(
+    walk_id: str, expected_arrival_at: datetime, overdue_at: datetime | None, checkin_due_at: datetime | None
+) -> None:
+    """Register a walk's pending deadlines."""
+    if overdue_at is None:
+        walk_timers.schedule(walk_id, OVERDUE, expected_arrival_at.timestamp())
+    if checkin_due_at is not None:
+        walk_timers.schedule(walk_id, CHECKIN, checkin_due_at.timestamp())
+
+
+def load_active_walks() -> int:
+    """Schedule the deadlines of every active walk; returns the walk count."""
+    with session_scope() as db:
+        rows = db.execute(_ACTIVE_WALKS_SQL).all()
+    for row in rows:
+        schedule_walk(str(row.id), row.expected_arrival_at, row.overdue_at, row.checkin_due_at)
+    return len(rows)
+
+
+def _fire(db: Session, walk_id: str, kind: str, now: datetime) -> tuple[str, int] | None:
+    """Apply one passed deadline; returns ``(user_id, alerts)`` if the walk was flagged."""
+    params = {"walk_id": walk_id, "now": now}
+    if kind == OVERDUE:
+        user_id = db.scalar(_MARK_OVERDUE_SQL, params)
+        return (str(user_id), 1) if user_id is not None else None
+    row = db.execute(_MISSED_CHECKIN_SQL, params).first()
+    if row is not None:
+        walk_timers.schedule(walk_id, CHECKIN, row.checkin_due_at.timestamp())
+        return str(row.user_id), row.n
+    # Checked in (or ended) through another process: follow the walk's current deadline.
+    due = db.scalar(_CHECKIN_DUE_SQL, params)
+    if due is not None:
+        walk_timers.schedule(walk_id, CHECKIN, due.timestamp())
+    return None
+
+
+def fire_timers(fired: list[tuple[str, str, float]], now: float | None = None) -> None:
+    """Record overdue walks and missed check-ins for deadlines popped from ``walk_timers``."""
+    now_dt = datetime.fromtimestamp(time.time() if now is None else now, timezone.utc)
+    flagged = []
+    with session_scope() as db:
+        for walk_id, kind, _ in fired:
+            result = _fire(db, walk_id, kind, now_dt)
+            if result is not None:
+                flagged.append((walk_id, kind, *result))
+    for walk_id, kind, user_id, count in flagged:
+        walk_alerts.inc(kind, amount=count)
+        if kind == OVERDUE:
+            logger.warning("Walk %s by user %s is overdue", walk_id, user_id)
+        else:
+            logger.warning("Walk %s by user %s missed %d check-in(s)", walk_id, user_id, count)
+
+
+def run_due(now: float | None = None) -> int:
+    """Fire every deadline that has passed; returns how many fired."""
+    now = time.time() if now is None else now
+    fired = walk_timers.pop_due(now)
+    if fired:
+        try:
+            fire_timers(fired, now)
+        except Exception:
+            # Put them back so the next tick retries.
+            for walk_id, kind, due in fired:
+                walk_timers.schedule(walk_id, kind, due)
+            raise
+    return len(fired)
+
+
+class WalkScheduler:
+    def __init__(self, tick_seconds: float) -> None:
+        self.tick = tick_seconds
+        self.fired = 0
+        self.failures = 0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="walk_timers")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _load(self) -> bool:
+        try:
+            count = await run_in_threadpool(load_active_walks)
+        except Exception:
+            self.failures += 1
+            logger.exception("Loading active walks failed")
+            return False
+        logger.info("Loaded %d active walk(s)", count)
+        return True
+
+    async def _run(self) -> None:
+        # Until the active walks are loaded the heap only holds walks started
+        # since, so nothing fires; retry the load with backoff.
+        retry_delay = self.tick
+        while not await self._load():
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, max(LOAD_RETRY_MAX_SECONDS, self.tick))
+        while True:
+            await asyncio.sleep(self.tick)
+            next_due = walk_timers.next_due()
+            if next_due is None or next_due > time.time():
+                continue
+            try:
+                self.fired += await run_in_threadpool(run_due)
+            except Exception:
+                self.failures += 1
+                logger.exception("Walk timers failed")
+
+
+if __name__ == "__main__":
+    load_active_walks()
+    print(f"Fired {run_due()} walk timer(s)")
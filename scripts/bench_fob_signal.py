@@ -0,0 +1,117 @@
+"""
+Benchmark: one lost-signal detector cycle with a large fleet.
+
+Seeds (inside one transaction that is rolled back at the end) ``fobs``
+claimed fobs with ``history`` pings each, brings ``fob_signal`` up to date,
+then adds one cycle's worth of new pings (``new_pings``) and lets 1% of fobs
+go quiet. Times the incremental cycle (``track_last_seen`` + ``mark_lost``)
+against the full-table ``DISTINCT ON`` scan it replaces. Needs the database
+from ``DATABASE_URL``.
+
+Usage:
+    python scripts/bench_fob_signal.py [fobs] [history] [new_pings]
+"""
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text  # noqa: E402
+
+from app.db import SessionLocal, get_engine  # noqa: E402
+from app.fob_signal import mark_lost, track_last_seen  # noqa: E402
+
+
+LOST_AFTER_SECONDS = 300
+
+SEED_SQL = [
+    """
+    INSERT INTO users (id, username, password_hash)
+    SELECT gen_random_uuid(), :prefix || i, 'x' FROM generate_series(1, :fobs) AS i
+    """,
+    """
+    INSERT INTO fobs (fob_uid, owner_user_id)
+    SELECT 'FOB_' || username, id FROM users WHERE username LIKE :prefix || '%'
+    """,
+    # History: every fob pinged within the last few minutes, except the 1% that
+    # went quiet just past the threshold.
+    """
+    INSERT INTO pings (fob_uid, lat, lng, status, received_at)
+    SELECT 'FOB_' || :prefix || i, 43.66, -79.39, 0,
+           now() - make_interval(secs => CASE WHEN i % 100 = 0 THEN :lost_after + 60 + h ELSE 60 + h END)
+    FROM generate_series(1, :fobs) AS i
+    CROSS JOIN generate_series(1, :history) AS h
+    """,
+]
+
+NEW_PINGS_SQL = """
+    INSERT INTO pings (fob_uid, lat, lng, status, received_at)
+    SELECT 'FOB_' || :prefix || (1 + (i * 7919) % :fobs), 43.66, -79.39, 0, now() - interval '1 second'
+    FROM generate_series(1, :new_pings) AS i
+    WHERE (1 + (i * 7919) % :fobs) % 100 <> 0
+"""
+
+FULL_SCAN_SQL = text(
+    """
+    SELECT count(*) FROM (
+        SELECT DISTINCT ON (fob_uid) fob_uid, received_at
+        FROM pings
+        ORDER BY fob_uid, received_at DESC
+    ) AS latest
+    WHERE received_at < now() - make_interval(secs => :lost_after)
+    """
+)
+
+
+def main():
+    fobs = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    history = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    new_pings = int(sys.argv[3]) if len(sys.argv) > 3 else 5_000
+    params = {
+        "prefix": f"bench_sig_{uuid.uuid4().hex[:8]}_",
+        "fobs": fobs,
+        "history": history,
+        "new_pings": new_pings,
+        "lost_after": LOST_AFTER_SECONDS,
+    }
+
+    get_engine()
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        for statement in SEED_SQL:
+            db.execute(text(statement), params)
+        while track_last_seen(db, batch_size=200_000, settle_seconds=0)[0]:
+            pass
+        db.execute(text("ANALYZE pings"))
+        db.execute(text("ANALYZE fob_signal"))
+        print(f"seeded {fobs} fobs x {history} pings in {time.perf_counter() - started:.1f} s")
+
+        db.execute(text(NEW_PINGS_SQL), params)
+
+        started = time.perf_counter()
+        processed, restored, _ = track_last_seen(db, settle_seconds=0)
+        track_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        lost = mark_lost(db, LOST_AFTER_SECONDS)
+        lost_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        mark_lost(db, LOST_AFTER_SECONDS)
+        idle_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        scanned = db.execute(FULL_SCAN_SQL, {"lost_after": LOST_AFTER_SECONDS}).scalar_one()
+        scan_ms = (time.perf_counter() - started) * 1000
+
+        print(f"track_last_seen: {track_ms:8.1f} ms ({processed} new pings, {len(restored)} restored)")
+        print(f"mark_lost:       {lost_ms:8.1f} ms ({len(lost)} lost); again with nothing new: {idle_ms:.1f} ms")
+        print(f"DISTINCT ON scan: {scan_ms:7.1f} ms ({scanned} quiet fobs)")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
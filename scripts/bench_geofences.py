@@ -0,0 +1,158 @@
+"""
+Benchmark: per-ping geofence evaluation cost, in memory and at ingest.
+
+Builds ``zones`` square and 40-vertex circular safe zones on a campus-sized
+grid and walks a fob through them in ~10 m steps. First times the zone
+lookup alone (the grid index against testing every zone's polygon). Then it
+replays the walk the way ``POST /tower/pings`` handles it, against
+``DATABASE_URL``. For each ping it reads the fob with its owner's
+``geofences_version``, inserts the ping, runs ``evaluate_ping`` (including
+the fob lock and event diff when the zone set changes) and commits. It does
+this for an owner without zones and for one with them, alternating over
+three rounds, and reports each one's best pings per second and its SQL
+statements per ping.
+
+Creates and finally deletes users ``bench_geo_*`` and fobs ``BENCH_GEO_*``;
+use a scratch database.
+
+Usage:
+    python scripts/bench_geofences.py [zones] [pings]
+"""
+import math
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import delete, event  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+from app.db import session_scope  # noqa: E402
+from app.geo import METERS_PER_DEG_LAT  # noqa: E402
+from app.geofences import Zone, ZoneIndex, contains, evaluate_ping, fob_zone_states, zone_index_cache  # noqa: E402
+from app.models import Fob, Geofence, Ping, User  # noqa: E402
+from app.routes.tower_ingest import FOB_WITH_GEOFENCES_VERSION  # noqa: E402
+
+
+ORIGIN = (43.6629, -79.3957)
+ROUNDS = 3
+
+
+def offset(meters_north: float, meters_east: float) -> tuple[float, float]:
+    scale = METERS_PER_DEG_LAT * math.cos(math.radians(ORIGIN[0]))
+    return ORIGIN[0] + meters_north / METERS_PER_DEG_LAT, ORIGIN[1] + meters_east / scale
+
+
+def make_zones(count: int) -> list[Zone]:
+    zones = []
+    for i in range(count):
+        north, east = 400 * (i % 5), 400 * (i // 5)
+        if i % 2:
+            ring = [(north + 150 * math.cos(a), east + 150 * math.sin(a)) for a in (k * math.pi / 20 for k in range(40))]
+        else:
+            ring = [(north - 120, east - 120), (north - 120, east + 120), (north + 120, east + 120), (north + 120, east - 120)]
+        points = [offset(n, e) for n, e in ring]
+        zones.append(Zone(id=str(i), name=f"zone {i}", lats=tuple(p[0] for p in points), lngs=tuple(p[1] for p in points)))
+    return zones
+
+
+def cleanup() -> None:
+    with session_scope() as db:
+        db.execute(delete(Ping).where(Ping.fob_uid.like("BENCH\\_GEO\\_%")))
+        db.execute(delete(Fob).where(Fob.fob_uid.like("BENCH\\_GEO\\_%")))
+        # Cascades to geofences and geofence_events.
+        db.execute(delete(User).where(User.username.like("bench\\_geo\\_%")))
+
+
+def create_owner(name: str, zones: list[Zone]) -> str:
+    fob_uid = f"BENCH_GEO_{name.upper()}"
+    with session_scope() as db:
+        user = User(username=f"bench_geo_{name}", password_hash="x", geofences_version=1 if zones else 0)
+        db.add(user)
+        db.flush()
+        db.add(Fob(fob_uid=fob_uid, owner_user_id=user.id))
+        for zone in zones:
+            db.add(Geofence(user_id=user.id, name=zone.name, vertices=[list(p) for p in zip(zone.lats, zone.lngs)]))
+    return fob_uid
+
+
+def ingest(fob_uid: str, walk: list[tuple[float, float]]) -> tuple[float, float, int]:
+    """Replay ``walk`` as ingest does; returns pings/s, statements/ping and events written."""
+    zone_index_cache.clear()
+    fob_zone_states.clear()
+    statements = 0
+    transitions = 0
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        nonlocal statements
+        statements += 1
+
+    event.listen(Engine, "before_cursor_execute", count)
+    started = time.perf_counter()
+    try:
+        for lat, lng in walk:
+            with session_scope() as db:
+                fob, geofences_version = db.execute(FOB_WITH_GEOFENCES_VERSION, {"fob_uid": fob_uid}).one()
+                db.add(Ping(fob_uid=fob_uid, lat=lat, lng=lng, status=0))
+                update = evaluate_ping(db, fob.owner_user_id, geofences_version, fob_uid, lat, lng)
+            if update is not None:
+                update.apply()
+                transitions += len(update.events)
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(Engine, "before_cursor_execute", count)
+    return len(walk) / elapsed, statements / len(walk), transitions
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    pings = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rng = random.Random(1)
+    zones = make_zones(count)
+
+    started = time.perf_counter()
+    index = ZoneIndex(1, zones)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    north = east = 0.0
+    walk = []
+    for _ in range(pings):
+        north = min(max(north + rng.gauss(0, 10), -200), 2000)
+        east = min(max(east + rng.gauss(0, 10), -200), 400 * (count // 5) + 200)
+        walk.append(offset(north, east))
+
+    started = time.perf_counter()
+    for lat, lng in walk:
+        {z.id for z in zones if contains(z.lats, z.lngs, lat, lng)}
+    naive_us = (time.perf_counter() - started) / pings * 1e6
+
+    started = time.perf_counter()
+    for lat, lng in walk:
+        index.zones_at(lat, lng, index.cell(lat, lng))
+    indexed_us = (time.perf_counter() - started) / pings * 1e6
+
+    print(f"{count} zones, {len(index.cells)} grid cells, built in {build_ms:.1f} ms")
+    print(f"all polygons per ping: {naive_us:8.2f} us")
+    print(f"grid index per ping:   {indexed_us:8.2f} us")
+
+    # Alternate the two owners and keep each one's best round, so warm-up and
+    # drift in the database don't favour either.
+    plain = zoned = (0.0, 0.0, 0)
+    for _ in range(ROUNDS):
+        cleanup()
+        try:
+            plain = max(plain, ingest(create_owner("plain", []), walk))
+            zoned = max(zoned, ingest(create_owner("zoned", zones), walk))
+        finally:
+            cleanup()
+    print(f"ingest, no zones:  {plain[0]:8.0f} pings/s, {plain[1]:.2f} statements/ping")
+    print(
+        f"ingest, {count} zones: {zoned[0]:8.0f} pings/s, {zoned[1]:.2f} statements/ping"
+        f" ({zoned[2]} events; {zoned[0] / plain[0]:.3f}x the no-zone rate)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Micro-benchmark: scoring a walking route against nearby incident clusters.
+
+Builds a random-walk route of ``vertices`` points (~10 m apart) through a
+campus-sized box holding ``incidents`` random clusters, then times
+``score_points`` (the vectorized core of ``POST /incidents/route-score``) and
+checks its count against a brute-force per-segment loop. No database is
+needed.
+
+Usage:
+    python scripts/bench_route_score.py [vertices] [incidents] [buffer_m]
+"""
+import math
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.geo import METERS_PER_DEG_LAT  # noqa: E402
+from app.route_score import corridor_cells, score_points  # noqa: E402
+
+
+ORIGIN = (43.6629, -79.3957)
+
+
+def brute_force_count(route_lats, route_lngs, lats, lngs, buffer_m: float) -> int:
+    scale = METERS_PER_DEG_LAT * math.cos(math.radians(ORIGIN[0]))
+    rx, ry = (route_lngs - ORIGIN[1]) * scale, (route_lats - ORIGIN[0]) * METERS_PER_DEG_LAT
+    qx, qy = (lngs - ORIGIN[1]) * scale, (lats - ORIGIN[0]) * METERS_PER_DEG_LAT
+    best = np.full(len(qx), np.inf)
+    for i in range(len(rx) - 1):
+        dx, dy = rx[i + 1] - rx[i], ry[i + 1] - ry[i]
+        t = np.clip(((qx - rx[i]) * dx + (qy - ry[i]) * dy) / max(dx * dx + dy * dy, 1e-12), 0, 1)
+        best = np.minimum(best, np.hypot(qx - rx[i] - t * dx, qy - ry[i] - t * dy))
+    return int((best <= buffer_m).sum())
+
+
+def main():
+    vertices = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    incidents = int(sys.argv[2]) if len(sys.argv) > 2 else 40_000
+    buffer_m = float(sys.argv[3]) if len(sys.argv) > 3 else 100.0
+    rng = np.random.default_rng(1)
+
+    heading = np.cumsum(rng.normal(0, 0.2, vertices))
+    north, east = np.cumsum(np.cos(heading) * 10), np.cumsum(np.sin(heading) * 10)
+    scale = METERS_PER_DEG_LAT * math.cos(math.radians(ORIGIN[0]))
+    route_lats, route_lngs = ORIGIN[0] + north / METERS_PER_DEG_LAT, ORIGIN[1] + east / scale
+
+    lats = ORIGIN[0] + (rng.random(incidents) - 0.5) * 0.06
+    lngs = ORIGIN[1] + (rng.random(incidents) - 0.5) * 0.08
+    now = time.time()
+    last_reported = now - rng.random(incidents) * 86_400
+
+    timings = []
+    for _ in range(20):
+        started = time.perf_counter()
+        cells = corridor_cells(list(route_lats), list(route_lngs), buffer_m)
+        result = score_points(route_lats, route_lngs, lats, lngs, last_reported, buffer_m, now, 6 * 3600)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+
+    print(f"route: {vertices} vertices, {result.length_m:.0f} m, {len(cells)} grid cells")
+    print(f"candidates: {incidents}, within {buffer_m:g} m: {result.incident_count}")
+    print(f"brute force agrees: {brute_force_count(route_lats, route_lngs, lats, lngs, buffer_m) == result.incident_count}")
+    print(f"p50 {timings[len(timings) // 2]:.2f} ms, max {timings[-1]:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Micro-benchmark: per-request cost of settings lookup on the /tower/pings path.
+
+Compares rebuilding ``Settings()`` from os.environ (the old behaviour of
+``get_settings``) against reading the cached snapshot, and times the
+``verify_tower_key`` dependency itself with the snapshot in place.
+
+Usage:
+    python scripts/bench_settings.py [iterations]
+"""
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.deps import verify_tower_key  # noqa: E402
+from app.settings import Settings, get_settings, reload_settings  # noqa: E402
+
+
+def per_call_us(fn, iterations: int) -> float:
+    return min(timeit.repeat(fn, number=iterations, repeat=5)) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    key = reload_settings().TOWER_SHARED_KEY
+
+    rebuild = per_call_us(Settings, iterations)
+    snapshot = per_call_us(get_settings, iterations)
+    verify = per_call_us(lambda: verify_tower_key(key, None), iterations)
+
+    print(f"Settings() rebuild:        {rebuild:8.3f} us/call")
+    print(f"get_settings() snapshot:   {snapshot:8.3f} us/call")
+    print(f"verify_tower_key():        {verify:8.3f} us/call")
+    print(f"saved per /tower/pings:    {rebuild - snapshot:8.3f} us")
+
+
+if __name__ == "__main__":
+    main()
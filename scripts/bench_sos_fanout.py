@@ -0,0 +1,101 @@
+"""
+Benchmark: SOS fan-out to nearby friends.
+
+Seeds (inside one transaction that is rolled back at the end) an owner with
+``friends`` sharing friends, each with a fob and ``history`` pings scattered
+over a few kilometres, then times ``fan_out_sos`` (the statement ingest runs
+on every SOS ping). Each run is rolled back to a savepoint so the cooldown
+never short-circuits later runs. Needs the database from ``DATABASE_URL``.
+
+Usage:
+    python scripts/bench_sos_fanout.py [friends] [history] [radius_m]
+"""
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text  # noqa: E402
+
+from app.db import SessionLocal, get_engine  # noqa: E402
+
+
+ORIGIN = (43.6629, -79.3957)
+
+SEED_SQL = [
+    "INSERT INTO users (id, username, password_hash) VALUES (:owner, :prefix || 'owner', 'x')",
+    """
+    INSERT INTO users (id, username, password_hash)
+    SELECT gen_random_uuid(), :prefix || i, 'x' FROM generate_series(1, :friends) AS i
+    """,
+    """
+    INSERT INTO friendships (user_id, friend_id, is_sharing_location)
+    SELECT :owner, id, true FROM users WHERE username LIKE :prefix || '%' AND id <> :owner
+    UNION ALL
+    SELECT id, :owner, true FROM users WHERE username LIKE :prefix || '%' AND id <> :owner
+    """,
+    """
+    INSERT INTO fobs (fob_uid, owner_user_id)
+    SELECT 'FOB_' || username, id FROM users WHERE username LIKE :prefix || '%'
+    """,
+    """
+    INSERT INTO pings (fob_uid, lat, lng, status, received_at)
+    SELECT fobs.fob_uid,
+           :lat + (random() - 0.5) * 0.05,
+           :lng + (random() - 0.5) * 0.07,
+           0,
+           now() - make_interval(secs => h * 30)
+    FROM fobs
+    JOIN users ON users.id = fobs.owner_user_id AND users.username LIKE :prefix || '%'
+    CROSS JOIN generate_series(0, :history - 1) AS h
+    """,
+]
+
+
+def main():
+    friends = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    history = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    radius = sys.argv[3] if len(sys.argv) > 3 else "1000"
+    os.environ["SOS_ALERT_RADIUS_M"] = radius
+
+    from app.sos import fan_out_sos
+
+    get_engine()
+    db = SessionLocal()
+    owner = str(uuid.uuid4())
+    params = {
+        "owner": owner,
+        "prefix": f"bench_sos_{owner[:8]}_",
+        "friends": friends,
+        "history": history,
+        "lat": ORIGIN[0],
+        "lng": ORIGIN[1],
+    }
+    try:
+        started = time.perf_counter()
+        for statement in SEED_SQL:
+            db.execute(text(statement), params)
+        db.execute(text("ANALYZE pings"))
+        print(f"seeded {friends} friends x {history} pings in {time.perf_counter() - started:.1f} s")
+
+        timings = []
+        for _ in range(20):
+            savepoint = db.begin_nested()
+            started = time.perf_counter()
+            alerts = fan_out_sos(db, owner, f"FOB_{params['prefix']}owner", *ORIGIN)
+            timings.append((time.perf_counter() - started) * 1000)
+            savepoint.rollback()
+        timings.sort()
+
+        print(f"alerted {len(alerts)} of {friends} friends within {radius} m")
+        print(f"p50 {timings[len(timings) // 2]:.2f} ms, max {timings[-1]:.2f} ms")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Micro-benchmark: per-request SQL construction/compile overhead for the map and
+friends queries.
+
+Compares the old per-request path (concatenate the SQL string, wrap it in a new
+``text()``, derive its cache key) with the prebuilt module-level statements
+now used by the routes, and shows what a full compile costs on a cache miss.
+No database is needed.
+
+Usage:
+    python scripts/bench_sql_compile.py [iterations]
+"""
+import sys
+import timeit
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import psycopg2
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.routes.friends import FRIENDS_WITH_LATEST_PING_SQL  # noqa: E402
+from app.routes.map import LATEST_MAP_SINCE_SQL, _LATEST_MAP_ORDER, _LATEST_MAP_SELECT  # noqa: E402
+
+
+def per_call_us(fn, iterations: int) -> float:
+    return min(timeit.repeat(fn, number=iterations, repeat=5)) / iterations * 1e6
+
+
+def old_map_statement():
+    sql = _LATEST_MAP_SELECT
+    sql += " AND pings.received_at >= :cutoff"
+    sql += _LATEST_MAP_ORDER
+    stmt = text(sql)
+    stmt._generate_cache_key()
+    return stmt
+
+
+def old_friends_statement():
+    stmt = text(FRIENDS_WITH_LATEST_PING_SQL.text)
+    stmt._generate_cache_key()
+    return stmt
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    dialect = psycopg2.dialect()
+
+    rows = [
+        ("map: per-request text()", per_call_us(old_map_statement, iterations)),
+        ("map: prebuilt", per_call_us(LATEST_MAP_SINCE_SQL._generate_cache_key, iterations)),
+        ("map: compile (cache miss)", per_call_us(lambda: LATEST_MAP_SINCE_SQL.compile(dialect=dialect), iterations // 10)),
+        ("friends: per-request text()", per_call_us(old_friends_statement, iterations)),
+        ("friends: prebuilt", per_call_us(FRIENDS_WITH_LATEST_PING_SQL._generate_cache_key, iterations)),
+        ("friends: compile (cache miss)", per_call_us(lambda: FRIENDS_WITH_LATEST_PING_SQL.compile(dialect=dialect), iterations // 10)),
+    ]
+    for label, us in rows:
+        print(f"{label:32s} {us:8.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Micro-benchmark: walk deadline timers at scale.
+
+Schedules ``walks`` active walks (an expected arrival within two hours and a
+check-in every 5-15 minutes), then simulates ``minutes`` of one-second
+scheduler ticks in which a random quarter of walks check in each minute
+(rescheduling their deadline), some end (cancelling theirs) and every passed
+deadline is popped. Prints per-operation cost, the cost of an idle tick and
+the heap's memory. No database is needed.
+
+Usage:
+    python scripts/bench_walk_timers.py [walks] [minutes]
+"""
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.walks import CHECKIN, OVERDUE, WalkTimers  # noqa: E402
+
+
+def main():
+    walks = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    minutes = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    rng = random.Random(1)
+    ids = [f"walk-{i}" for i in range(walks)]
+    intervals = {walk_id: rng.uniform(300, 900) for walk_id in ids}
+    now = 0.0
+
+    tracemalloc.start()
+    timers = WalkTimers()
+    started = time.perf_counter()
+    for walk_id in ids:
+        timers.schedule(walk_id, OVERDUE, rng.uniform(600, 7200))
+        timers.schedule(walk_id, CHECKIN, intervals[walk_id])
+    schedule_us = (time.perf_counter() - started) / (2 * walks) * 1e6
+    memory_mb = tracemalloc.get_traced_memory()[0] / 1e6
+    tracemalloc.stop()
+
+    checkins = fired = ended = 0
+    checkin_s = pop_s = cancel_s = 0.0
+    for _ in range(minutes):
+        for walk_id in rng.sample(ids, walks // 4):
+            t = time.perf_counter()
+            timers.schedule(walk_id, CHECKIN, now + intervals[walk_id])
+            checkin_s += time.perf_counter() - t
+            checkins += 1
+        for walk_id in rng.sample(ids, walks // 200):
+            t = time.perf_counter()
+            timers.cancel(walk_id)
+            cancel_s += time.perf_counter() - t
+            ended += 1
+        for _ in range(60):
+            now += 1
+            t = time.perf_counter()
+            due = timers.pop_due(now)
+            pop_s += time.perf_counter() - t
+            fired += len(due)
+            for walk_id, kind, _ in due:  # a missed check-in moves to the next interval
+                if kind == CHECKIN:
+                    timers.schedule(walk_id, CHECKIN, now + intervals[walk_id])
+
+    idle = WalkTimers()
+    idle.schedule("walk", OVERDUE, 1e12)
+    t = time.perf_counter()
+    for _ in range(100_000):
+        idle.pop_due(now)
+    idle_us = (time.perf_counter() - t) / 100_000 * 1e6
+
+    print(f"{walks} walks, {len(timers)} live timers, heap {len(timers._heap)} entries, {memory_mb:.1f} MB")
+    print(f"schedule:  {schedule_us:6.2f} us")
+    print(f"check-in:  {checkin_s / checkins * 1e6:6.2f} us ({checkins} check-ins)")
+    print(f"cancel:    {cancel_s / max(ended, 1) * 1e6:6.2f} us ({ended} ended)")
+    print(f"fire:      {pop_s / max(fired, 1) * 1e6:6.2f} us per deadline ({fired} fired over {minutes * 60} ticks)")
+    print(f"idle tick: {idle_us:6.2f} us")
+
+
+if __name__ == "__main__":
+    main()
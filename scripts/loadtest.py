@@ -0,0 +1,359 @@
+"""
+Synthetic data generator and local load-test harness.
+
+``seed`` bulk-loads users, mutual friendships (heavy-tailed degree
+distribution), fobs and a history of pings with COPY. All seeded users share
+one password so the load run can log in as any of them.
+
+``run`` drives open-loop mixed traffic with asyncio against a running server
+(or one it starts with ``--serve``): tower pings, map polls, friends lists and
+logins, each at its own rate. Each fob random-walks a few meters per ping, so
+pings pass the impossible-movement filter and exercise the full ingest path. Throughput and p50/p95/p99 latency per endpoint
+are printed as JSON (and written to ``--out``) so releases can be compared.
+
+Usage:
+    python scripts/loadtest.py seed --users 10000 --pings 1000000 [--prefix lt] [--reset]
+    python scripts/loadtest.py run --duration 60 --ping-hz 200 --map-hz 50 \\
+        --friends-hz 20 --login-hz 2 [--serve] [--out results.json]
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.settings import get_settings  # noqa: E402
+
+
+PASSWORD = "loadtest-password"
+
+
+# --- seeding -----------------------------------------------------------------
+
+
+def friend_degrees(n_users: int, mean_degree: float, rng: random.Random) -> list[int]:
+    """Heavy-tailed target degrees (Pareto, alpha 2.5) scaled to ``mean_degree``."""
+    alpha = 2.5
+    scale = mean_degree * (alpha - 1) / alpha
+    cap = max(n_users - 1, 0)
+    return [min(cap, int(scale * rng.paretovariate(alpha))) for _ in range(n_users)]
+
+
+def friendship_pairs(n_users: int, mean_degree: float, rng: random.Random) -> set[tuple[int, int]]:
+    """Undirected pairs via a configuration model (self-loops/duplicates dropped)."""
+    stubs = [i for i, degree in enumerate(friend_degrees(n_users, mean_degree, rng)) for _ in range(degree)]
+    rng.shuffle(stubs)
+    pairs = set()
+    for a, b in zip(stubs[::2], stubs[1::2]):
+        if a != b:
+            pairs.add((min(a, b), max(a, b)))
+    return pairs
+
+
+def copy_rows(cursor, table: str, columns: tuple[str, ...], rows) -> int:
+    buffer = io.StringIO()
+    count = 0
+    for row in rows:
+        buffer.write("\t".join("\\N" if value is None else str(value) for value in row))
+        buffer.write("\n")
+        count += 1
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+    return count
+
+
+def seed(args) -> None:
+    import psycopg2
+    from sqlalchemy import make_url
+
+    from app.auth import hash_password
+
+    rng = random.Random(args.seed)
+    password_hash = hash_password(PASSWORD)
+    user_ids = [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(args.users)]
+    pairs = friendship_pairs(args.users, args.mean_degree, rng)
+    fob_uids = [f"{args.prefix.upper()}_FOB_{i}" for i in range(args.users)]
+    now = datetime.now(timezone.utc)
+    history = timedelta(days=args.days).total_seconds()
+
+    url = make_url(get_settings().DATABASE_URL).set(drivername="postgresql")
+    conn = psycopg2.connect(url.render_as_string(hide_password=False))
+    started = time.perf_counter()
+    try:
+        with conn, conn.cursor() as cur:
+            if args.reset:
+                # Deleting users cascades to their friendships and fobs.
+                cur.execute("DELETE FROM pings WHERE fob_uid LIKE %s", (f"{args.prefix.upper()}\\_FOB\\_%",))
+                cur.execute("DELETE FROM users WHERE username LIKE %s", (f"{args.prefix}\\_%",))
+            counts = {
+                "users": copy_rows(
+                    cur, "users", ("id", "username", "password_hash"),
+                    ((uid, f"{args.prefix}_{i}", password_hash) for i, uid in enumerate(user_ids)),
+                ),
+                "friendships": copy_rows(
+                    cur, "friendships", ("user_id", "friend_id"),
+                    (
+                        (user_ids[x], user_ids[y])
+                        for a, b in pairs
+                        for x, y in ((a, b), (b, a))
+                    ),
+                ),
+                "fobs": copy_rows(
+                    cur, "fobs", ("fob_uid", "owner_user_id"),
+                    ((fob_uids[i], user_ids[i]) for i in range(args.users) if rng.random() < args.fob_ratio),
+                ),
+            }
+            cur.execute("SELECT fob_uid FROM fobs WHERE fob_uid LIKE %s", (f"{args.prefix.upper()}\\_FOB\\_%",))
+            owned = [row[0] for row in cur.fetchall()]
+            counts["pings"] = copy_rows(
+                cur, "pings", ("fob_uid", "lat", "lng", "status", "received_at"),
+                (
+                    (
+                        rng.choice(owned),
+                        round(43.6 + rng.random() * 0.2, 6),
+                        round(-79.5 + rng.random() * 0.2, 6),
+                        2 if rng.random() < 0.001 else (1 if rng.random() < 0.02 else 0),
+                        (now - timedelta(seconds=rng.random() * history)).isoformat(),
+                    )
+                    for _ in range(args.pings if owned else 0)
+                ),
+            )
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("ANALYZE users, friendships, fobs, pings")
+    finally:
+        conn.close()
+    counts["seconds"] = round(time.perf_counter() - started, 2)
+    print(json.dumps(counts, indent=2))
+
+
+# --- load run ----------------------------------------------------------------
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.statuses: dict[str, dict[str, int]] = {}
+
+    def record(self, endpoint: str, seconds: float, status: int | None) -> None:
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        codes = self.statuses.setdefault(endpoint, {})
+        key = str(status) if status is not None else "error"
+        codes[key] = codes.get(key, 0) + 1
+        if status is None or status >= 400:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            samples = sorted(samples)
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "errors": self.errors.get(endpoint, 0),
+                "statuses": self.statuses[endpoint],
+                "throughput_rps": round(len(samples) / elapsed, 2),
+                "p50_ms": round(percentile(samples, 50) * 1000, 2),
+                "p95_ms": round(percentile(samples, 95) * 1000, 2),
+                "p99_ms": round(percentile(samples, 99) * 1000, 2),
+                "max_ms": round(samples[-1] * 1000, 2),
+            }
+        return endpoints
+
+
+def percentile(sorted_samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    rank = max(1, math.ceil(pct / 100 * len(sorted_samples)))
+    return sorted_samples[rank - 1]
+
+
+async def timed(client, recorder: Recorder, endpoint: str, method: str, url: str, **kwargs):
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+        status = response.status_code
+    except Exception:
+        response, status = None, None
+    recorder.record(endpoint, time.perf_counter() - started, status)
+    return response
+
+
+async def drive(rate_hz: float, deadline: float, limiter: asyncio.Semaphore, make_request) -> None:
+    """Open-loop arrivals at ``rate_hz``; requests over the concurrency limit wait."""
+    if rate_hz <= 0:
+        return
+    interval = 1 / rate_hz
+    next_at = time.perf_counter()
+    pending = set()
+
+    async def one():
+        async with limiter:
+            await make_request()
+
+    while next_at < deadline:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(one())
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        next_at += interval
+    if pending:
+        await asyncio.gather(*pending)
+
+
+async def run_load(args) -> dict:
+    import httpx
+
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=30, limits=limits) as client:
+        usernames = [f"{args.prefix}_{i}" for i in rng.sample(range(args.users), min(args.sessions, args.users))]
+        responses = await asyncio.gather(
+            *(
+                client.post("/auth/login", json={"username": username, "password": PASSWORD})
+                for username in usernames
+            )
+        )
+        tokens = [r.json()["access_token"] for r in responses if r.status_code == 200]
+        if not tokens:
+            raise SystemExit("No seeded users could log in; run `seed` first with the same --prefix")
+        fob_uids = [f"{args.prefix.upper()}_FOB_{i}" for i in range(args.users)]
+        positions: dict[str, tuple[float, float]] = {}
+
+        def auth():
+            return {"Authorization": f"Bearer {rng.choice(tokens)}"}
+
+        async def tower_ping():
+            fob_uid = rng.choice(fob_uids)
+            lat, lng = positions.get(fob_uid) or (43.6 + rng.random() * 0.2, -79.5 + rng.random() * 0.2)
+            # Up to ~10 m per ping; random jumps would all be quarantined as impossible movement.
+            lat, lng = lat + rng.uniform(-1e-4, 1e-4), lng + rng.uniform(-1e-4, 1e-4)
+            positions[fob_uid] = lat, lng
+            await timed(
+                client, recorder, "POST /tower/pings", "POST", "/tower/pings",
+                headers={"X-Tower-Key": get_settings().TOWER_SHARED_KEY},
+                json={"fob_uid": fob_uid, "lat": lat, "lng": lng, "status": 0},
+            )
+
+        async def map_poll():
+            await timed(
+                client, recorder, "GET /map/latest", "GET", "/map/latest",
+                headers=auth(), params={"window_minutes": 60} if rng.random() < 0.5 else None,
+            )
+
+        async def friends_list():
+            await timed(client, recorder, "GET /friends", "GET", "/friends", headers=auth())
+
+        async def login():
+            await timed(
+                client, recorder, "POST /auth/login", "POST", "/auth/login",
+                json={"username": rng.choice(usernames), "password": PASSWORD},
+            )
+
+        limiter = asyncio.Semaphore(args.concurrency)
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(
+            drive(args.ping_hz, deadline, limiter, tower_ping),
+            drive(args.map_hz, deadline, limiter, map_poll),
+            drive(args.friends_hz, deadline, limiter, friends_list),
+            drive(args.login_hz, deadline, limiter, login),
+        )
+        elapsed = time.perf_counter() - started
+
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "base_url": args.base_url,
+        "duration_seconds": round(elapsed, 2),
+        "rates_hz": {
+            "tower_pings": args.ping_hz,
+            "map_polls": args.map_hz,
+            "friends_lists": args.friends_hz,
+            "logins": args.login_hz,
+        },
+        "concurrency": args.concurrency,
+        "sessions": len(tokens),
+        "endpoints": recorder.report(elapsed),
+    }
+
+
+def start_server(base_url: str) -> subprocess.Popen:
+    import httpx
+
+    port = httpx.URL(base_url).port or 8000
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.index:app", "--port", str(port), "--log-level", "warning"],
+        cwd=Path(__file__).resolve().parent.parent,
+    )
+    for _ in range(100):
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    server.terminate()
+    raise SystemExit("uvicorn did not become healthy")
+
+
+def run(args) -> None:
+    server = start_server(args.base_url) if args.serve else None
+    try:
+        results = asyncio.run(run_load(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.out:
+        Path(args.out).write_text(output + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--users", type=int, default=10_000)
+    common.add_argument("--prefix", default="lt", help="username / fob uid prefix for seeded rows")
+    common.add_argument("--seed", type=int, default=42, help="random seed")
+
+    seed_parser = commands.add_parser("seed", parents=[common], help="bulk-load synthetic data with COPY")
+    seed_parser.add_argument("--pings", type=int, default=1_000_000)
+    seed_parser.add_argument("--days", type=float, default=30, help="spread pings over this many days")
+    seed_parser.add_argument("--mean-degree", type=float, default=20)
+    seed_parser.add_argument("--fob-ratio", type=float, default=0.9, help="share of users owning a fob")
+    seed_parser.add_argument("--reset", action="store_true", help="delete rows from a previous seed first")
+    seed_parser.set_defaults(handler=seed)
+
+    run_parser = commands.add_parser("run", parents=[common], help="drive mixed traffic and report latency")
+    run_parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    run_parser.add_argument("--serve", action="store_true", help="start uvicorn for the run")
+    run_parser.add_argument("--duration", type=float, default=30)
+    run_parser.add_argument("--ping-hz", type=float, default=100)
+    run_parser.add_argument("--map-hz", type=float, default=20)
+    run_parser.add_argument("--friends-hz", type=float, default=10)
+    run_parser.add_argument("--login-hz", type=float, default=1)
+    run_parser.add_argument("--sessions", type=int, default=200, help="users to log in for authenticated traffic")
+    run_parser.add_argument("--concurrency", type=int, default=64)
+    run_parser.add_argument("--out", help="also write the JSON report here")
+    run_parser.set_defaults(handler=run)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Replay recorded pings through the impossible-movement filter.
+
+Reads the last ``--hours`` of pings from ``DATABASE_URL`` (both ``pings`` and
+``quarantined_pings``, i.e. everything towers sent), or a CSV with columns
+``fob_uid,lat,lng,received_at[,status][,noise]`` (``received_at`` in unix
+seconds or ISO 8601; ``noise`` 1 marks a point known to be bad). Each
+``--max-speed`` is replayed from an empty cache with
+``MovementFilter.check_batch``, and the report gives how many pings it would
+quarantine and how many of those were false positives. As at ingest, SOS
+pings (``status`` 2) are always accepted.
+
+With a ``noise`` column, false positives are quarantined points not marked
+as noise. Without one they are estimated from the fob's next ping: if it
+is plausible from the quarantined point but not from the last accepted one,
+the fob really was there (a relocation, which costs one quarantined ping);
+if it isn't plausible from the quarantined point, that was a spike. Anything
+else (the fob's last ping, or a next ping plausible from both) is counted as
+undetermined.
+
+Usage:
+    python scripts/replay_movement_filter.py [--hours 24] [--max-speed 30,50,70] [--noise-m 250]
+    python scripts/replay_movement_filter.py --csv pings.csv [--max-speed ...]
+"""
+import argparse
+import csv
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from app.db import session_scope  # noqa: E402
+from app.geo import pairwise_haversine_m  # noqa: E402
+from app.movement import MovementFilter  # noqa: E402
+from app.settings import get_settings  # noqa: E402
+
+
+SOS = 2
+
+RECORDED_PINGS_SQL = text(
+    """
+    SELECT fob_uid, lat, lng, status, extract(epoch FROM received_at) AS at
+    FROM pings WHERE received_at >= now() - make_interval(secs => :hours * 3600)
+    UNION ALL
+    SELECT fob_uid, lat, lng, status, extract(epoch FROM received_at) AS at
+    FROM quarantined_pings WHERE received_at >= now() - make_interval(secs => :hours * 3600)
+    """
+)
+
+
+def _timestamp(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def load_csv(path: str):
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    labelled = bool(rows) and "noise" in rows[0]
+    return (
+        [row["fob_uid"] for row in rows],
+        np.array([float(row["lat"]) for row in rows]),
+        np.array([float(row["lng"]) for row in rows]),
+        np.array([_timestamp(row["received_at"]) for row in rows]),
+        np.array([int(row.get("status") or 0) == SOS for row in rows], dtype=bool),
+        np.array([row["noise"].strip() in ("1", "true") for row in rows]) if labelled else None,
+    )
+
+
+def load_db(hours: float):
+    with session_scope() as db:
+        rows = db.execute(RECORDED_PINGS_SQL, {"hours": hours}).all()
+    return (
+        [row.fob_uid for row in rows],
+        np.array([row.lat for row in rows], dtype=float),
+        np.array([row.lng for row in rows], dtype=float),
+        np.array([row.at for row in rows], dtype=float),
+        np.array([row.status == SOS for row in rows], dtype=bool),
+        None,
+    )
+
+
+def classify(fob_idx, lats, lngs, ats, accepted, max_speed: float, noise_m: float):
+    """Label quarantined pings (sorted by fob, then time) as spikes or false positives.
+
+    Returns ``(spikes, false_positives, undetermined)`` counts.
+    """
+    n = len(ats)
+    positions = np.arange(n)
+    # Last accepted ping at or before each position (a fob's first ping is always accepted).
+    last_accepted = np.maximum.accumulate(np.where(accepted, positions, -1))
+    quarantined = np.flatnonzero(~accepted)
+    has_next = quarantined + 1 < n
+    has_next[has_next] &= fob_idx[quarantined[has_next] + 1] == fob_idx[quarantined[has_next]]
+    q = quarantined[has_next]
+    nxt, before = q + 1, last_accepted[q]
+
+    def reachable(frm, to):
+        moved = pairwise_haversine_m(lats[frm], lngs[frm], lats[to], lngs[to]) - noise_m
+        return moved <= max_speed * np.maximum(ats[to] - ats[frm], 0.0)
+
+    from_quarantined = reachable(q, nxt)
+    from_accepted = reachable(before, nxt)
+    spikes = int((~from_quarantined).sum())
+    false_positives = int((from_quarantined & ~from_accepted).sum())
+    return spikes, false_positives, len(quarantined) - spikes - false_positives
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv")
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--max-speed", default=str(settings.MOVEMENT_MAX_SPEED_MPS or 70))
+    parser.add_argument("--noise-m", type=float, default=settings.MOVEMENT_NOISE_M)
+    args = parser.parse_args()
+
+    fob_uids, lats, lngs, ats, sos, noise = load_csv(args.csv) if args.csv else load_db(args.hours)
+    n = len(ats)
+    if not n:
+        print("no pings to replay")
+        return
+    _, fob_idx = np.unique(np.asarray(fob_uids, dtype=object).astype(str), return_inverse=True)
+    order = np.lexsort((ats, fob_idx))
+    fob_uids = [fob_uids[i] for i in order]
+    fob_idx, lats, lngs, ats, sos = fob_idx[order], lats[order], lngs[order], ats[order], sos[order]
+    if noise is not None:
+        noise = noise[order]
+    print(f"{n} pings from {fob_idx.max() + 1} fobs, noise allowance {args.noise_m:g} m")
+
+    for max_speed in (float(s) for s in args.max_speed.split(",")):
+        started = time.perf_counter()
+        accepted = MovementFilter().check_batch(
+            fob_uids, lats, lngs, ats, max_speed, args.noise_m, always_accept=sos
+        )
+        elapsed = time.perf_counter() - started
+        flagged = int((~accepted).sum())
+        line = f"max {max_speed:g} m/s: quarantined {flagged} ({flagged / n:.3%})"
+        if noise is not None:
+            false_positives = int((~accepted & ~noise).sum())
+            caught = int((~accepted & noise).sum())
+            line += (
+                f", false positives {false_positives} ({false_positives / max((~noise).sum(), 1):.3%} of good pings)"
+                f", caught {caught} of {int(noise.sum())} noisy pings"
+            )
+        else:
+            spikes, false_positives, undetermined = classify(
+                fob_idx, lats, lngs, ats, accepted, max_speed, args.noise_m
+            )
+            line += (
+                f", spikes {spikes}, likely false positives {false_positives} ({false_positives / n:.3%} of pings)"
+                f", undetermined {undetermined}"
+            )
+        print(f"{line}; {n / elapsed:,.0f} pings/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Manage the tower registry and per-tower ingest keys.
+
+New and rotated keys are printed once; only their SHA-256 digest is stored.
+Running servers pick up changes within ``TOWER_KEY_CACHE_SECONDS`` (30), or
+at once where ``TOWER_KEY_LISTEN`` is on: every change sends a notification
+they listen for. Until then a revoked key is still accepted.
+
+Usage:
+    python scripts/towers.py list
+    python scripts/towers.py add TOWER_ID --lat 43.65 --lng -79.38 [--name "Tower 1"]
+    python scripts/towers.py rotate-key TOWER_ID
+    python scripts/towers.py revoke TOWER_ID
+    python scripts/towers.py restore TOWER_ID
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.db import session_scope  # noqa: E402
+from app.towers import create_tower, list_towers, rotate_key, set_active  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list")
+    add = commands.add_parser("add")
+    add.add_argument("tower_id")
+    add.add_argument("--lat", type=float, required=True)
+    add.add_argument("--lng", type=float, required=True)
+    add.add_argument("--name")
+    for name in ("rotate-key", "revoke", "restore"):
+        commands.add_parser(name).add_argument("tower_id")
+    args = parser.parse_args()
+
+    with session_scope() as db:
+        if args.command == "list":
+            for tower in list_towers(db):
+                state = "active" if tower.active else "revoked"
+                print(f"{tower.id}\t{state}\t{tower.name or ''}\t{tower.lat}, {tower.lng}")
+            return
+        if args.command == "add":
+            key = create_tower(db, args.tower_id, args.name, args.lat, args.lng)
+        elif args.command == "rotate-key":
+            key = rotate_key(db, args.tower_id)
+        else:
+            key = "" if set_active(db, args.tower_id, args.command == "restore") else None
+    if key is None:
+        sys.exit(f"No tower {args.tower_id}")
+    print(f"{args.tower_id}: {args.command} done")
+    if key:
+        print(f"X-Tower-Id: {args.tower_id}\nX-Tower-Key: {key}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,18 @@
+import math
 import os
+from contextlib import contextmanager
 from typing import Generator
 
 import pytest
 from fastapi.testclient import TestClient
 from alembic import command
 from alembic.config import Config
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
 
 from api.index import app
-from app.settings import get_settings, Settings
+from app.movement import movement_filter
+from app.settings import get_settings, reload_settings, Settings
 
 
 _raw_test_db_url = os.getenv(
@@ -25,6 +29,10 @@ if _raw_test_db_url.startswith("postgresql://") and "+psycopg2" not in _raw_test
 else:
     TEST_DB_URL = _raw_test_db_url
 
+# The walk scheduler's startup reload would run SQL behind every TestClient;
+# walk tests drive app.walks.run_due directly instead.
+os.environ.setdefault("WALK_TIMER_TICK_SECONDS", "0")
+
 
 class TestSettings(Settings):
     def __init__(self) -> None:
@@ -61,9 +69,40 @@ def clean_db() -> None:
     with _engine.begin() as conn:
         conn.execute(
             text(
-                "TRUNCATE TABLE incidents, pings, friendships, fobs, users RESTART IDENTITY CASCADE;"
+                "TRUNCATE TABLE quarantined_pings, fob_signal_events, fob_signal, walks, sos_alerts, geofence_events, geofences, incidents, incident_clusters, pings, friendships, fobs, users, avatar_blobs, ping_rollups, job_watermarks, towers RESTART IDENTITY CASCADE;"
             )
         )
+    # Last accepted points of fobs that no longer exist
+    movement_filter.clear()
+
+
+@pytest.fixture(autouse=True)
+def fresh_settings() -> Generator[None, None, None]:
+    """Snapshot the settings before each test, and again once ``env`` changes are undone."""
+    reload_settings()
+    yield
+    reload_settings()
+
+
+@pytest.fixture()
+def env(monkeypatch):
+    """Set environment variables for one test and reload the settings snapshot.
+
+        env(TOWER_SHARED_KEY="test-key", DATABASE_REPLICA_URL=None)
+
+    ``None`` unsets a variable. Settings are snapshotted process-wide, so a
+    plain ``monkeypatch.setenv`` would not reach code reading ``get_settings()``.
+    """
+
+    def set_env(**values: str | None) -> None:
+        for name, value in values.items():
+            if value is None:
+                monkeypatch.delenv(name, raising=False)
+            else:
+                monkeypatch.setenv(name, value)
+        reload_settings()
+
+    return set_env
 
 
 @pytest.fixture()
@@ -71,3 +110,61 @@ def client() -> Generator[TestClient, None, None]:
     with TestClient(app) as c:
         yield c
 
+
+# Toronto campus-ish origin; one degree of latitude is ~111 km.
+ORIGIN = (43.6629, -79.3957)
+
+
+def offset(meters_north: float, meters_east: float = 0.0) -> tuple[float, float]:
+    """The point ``meters_north`` and ``meters_east`` of ``ORIGIN``."""
+    lat, lng = ORIGIN
+    return (
+        lat + meters_north / 111_320,
+        lng + meters_east / (111_320 * math.cos(math.radians(lat))),
+    )
+
+
+def auth_headers(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def signup(client, username: str) -> dict[str, str]:
+    """Sign a user up; returns their auth headers."""
+    r = client.post("/auth/signup", json={"username": username, "password": "pw"})
+    assert r.status_code == 201, r.text
+    return auth_headers(r.json()["access_token"])
+
+
+@pytest.fixture()
+def alice(client) -> dict[str, str]:
+    return signup(client, "alice")
+
+
+@pytest.fixture()
+def query_budget():
+    """Assert a block runs at most ``limit`` SQL statements.
+
+        with query_budget(3):
+            client.post("/friends/add", ...)
+
+    Counts every statement on any engine while the block runs (including the
+    TestClient's worker thread); the failure message lists them.
+    """
+
+    @contextmanager
+    def budget(limit: int):
+        statements: list[str] = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(" ".join(statement.split()))
+
+        event.listen(Engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(Engine, "before_cursor_execute", record)
+        assert len(statements) <= limit, (
+            f"{len(statements)} queries (budget {limit}):\n" + "\n".join(statements)
+        )
+
+    return budget
@@ -0,0 +1,53 @@
+"""
+Cold-start regression checks for the serverless entrypoint.
+
+Imports ``api.index`` in a fresh interpreter under ``python -X importtime`` and
+fails if the cumulative import time exceeds the budget, or if dependencies that
+are meant to load lazily (DB driver, JWT/crypto, password hashing, httpx) are
+pulled in at import time.
+
+The budget can be tuned per machine with ``COLD_START_BUDGET_MS``.
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+COLD_START_BUDGET_MS = float(os.getenv("COLD_START_BUDGET_MS", "1500"))
+
+LAZY_MODULES = ("psycopg2", "jose", "passlib", "argon2", "httpx", "PIL", "numpy", "app.storage", "app.avatars")
+
+
+def import_profile(module: str) -> dict[str, int]:
+    """Return ``{module_name: cumulative_us}`` for a cold ``import module``."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+        if cumulative_us.isdigit():
+            times[name] = int(cumulative_us)
+    return times
+
+
+def test_cold_start_within_budget():
+    # Take the best of a few runs to keep noisy CI machines from flaking.
+    best_ms = min(import_profile("api.index")["api.index"] for _ in range(3)) / 1000
+    assert best_ms <= COLD_START_BUDGET_MS, (
+        f"api.index cold import took {best_ms:.0f}ms (budget {COLD_START_BUDGET_MS:.0f}ms)"
+    )
+
+
+def test_heavy_dependencies_are_lazy():
+    times = import_profile("api.index")
+    eager = [name for name in LAZY_MODULES if name in times]
+    assert not eager, f"Imported at cold start but should be lazy: {eager}"
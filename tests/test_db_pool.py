@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy.pool import NullPool, QueuePool
+
+from app import db as app_db
+from app.db import engine_options, pool_metrics
+from app.settings import get_settings, reload_settings
+
+
+def test_pool_modes():
+    opts = engine_options(reload_settings(DB_POOL_MODE="queue", DB_POOL_SIZE=3, DB_MAX_OVERFLOW=2))
+    assert issubclass(opts["poolclass"], QueuePool)
+    assert (opts["pool_size"], opts["max_overflow"]) == (3, 2)
+
+    opts = engine_options(reload_settings(DB_POOL_MODE="null"))
+    assert issubclass(opts["poolclass"], NullPool)
+
+    opts = engine_options(
+        reload_settings(DB_POOL_MODE="pgbouncer", DATABASE_URL="postgresql+psycopg://u:p@pgbouncer:6432/db")
+    )
+    assert issubclass(opts["poolclass"], NullPool)
+    assert opts["connect_args"] == {"prepare_threshold": None}
+    assert "pool_pre_ping" not in opts
+
+    with pytest.raises(ValueError):
+        engine_options(reload_settings(DB_POOL_MODE="bogus"))
+
+
+def test_pool_metrics_exposed(client):
+    pool_metrics.reset()
+    r = client.post("/auth/signup", json={"username": "pool_user", "password": "pw"})
+    assert r.status_code == 201
+
+    r = client.get("/health/db")
+    assert r.status_code == 200
+    stats = r.json()
+    assert stats["mode"] == "queue"
+    assert stats["checkouts"] >= 1
+    assert stats["checkout_wait_seconds_max"] >= 0
+    assert stats["checked_out"] == 0
+    assert stats["size"] == 5
+
+
+def test_rejected_requests_never_check_out_connections(client, env):
+    app_db.dispose_engine()
+    env(DATABASE_REPLICA_URL=get_settings().DATABASE_URL)
+    pool_metrics.reset()
+
+    ping = {"fob_uid": "FOB_REJECT", "lat": 43.65, "lng": -79.38}
+    assert client.post("/tower/pings", json=ping).status_code == 401
+    assert client.post("/tower/pings", json=ping, headers={"X-Tower-Key": "wrong"}).status_code == 401
+    for path in ("/friends", "/map/latest", "/auth/me", "/fob/me"):
+        assert client.get(path).status_code == 401
+        assert client.get(path, headers={"Authorization": "Bearer not-a-jwt"}).status_code == 401
+    r = client.post("/friends/add", json={"username": "x"}, headers={"Authorization": "Bearer not-a-jwt"})
+    assert r.status_code == 401
+
+    assert pool_metrics.checkouts == 0
+    # The replica lag check is deferred to the first query as well.
+    assert app_db.replica_lag.reads + app_db.replica_lag.fallbacks == 0
+
+    env(DATABASE_REPLICA_URL=None)
+    app_db.dispose_engine()
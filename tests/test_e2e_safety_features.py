@@ -56,10 +56,9 @@ def tower_ping(client, fob_uid: str, lat: float, lng: float, status: int = 0):
 # 1. PROFILE UPDATE FLOW
 # ===========================================================================
 
-def test_profile_upload_url_and_update(client, monkeypatch):
+def test_profile_upload_url_and_update(client, env):
     """GET /auth/storage/upload-url returns signed URLs; PATCH /auth/me saves profile data."""
-    monkeypatch.setenv("TOWER_SHARED_KEY", TOWER_KEY)
-    monkeypatch.setenv("BLOB_READ_WRITE_TOKEN", "fake-blob-token-for-test")
+    env(TOWER_SHARED_KEY=TOWER_KEY, BLOB_READ_WRITE_TOKEN="fake-blob-token-for-test")
 
     alice = signup(client, "alice_profile")
     token = alice["access_token"]
@@ -103,9 +102,9 @@ def test_profile_upload_url_and_update(client, monkeypatch):
     assert profile2["profile_picture_url"] == mock_pic_url
 
 
-def test_profile_update_rejects_bad_url(client, monkeypatch):
+def test_profile_update_rejects_bad_url(client, env):
     """PATCH /auth/me must reject profile_picture_url from non-Vercel domains."""
-    monkeypatch.setenv("TOWER_SHARED_KEY", TOWER_KEY)
+    env(TOWER_SHARED_KEY=TOWER_KEY)
 
     alice = signup(client, "alice_badurl")
     token = alice["access_token"]
@@ -119,10 +118,9 @@ def test_profile_update_rejects_bad_url(client, monkeypatch):
     assert "INVALID_URL" in r.text
 
 
-def test_upload_url_requires_blob_token(client, monkeypatch):
+def test_upload_url_requires_blob_token(client, env):
     """GET /auth/storage/upload-url returns 503 when BLOB_READ_WRITE_TOKEN is missing."""
-    monkeypatch.setenv("TOWER_SHARED_KEY", TOWER_KEY)
-    monkeypatch.delenv("BLOB_READ_WRITE_TOKEN", raising=False)
+    env(TOWER_SHARED_KEY=TOWER_KEY, BLOB_READ_WRITE_TOKEN=None)
 
     alice = signup(client, "alice_notoken")
     token = alice["access_token"]
@@ -140,12 +138,12 @@ def test_upload_url_requires_blob_token(client, monkeypatch):
 # 2. LOCATION PRIVACY — THE "INVISIBILITY" TEST
 # ===========================================================================
 
-def test_location_privacy_share_toggle(client, monkeypatch):
+def test_location_privacy_share_toggle(client, env):
     """
     When Alice disables location sharing for Bob, Bob's map/latest
     must no longer include Alice.
     """
-    monkeypatch.setenv("TOWER_SHARED_KEY", TOWER_KEY)
+    env(TOWER_SHARED_KEY=TOWER_KEY)
 
     alice = signup(client, "alice_priv")
     bob = signup(client, "bob_priv")
@@ -206,7 +204,7 @@ def test_location_privacy_share_toggle(client, monkeypatch):
 # 3. SOS ALERTING
 # ===========================================================================
 
-def test_sos_ping_status_and_map(client, monkeypatch):
+def test_sos_ping_status_and_map(client, env):
     """
     A tower ping with status=2 (SOS) should:
       - Be stored and returned as status=2 in map/latest
@@ -214,7 +212,7 @@ def test_sos_ping_status_and_map(client, monkeypatch):
     """
     from unittest.mock import patch
 
-    monkeypatch.setenv("TOWER_SHARED_KEY", TOWER_KEY)
+    env(TOWER_SHARED_KEY=TOWER_KEY)
 
     alice = signup(client, "alice_sos")
     bob = signup(client, "bob_sos")
@@ -255,9 +253,9 @@ def test_sos_ping_status_and_map(client, monkeypatch):
     assert alice_result[0]["location"]["lng"] == -79.39
 
 
-def test_tower_ping_default_status_is_zero(client, monkeypatch):
+def test_tower_ping_default_status_is_zero(client, env):
     """Tower ping without explicit status should default to 0 (Safe)."""
-    monkeypatch.setenv("TOWER_SHARED_KEY", TOWER_KEY)
+    env(TOWER_SHARED_KEY=TOWER_KEY)
 
     alice = signup(client, "alice_def")
     bob = signup(client, "bob_def")
@@ -286,9 +284,9 @@ def test_tower_ping_default_status_is_zero(client, monkeypatch):
 # 4. INCIDENT REPORTING
 # ===========================================================================
 
-def test_create_incident(client, monkeypatch):
+def test_create_incident(client, env):
     """POST /incidents creates and returns the incident record."""
-    monkeypatch.setenv("TOWER_SHARED_KEY", TOWER_KEY)
+    env(TOWER_SHARED_KEY=TOWER_KEY)
 
     alice = signup(client, "alice_inc")
     token = alice["access_token"]
@@ -314,9 +312,9 @@ def test_create_incident(client, monkeypatch):
     assert body["reporter_id"] == alice["user"]["id"]
 
 
-def test_incident_requires_auth(client, monkeypatch):
+def test_incident_requires_auth(client, env):
     """POST /incidents without a token should return 401."""
-    monkeypatch.setenv("TOWER_SHARED_KEY", TOWER_KEY)
+    env(TOWER_SHARED_KEY=TOWER_KEY)
 
     r = client.post(
         "/incidents",
@@ -329,12 +327,12 @@ def test_incident_requires_auth(client, monkeypatch):
 # 5. FRIENDS LIST METADATA
 # ===========================================================================
 
-def test_friends_list_includes_metadata(client, monkeypatch):
+def test_friends_list_includes_metadata(client, env):
     """
     GET /friends returns display_name, profile_picture_url, and
     latest_ping_received_at for each friend.
     """
-    monkeypatch.setenv("TOWER_SHARED_KEY", TOWER_KEY)
+    env(TOWER_SHARED_KEY=TOWER_KEY)
 
     alice = signup(client, "alice_meta")
     bob = signup(client, "bob_meta")
@@ -370,9 +368,9 @@ def test_friends_list_includes_metadata(client, monkeypatch):
     assert bob_friend["latest_ping_received_at"] is not None
 
 
-def test_friends_list_null_metadata_when_unset(client, monkeypatch):
+def test_friends_list_null_metadata_when_unset(client, env):
     """Friends with no profile or pings should return nulls gracefully."""
-    monkeypatch.setenv("TOWER_SHARED_KEY", TOWER_KEY)
+    env(TOWER_SHARED_KEY=TOWER_KEY)
 
     alice = signup(client, "alice_null")
     bob = signup(client, "bob_null")
@@ -395,9 +393,9 @@ def test_friends_list_null_metadata_when_unset(client, monkeypatch):
 # 6. REGRESSION: ORIGINAL HAPPY-PATH E2E
 # ===========================================================================
 
-def test_original_happy_path_e2e(client, monkeypatch):
+def test_original_happy_path_e2e(client, env):
     """The original end-to-end flow still works with the new schema."""
-    monkeypatch.setenv("TOWER_SHARED_KEY", TOWER_KEY)
+    env(TOWER_SHARED_KEY=TOWER_KEY)
 
     # signup
     alice = signup(client, "alice_reg")
@@ -431,9 +429,9 @@ def test_original_happy_path_e2e(client, monkeypatch):
     assert "received_at" in res["location"]
 
 
-def test_mutual_friends_still_works(client, monkeypatch):
+def test_mutual_friends_still_works(client, env):
     """Adding a friend is still mutual."""
-    monkeypatch.setenv("TOWER_SHARED_KEY", TOWER_KEY)
+    env(TOWER_SHARED_KEY=TOWER_KEY)
 
     alice = signup(client, "alice_mut")
     bob = signup(client, "bob_mut")
@@ -448,9 +446,9 @@ def test_mutual_friends_still_works(client, monkeypatch):
     assert any(f["username"] == "alice_mut" for f in friends)
 
 
-def test_tower_auth_still_enforced(client, monkeypatch):
+def test_tower_auth_still_enforced(client, env):
     """Tower key enforcement hasn't regressed."""
-    monkeypatch.setenv("TOWER_SHARED_KEY", TOWER_KEY)
+    env(TOWER_SHARED_KEY=TOWER_KEY)
 
     body = {"fob_uid": "FOB_X", "lat": 43.65, "lng": -79.38}
 
@@ -467,9 +465,9 @@ def test_tower_auth_still_enforced(client, monkeypatch):
     assert r.status_code == 201
 
 
-def test_fob_uniqueness_still_enforced(client, monkeypatch):
+def test_fob_uniqueness_still_enforced(client, env):
     """Two users can't claim the same fob."""
-    monkeypatch.setenv("TOWER_SHARED_KEY", TOWER_KEY)
+    env(TOWER_SHARED_KEY=TOWER_KEY)
 
     alice = signup(client, "alice_fob")
     bob = signup(client, "bob_fob")
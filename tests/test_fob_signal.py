@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta, timezone
+
+from app.db import session_scope
+from app.fob_signal import mark_lost, run_signal_check, track_last_seen
+from app.metrics import fob_signal_events
+from app.models import Fob, FobSignal, Ping
+from conftest import signup
+
+
+def add_ping(fob_uid: str, minutes_ago: float, lat: float = 43.66, lng: float = -79.39) -> None:
+    with session_scope() as db:
+        if db.get(Fob, fob_uid) is None:
+            db.add(Fob(fob_uid=fob_uid))
+            db.flush()
+        received_at = datetime.now(timezone.utc) - timedelta(minutes=minutes_ago)
+        db.add(Ping(fob_uid=fob_uid, lat=lat, lng=lng, status=0, received_at=received_at))
+
+
+def check(lost_after_minutes: float = 5) -> list[tuple[str, str]]:
+    with session_scope() as db:
+        _, restored, _ = track_last_seen(db, settle_seconds=0)
+        lost = mark_lost(db, lost_after_minutes * 60)
+    return sorted((e.fob_uid, e.kind) for e in restored + lost)
+
+
+def test_lost_and_restored_once_per_transition(client):
+    alice = signup(client, "alice")
+    assert client.post("/fob/claim", json={"fob_uid": "FOB_A"}, headers=alice).status_code == 201
+    add_ping("FOB_A", 20, lat=43.0)
+    add_ping("FOB_A", 10, lat=43.1)
+    add_ping("FOB_X", 30)  # quiet but unclaimed
+    add_ping("FOB_B", 1)
+
+    assert check() == [("FOB_A", "lost")]
+    assert check() == []
+    with session_scope() as db:
+        a, x, b = (db.get(FobSignal, uid) for uid in ("FOB_A", "FOB_X", "FOB_B"))
+        assert a.lat == 43.1 and a.signal_lost_at is not None
+        assert x.signal_lost_at is not None
+        assert b.signal_lost_at is None
+
+    add_ping("FOB_A", 0.5)
+    assert check() == [("FOB_A", "restored")]
+    assert check() == []
+
+    # A ping older than the last one seen doesn't move last_seen_at back.
+    add_ping("FOB_A", 60)
+    assert check() == []
+    with session_scope() as db:
+        assert db.get(FobSignal, "FOB_A").last_seen_at > datetime.now(timezone.utc) - timedelta(minutes=1)
+
+
+def test_track_last_seen_is_incremental(client):
+    add_ping("FOB_INC", 3)
+    add_ping("FOB_INC", 2)
+    with session_scope() as db:
+        assert track_last_seen(db, batch_size=1, settle_seconds=0)[0] == 1
+        assert track_last_seen(db, batch_size=10, settle_seconds=0)[0] == 1
+        assert track_last_seen(db, batch_size=10, settle_seconds=0)[0] == 0
+
+    add_ping("FOB_FRESH", 0)
+    with session_scope() as db:
+        assert track_last_seen(db, settle_seconds=60)[0] == 0
+
+
+def test_pings_committed_late_are_not_skipped(client):
+    add_ping("FOB_LATE", 3)
+    check()
+    with session_scope() as slow:
+        # A lower id that stays uncommitted while a later ping commits.
+        slow.add(Ping(fob_uid="FOB_LATE", lat=44.0, lng=-80.0, status=0, received_at=datetime.now(timezone.utc)))
+        slow.flush()
+        add_ping("FOB_OTHER", 1)
+        with session_scope() as db:
+            assert track_last_seen(db, settle_seconds=0)[0] == 0
+    with session_scope() as db:
+        assert track_last_seen(db, settle_seconds=0)[0] == 2
+        assert db.get(FobSignal, "FOB_LATE").lat == 44.0
+
+
+def test_signal_events_endpoint_and_job(client, env):
+    env(ROLLUP_SETTLE_SECONDS="0", SIGNAL_LOST_AFTER_SECONDS="120")
+    alice, bob, carol = signup(client, "alice"), signup(client, "bob"), signup(client, "carol")
+    assert client.post("/friends/add", json={"username": "bob"}, headers=alice).status_code == 200
+    assert client.post("/fob/claim", json={"fob_uid": "FOB_A"}, headers=alice).status_code == 201
+    add_ping("FOB_A", 3)
+    before = fob_signal_events.value("lost")
+
+    assert run_signal_check() == 1
+    assert run_signal_check() == 0
+    assert fob_signal_events.value("lost") == before + 1
+
+    for headers in (alice, bob):
+        r = client.get("/alerts/signal", headers=headers)
+        assert r.status_code == 200
+        assert [(e["username"], e["fob_uid"], e["kind"]) for e in r.json()["events"]] == [("alice", "FOB_A", "lost")]
+    assert client.get("/alerts/signal", headers=carol).json()["events"] == []
+
+
+def test_open_transaction_defers_the_lost_check(client, env):
+    env(ROLLUP_SETTLE_SECONDS="0", SIGNAL_LOST_AFTER_SECONDS="120")
+    alice = signup(client, "alice")
+    assert client.post("/fob/claim", json={"fob_uid": "FOB_LIVE"}, headers=alice).status_code == 201
+    add_ping("FOB_LIVE", 10)
+    check(lost_after_minutes=60)
+    with session_scope() as slow:
+        # A long transaction with a write, holding back every ping committed after it.
+        slow.add(Ping(fob_uid="FOB_LIVE", lat=44.0, lng=-80.0, status=0, received_at=datetime.now(timezone.utc)))
+        slow.flush()
+        add_ping("FOB_LIVE", 0)
+        with session_scope() as db:
+            assert track_last_seen(db, settle_seconds=0)[::2] == (0, True)
+        assert run_signal_check() == 0
+        with session_scope() as db:
+            assert db.get(FobSignal, "FOB_LIVE").signal_lost_at is None
+    assert run_signal_check() == 0
+    with session_scope() as db:
+        signal = db.get(FobSignal, "FOB_LIVE")
+        assert signal.signal_lost_at is None
+        assert signal.last_seen_at > datetime.now(timezone.utc) - timedelta(minutes=1)
@@ -0,0 +1,198 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import text
+
+from app.db import session_scope
+from app.geofences import Zone, ZoneIndex, contains, fob_zone_states, zone_index_cache
+from app.metrics import geofence_events
+from conftest import offset, signup
+
+
+TOWER_KEY = "test-tower-key"
+
+
+@pytest.fixture(autouse=True)
+def empty_geofence_caches():
+    zone_index_cache.clear()
+    fob_zone_states.clear()
+
+
+@pytest.fixture(autouse=True)
+def no_movement_filter(env):
+    # Fobs hop in and out of zones between pings sent milliseconds apart.
+    env(MOVEMENT_MAX_SPEED_MPS="0")
+
+
+def square(north: float, east: float, half_side_m: float) -> list[dict]:
+    corners = [(-1, -1), (-1, 1), (1, 1), (1, -1)]
+    return [
+        dict(zip(("lat", "lng"), offset(north + dn * half_side_m, east + de * half_side_m))) for dn, de in corners
+    ]
+
+
+@pytest.fixture()
+def alice(client, alice, env):
+    """Alice, with fob FOB_A."""
+    env(TOWER_SHARED_KEY=TOWER_KEY)
+    assert client.post("/fob/claim", json={"fob_uid": "FOB_A"}, headers=alice).status_code == 201
+    return alice
+
+
+def ping(client, point: tuple[float, float], fob_uid: str = "FOB_A") -> None:
+    r = client.post(
+        "/tower/pings",
+        json={"fob_uid": fob_uid, "lat": point[0], "lng": point[1]},
+        headers={"X-Tower-Key": TOWER_KEY},
+    )
+    assert r.status_code == 201, r.text
+
+
+def add_zone(client, headers, name: str, points: list[dict]) -> str:
+    r = client.post("/geofences", json={"name": name, "points": points}, headers=headers)
+    assert r.status_code == 201, r.text
+    return r.json()["id"]
+
+
+def events(client, headers) -> list[tuple[str, str]]:
+    r = client.get("/geofences/events", headers=headers)
+    assert r.status_code == 200
+    return [(e["geofence_name"], e["kind"]) for e in r.json()["events"]]
+
+
+def test_enter_and_exit_events_on_transitions_only(client, alice):
+    bob = signup(client, "bob")
+    assert client.post("/friends/add", json={"username": "bob"}, headers=alice).status_code == 200
+    add_zone(client, alice, "home", square(0, 0, 100))
+    entered = geofence_events.value("enter")
+
+    ping(client, offset(500))
+    ping(client, offset(0))
+    ping(client, offset(10, 10))  # still inside
+    ping(client, offset(500))
+
+    # Newest first; visible to a friend alice shares her location with.
+    assert events(client, bob) == [("home", "exit"), ("home", "enter")]
+    assert events(client, alice) == [("home", "exit"), ("home", "enter")]
+    assert geofence_events.value("enter") == entered + 1
+
+    client.patch("/friends/share-location", json={"username": "bob", "enabled": False}, headers=alice)
+    assert events(client, bob) == []
+
+
+def test_state_survives_restart(client, alice):
+    add_zone(client, alice, "home", square(0, 0, 100))
+    ping(client, offset(0))
+
+    zone_index_cache.clear()
+    fob_zone_states.clear()
+    ping(client, offset(5))  # still inside: no second enter
+    ping(client, offset(500))
+    assert events(client, alice) == [("home", "exit"), ("home", "enter")]
+
+
+def test_concurrent_pings_write_one_transition(client, alice):
+    add_zone(client, alice, "home", square(0, 0, 100))
+    ping(client, offset(500))
+
+    # Two towers relay the fob at once, then another process (no shared memory) sees it.
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(lambda n: ping(client, offset(n)), range(4)))
+    assert events(client, alice) == [("home", "enter")]
+    fob_zone_states.clear()
+    ping(client, offset(20))
+    ping(client, offset(600))
+    fob_zone_states.clear()
+    ping(client, offset(610))
+    assert events(client, alice) == [("home", "exit"), ("home", "enter")]
+
+
+def test_zone_changes_apply_to_the_next_ping(client, alice):
+    ping(client, offset(0))
+    library = add_zone(client, alice, "library", square(0, 0, 50))
+    ping(client, offset(1))
+    assert events(client, alice) == [("library", "enter")]
+
+    # Deleting a zone the fob is in drops it (and its events) without an exit.
+    r = client.delete(f"/geofences/{library}", headers=alice)
+    assert r.json() == {"deleted": True}
+    ping(client, offset(2))
+    assert events(client, alice) == []
+    assert client.get("/geofences", headers=alice).json() == {"geofences": []}
+
+
+def test_steady_state_ping_costs_no_extra_queries(client, alice, query_budget):
+    for i in range(20):
+        add_zone(client, alice, f"zone {i}", square(1000 * i, 0, 200))
+    ping(client, offset(0))
+    # fob + owner's zone version, insert ping
+    with query_budget(2):
+        ping(client, offset(1))
+
+
+def test_moves_within_the_same_zones_cost_no_extra_queries(client, alice, query_budget):
+    for i in range(20):
+        add_zone(client, alice, f"zone {i}", square(1000 * i, 0, 200))
+    ping(client, offset(0))
+    # New grid cells, fully and then partially covered, all inside zone 0.
+    with query_budget(2):
+        ping(client, offset(60, 60))
+    with query_budget(2):
+        ping(client, offset(195, 0))
+    with query_budget(2):
+        ping(client, offset(190, 5))
+    assert events(client, alice) == [("zone 0", "enter")]
+
+
+def test_latest_event_breaks_timestamp_ties_by_id(client, alice):
+    home = add_zone(client, alice, "home", square(0, 0, 100))
+    ping(client, offset(0))
+    with session_scope() as db:
+        db.execute(
+            text(
+                """
+                INSERT INTO geofence_events (geofence_id, user_id, fob_uid, kind, lat, lng, created_at)
+                SELECT geofence_id, user_id, fob_uid, 'exit', lat, lng, created_at
+                FROM geofence_events WHERE geofence_id = :home
+                """
+            ),
+            {"home": home},
+        )
+    # The exit was written last, so the fob is outside and this is a new enter.
+    fob_zone_states.clear()
+    ping(client, offset(5))
+    assert [kind for _, kind in events(client, alice)].count("enter") == 2
+
+
+def test_geofence_validation(client, alice):
+    def post(name, points):
+        r = client.post("/geofences", json={"name": name, "points": points}, headers=alice)
+        return r.status_code, r.json()["detail"]["error"]["code"]
+
+    assert post("home", square(0, 0, 100)[:2]) == (400, "INVALID_GEOFENCE")
+    assert post(" ", square(0, 0, 100)) == (400, "INVALID_GEOFENCE")
+    assert post("campus", square(0, 0, 3000)) == (400, "INVALID_GEOFENCE")
+    assert post("home", [{"lat": 91, "lng": 0}] * 3) == (400, "INVALID_GEOFENCE")
+
+    r = client.delete("/geofences/not-a-uuid", headers=alice)
+    assert r.json()["detail"]["error"]["code"] == "GEOFENCE_NOT_FOUND"
+    bob = signup(client, "bob")
+    zone = add_zone(client, bob, "bob's", square(0, 0, 100))
+    assert client.delete(f"/geofences/{zone}", headers=alice).status_code == 404
+
+
+def test_zone_index_matches_point_in_polygon():
+    rng = random.Random(3)
+    # A concave "C" shape and a small triangle inside its bounding box.
+    c_shape = [(0, 0), (0, 10), (2, 10), (2, 2), (8, 2), (8, 10), (10, 10), (10, 0)]
+    triangle = [(3, 4), (7, 4), (5, 9)]
+    zones = [
+        Zone(id=name, name=name, lats=tuple(p[0] * 1e-3 for p in pts), lngs=tuple(p[1] * 1e-3 for p in pts))
+        for name, pts in (("c", c_shape), ("t", triangle))
+    ]
+    index = ZoneIndex(1, zones)
+    for _ in range(5000):
+        lat, lng = rng.uniform(-1e-3, 11e-3), rng.uniform(-1e-3, 11e-3)
+        expected = {z.id for z in zones if contains(z.lats, z.lngs, lat, lng)}
+        assert index.zones_at(lat, lng, index.cell(lat, lng)) == expected
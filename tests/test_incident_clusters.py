@@ -0,0 +1,79 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+
+from app.db import session_scope
+from app.geo import cell_id
+from app.incident_clusters import report_incident
+from app.models import Incident, IncidentCluster
+from app.nearby import incident_cell_cache
+from conftest import ORIGIN, offset
+
+
+@pytest.fixture(autouse=True)
+def empty_cell_cache():
+    incident_cell_cache.clear()
+
+
+def report(client, headers, point, description="fight outside the library") -> dict:
+    r = client.post("/incidents", json={"lat": point[0], "lng": point[1], "description": description}, headers=headers)
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def test_nearby_reports_attach_to_one_cluster(client, alice):
+    first = report(client, alice, offset(0), "first")
+    second = report(client, alice, offset(40), "second")
+    elsewhere = report(client, alice, offset(400), "elsewhere")
+
+    assert second["cluster_id"] == first["cluster_id"]
+    assert second["cluster"]["report_count"] == 2
+    assert second["cluster"]["description"] == "first"
+    assert second["cluster"]["lat"] == pytest.approx(offset(20)[0])
+    assert elsewhere["cluster_id"] != first["cluster_id"]
+
+    lat, lng = ORIGIN
+    body = client.get("/incidents/nearby", params={"lat": lat, "lng": lng, "radius_m": 1000}, headers=alice).json()
+    assert [(c["id"], c["report_count"]) for c in body["results"]] == [
+        (first["cluster_id"], 2),
+        (elsewhere["cluster_id"], 1),
+    ]
+
+
+def test_stale_cluster_is_not_extended(client, alice):
+    old = datetime.now(timezone.utc) - timedelta(hours=2)
+    with session_scope() as db:
+        stale = IncidentCluster(
+            lat=ORIGIN[0], lng=ORIGIN[1], cell=cell_id(*ORIGIN), description="old",
+            report_count=3, first_reported_at=old, last_reported_at=old,
+        )
+        db.add(stale)
+        db.flush()
+        stale_id = stale.id
+
+    assert report(client, alice, offset(10))["cluster_id"] != stale_id
+
+
+def test_clustering_disabled_with_zero_radius(client, alice, env):
+    env(INCIDENT_CLUSTER_RADIUS_M="0")
+    assert report(client, alice, offset(0))["cluster_id"] != report(client, alice, offset(0))["cluster_id"]
+
+
+def test_concurrent_reports_share_a_cluster(client, alice):
+    user_id = client.get("/auth/me", headers=alice).json()["id"]
+
+    def submit(i: int) -> str:
+        with session_scope() as db:
+            _, cluster, _ = report_incident(db, user_id, *offset(i), "crowd report")
+            return cluster.id
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        cluster_ids = set(pool.map(submit, range(16)))
+
+    assert len(cluster_ids) == 1
+    with session_scope() as db:
+        assert db.scalar(select(func.count()).select_from(IncidentCluster)) == 1
+        assert db.scalar(select(IncidentCluster.report_count)) == 16
+        assert db.scalar(select(func.count()).select_from(Incident)) == 16
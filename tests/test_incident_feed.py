@@ -0,0 +1,99 @@
+import pytest
+
+from app.incident_feed import feed_first_page_cache
+from conftest import ORIGIN, signup
+
+
+@pytest.fixture(autouse=True)
+def empty_feed_cache():
+    feed_first_page_cache.clear()
+
+
+def report(client, headers, i: int) -> dict:
+    # ~1 km apart so each report is its own cluster
+    r = client.post(
+        "/incidents",
+        json={"lat": ORIGIN[0] + i * 0.01, "lng": ORIGIN[1], "description": f"incident {i}"},
+        headers=headers,
+    )
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def walk(client, headers, path: str, limit: int) -> list[list[str]]:
+    pages, cursor = [], None
+    while True:
+        params = {"limit": limit} | ({"cursor": cursor} if cursor else {})
+        r = client.get(path, params=params, headers=headers)
+        assert r.status_code == 200, r.text
+        body = r.json()
+        pages.append([row["description"] for row in body["results"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_feed_keyset_pagination(client):
+    alice = signup(client, "alice")
+    for i in range(7):
+        report(client, alice, i)
+
+    pages = walk(client, alice, "/incidents", limit=3)
+    assert pages == [
+        ["incident 6", "incident 5", "incident 4"],
+        ["incident 3", "incident 2", "incident 1"],
+        ["incident 0"],
+    ]
+
+
+def test_feed_pages_are_stable_when_new_reports_arrive(client):
+    alice = signup(client, "alice")
+    for i in range(4):
+        report(client, alice, i)
+    first = client.get("/incidents", params={"limit": 2}, headers=alice).json()
+    report(client, alice, 10)
+    second = client.get("/incidents", params={"limit": 2, "cursor": first["next_cursor"]}, headers=alice).json()
+    assert [row["description"] for row in second["results"]] == ["incident 1", "incident 0"]
+
+
+def test_mine_lists_only_own_reports(client):
+    alice = signup(client, "alice")
+    bob = signup(client, "bob")
+    for i in range(5):
+        report(client, alice if i % 2 == 0 else bob, i)
+
+    assert walk(client, alice, "/incidents/mine", limit=2) == [["incident 4", "incident 2"], ["incident 0"]]
+    assert walk(client, bob, "/incidents/mine", limit=5) == [["incident 3", "incident 1"]]
+
+
+def test_first_page_cached_and_invalidated_by_reports(client, env):
+    env(FEED_CACHE_TTL_SECONDS="300")
+    alice = signup(client, "alice")
+    report(client, alice, 0)
+
+    client.get("/incidents", headers=alice)
+    body = client.get("/incidents", headers=alice).json()
+    assert feed_first_page_cache.hits == 1
+    assert [row["description"] for row in body["results"]] == ["incident 0"]
+
+    report(client, alice, 1)
+    body = client.get("/incidents", headers=alice).json()
+    assert [row["description"] for row in body["results"]] == ["incident 1", "incident 0"]
+    assert feed_first_page_cache.hits == 1
+
+
+def test_cached_first_page_skips_the_feed_query(client, query_budget, env):
+    env(FEED_CACHE_TTL_SECONDS="300")
+    alice = signup(client, "alice")
+    report(client, alice, 0)
+    client.get("/incidents", headers=alice)
+    with query_budget(1):  # the current user only
+        assert client.get("/incidents", headers=alice).status_code == 200
+
+
+def test_invalid_cursor(client):
+    alice = signup(client, "alice")
+    for cursor in ("not-a-cursor", "bm90fGF1dWlk"):
+        r = client.get("/incidents", params={"cursor": cursor}, headers=alice)
+        assert r.status_code == 400
+        assert r.json()["detail"]["error"]["code"] == "INVALID_CURSOR"
@@ -0,0 +1,129 @@
+import math
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.db import session_scope
+from app.geo import CELL_DEG, cell_id, cells_within, haversine_m
+from app.models import IncidentCluster
+from app.nearby import incident_cell_cache
+from conftest import ORIGIN, offset
+
+
+@pytest.fixture(autouse=True)
+def empty_cell_cache():
+    incident_cell_cache.clear()
+
+
+def report(client, headers, point: tuple[float, float], description: str) -> dict:
+    r = client.post("/incidents", json={"lat": point[0], "lng": point[1], "description": description}, headers=headers)
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def insert_cluster(point: tuple[float, float], description: str, reported_at: datetime) -> None:
+    with session_scope() as db:
+        db.add(
+            IncidentCluster(
+                lat=point[0],
+                lng=point[1],
+                cell=cell_id(*point),
+                description=description,
+                report_count=1,
+                first_reported_at=reported_at,
+                last_reported_at=reported_at,
+            )
+        )
+
+
+def nearby(client, headers, radius_m: float, **params):
+    lat, lng = ORIGIN
+    r = client.get("/incidents/nearby", params={"lat": lat, "lng": lng, "radius_m": radius_m, **params}, headers=headers)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_nearby_filters_by_exact_distance(client, alice):
+    headers = alice
+    report(client, headers, offset(900, 0), "far-ish")
+    report(client, headers, offset(0, -200), "close")
+    report(client, headers, offset(3000, 3000), "far")
+
+    body = nearby(client, headers, 1000)
+    assert [r["description"] for r in body["results"]] == ["close", "far-ish"]
+    assert 195 < body["results"][0]["distance_m"] < 205
+
+    assert len(nearby(client, headers, 5000)["results"]) == 3
+
+
+def test_nearby_since_window(client, alice):
+    headers = alice
+    now = datetime.now(timezone.utc)
+    insert_cluster(offset(100), "two days ago", now - timedelta(days=2))
+    insert_cluster(offset(100), "ten days ago", now - timedelta(days=10))
+    report(client, headers, offset(50), "now")
+
+    assert [r["description"] for r in nearby(client, headers, 500)["results"]] == ["now"]
+    since = (now - timedelta(days=3)).isoformat()
+    assert [r["description"] for r in nearby(client, headers, 500, since=since)["results"]] == ["now", "two days ago"]
+
+    lat, lng = ORIGIN
+    r = client.get(
+        "/incidents/nearby",
+        params={"lat": lat, "lng": lng, "since": (now - timedelta(days=30)).isoformat()},
+        headers=headers,
+    )
+    assert r.status_code == 400
+    assert r.json()["detail"]["error"]["code"] == "INVALID_RANGE"
+
+
+def test_nearby_validates_params(client, alice):
+    headers = alice
+    assert client.get("/incidents/nearby", params={"lat": 95, "lng": 0}, headers=headers).status_code == 422
+    assert client.get("/incidents/nearby", params={"lat": 0, "lng": 0, "radius_m": 50_000}, headers=headers).status_code == 422
+    assert client.get("/incidents/nearby", params={"lat": 0, "lng": 0}).status_code == 401
+
+
+def test_hot_cells_are_cached_and_invalidated_on_report(client, alice, env):
+    headers = alice
+    env(INCIDENT_CACHE_TTL_SECONDS="300")
+    report(client, headers, offset(10), "first")
+    assert len(nearby(client, headers, 300)["results"]) == 1
+    misses = incident_cell_cache.misses
+
+    # Written behind the cache's back: not visible until the TTL expires...
+    insert_cluster(offset(20), "direct", datetime.now(timezone.utc))
+    assert len(nearby(client, headers, 300)["results"]) == 1
+    assert incident_cell_cache.misses == misses
+    assert incident_cell_cache.hits > 0
+
+    # ...but a report through the API invalidates its cell.
+    report(client, headers, offset(150), "second")
+    assert len(nearby(client, headers, 300)["results"]) == 3
+
+
+def test_cache_disabled(client, alice, env):
+    headers = alice
+    env(INCIDENT_CACHE_TTL_SECONDS="0")
+    nearby(client, headers, 300)
+    insert_cluster(offset(20), "direct", datetime.now(timezone.utc))
+    assert len(nearby(client, headers, 300)["results"]) == 1
+
+
+def test_cells_cover_search_circle():
+    lat, lng = ORIGIN
+    cells = set(cells_within(lat, lng, 1500))
+    for bearing in range(0, 360, 15):
+        north = 1499 * math.cos(math.radians(bearing))
+        east = 1499 * math.sin(math.radians(bearing))
+        assert cell_id(*offset(north, east)) in cells
+    # Antimeridian wraps instead of falling off the grid.
+    assert cell_id(10.0, -179.999) in cells_within(10.0, 179.999, 1000)
+    assert len(cells_within(lat, lng, 100)) <= 4
+    assert CELL_DEG == 0.01
+
+
+def test_haversine_matches_known_distance():
+    # One degree of latitude along a meridian is ~111.2 km.
+    [d] = haversine_m(0.0, 0.0, [1.0], [0.0])
+    assert abs(d - 111_195) < 10
@@ -5,9 +5,9 @@ def auth_headers(token: str) -> dict[str, str]:
     return {"Authorization": f"Bearer {token}"}
 
 
-def test_happy_path_end_to_end(client, monkeypatch):
+def test_happy_path_end_to_end(client, env):
     # Configure tower shared key
-    monkeypatch.setenv("TOWER_SHARED_KEY", TOWER_KEY)
+    env(TOWER_SHARED_KEY=TOWER_KEY)
 
     # signup alice, bob
     alice_signup = client.post("/auth/signup", json={"username": "alice", "password": "pw"})
@@ -56,8 +56,8 @@ def test_happy_path_end_to_end(client, monkeypatch):
     assert "received_at" in res["location"]
 
 
-def test_mutual_friends_invariant(client, monkeypatch):
-    monkeypatch.setenv("TOWER_SHARED_KEY", TOWER_KEY)
+def test_mutual_friends_invariant(client, env):
+    env(TOWER_SHARED_KEY=TOWER_KEY)
 
     alice = client.post("/auth/signup", json={"username": "alice2", "password": "pw"}).json()
     alice_token = alice["access_token"]
@@ -73,8 +73,8 @@ def test_mutual_friends_invariant(client, monkeypatch):
     assert any(f["username"] == "alice2" for f in friends)
 
 
-def test_tower_auth_enforcement(client, monkeypatch):
-    monkeypatch.setenv("TOWER_SHARED_KEY", TOWER_KEY)
+def test_tower_auth_enforcement(client, env):
+    env(TOWER_SHARED_KEY=TOWER_KEY)
 
     body = {"fob_uid": "FOB_X", "lat": 43.65, "lng": -79.38}
 
@@ -91,8 +91,8 @@ def test_tower_auth_enforcement(client, monkeypatch):
     assert r.status_code == 201
 
 
-def test_fob_uniqueness(client, monkeypatch):
-    monkeypatch.setenv("TOWER_SHARED_KEY", TOWER_KEY)
+def test_fob_uniqueness(client, env):
+    env(TOWER_SHARED_KEY=TOWER_KEY)
 
     alice = client.post("/auth/signup", json={"username": "alice3", "password": "pw"})
     assert alice.status_code == 201
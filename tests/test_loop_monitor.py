@@ -0,0 +1,30 @@
+import asyncio
+import time
+
+from app.loop_monitor import LoopLagMonitor
+
+
+def test_monitor_records_blocking_stretch():
+    async def scenario() -> LoopLagMonitor:
+        monitor = LoopLagMonitor(threshold_ms=20, interval_ms=5)
+        monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)  # block the event loop
+        await asyncio.sleep(0.02)
+        await monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(scenario())
+    assert monitor.stall_count >= 1
+    assert monitor.max_lag >= 0.05
+    snapshot = monitor.snapshot()
+    assert snapshot["running"] is False
+    assert snapshot["recent_stalls"][-1]["lag_ms"] >= 50
+
+
+def test_loop_health_endpoint(client):
+    r = client.get("/health/loop")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["running"] is True
+    assert body["threshold_ms"] == 100
@@ -0,0 +1,60 @@
+import pytest
+
+from app import metrics
+
+
+TOWER_KEY = "test-tower-key"
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    for metric in metrics.REGISTRY:
+        metric.reset()
+
+
+def test_request_metrics_use_route_template(client, env):
+    env(TOWER_SHARED_KEY=TOWER_KEY)
+    signup = client.post("/auth/signup", json={"username": "alice", "password": "pw"})
+    token = signup.json()["access_token"]
+    r = client.post("/tower/pings", json={"fob_uid": "FOB_M1", "lat": 1, "lng": 2}, headers={"X-Tower-Key": TOWER_KEY})
+    assert r.status_code == 201
+    r = client.post("/tower/pings", json={"fob_uid": "FOB_M1", "lat": 1, "lng": 2}, headers={"X-Tower-Key": "wrong"})
+    assert r.status_code == 401
+    client.get("/map/latest", headers={"Authorization": f"Bearer {token}"})
+    client.get("/no/such/path")
+
+    assert metrics.http_requests.value("POST", "/tower/pings", "201") == 1
+    assert metrics.http_requests.value("POST", "/tower/pings", "401") == 1
+    assert metrics.http_requests.value("GET", "/no/such/path", "404") == 0
+    assert metrics.http_requests.value("GET", "<unmatched>", "404") == 1
+    assert metrics.http_request_duration.count("POST", "/tower/pings") == 2
+    # /map/latest loads the current user, then runs the map query.
+    assert metrics.http_request_db_queries.count("GET", "/map/latest") == 1
+    assert metrics.http_request_db_queries.sum("GET", "/map/latest") >= 2
+    assert metrics.http_request_db_duration.sum("GET", "/map/latest") > 0
+
+
+def test_ingest_counters(client, env):
+    env(TOWER_SHARED_KEY=TOWER_KEY)
+    headers = {"X-Tower-Key": TOWER_KEY}
+    client.post("/tower/pings", json={"fob_uid": "FOB_M2", "lat": 1, "lng": 2}, headers=headers)
+    client.post("/tower/pings", json={"fob_uid": "FOB_M2", "lat": 1, "lng": 2, "status": 2}, headers=headers)
+
+    assert metrics.pings_ingested.value() == 2
+    assert metrics.fobs_auto_registered.value() == 1
+    assert metrics.sos_events.value() == 1
+
+
+def test_metrics_endpoint_exposition(client, env):
+    env(TOWER_SHARED_KEY=TOWER_KEY)
+    client.post("/tower/pings", json={"fob_uid": "FOB_M3", "lat": 1, "lng": 2}, headers={"X-Tower-Key": TOWER_KEY})
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    body = r.text
+    assert "# TYPE compass_http_request_duration_seconds histogram" in body
+    assert 'compass_http_requests_total{method="POST",route="/tower/pings",status="201"} 1' in body
+    assert 'compass_http_request_duration_seconds_bucket{method="POST",route="/tower/pings",le="+Inf"} 1' in body
+    assert "compass_pings_ingested_total 1" in body
+    assert "compass_sos_events_total 0" in body
@@ -0,0 +1,124 @@
+import random
+import time
+
+from sqlalchemy import func, select
+
+from app.db import session_scope
+from app.metrics import pings_quarantined
+from app.models import Ping, QuarantinedPing
+from app.movement import MovementFilter, movement_filter
+from conftest import offset
+
+
+TOWER_KEY = "test-tower-key"
+
+
+def ping(client, fob_uid: str, point: tuple[float, float], status: int = 0) -> dict:
+    r = client.post(
+        "/tower/pings",
+        json={"fob_uid": fob_uid, "lat": point[0], "lng": point[1], "status": status},
+        headers={"X-Tower-Key": TOWER_KEY},
+    )
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def counts() -> tuple[int, int]:
+    with session_scope() as db:
+        return db.scalar(select(func.count()).select_from(Ping)), db.scalar(
+            select(func.count()).select_from(QuarantinedPing)
+        )
+
+
+def test_spike_is_quarantined_and_track_continues(client, env, query_budget):
+    env(TOWER_SHARED_KEY=TOWER_KEY)
+    before = pings_quarantined.value("shared")
+    assert ping(client, "FOB_1", offset(0)) == {"stored": True, "quarantined": False}
+    assert ping(client, "FOB_1", offset(200))["quarantined"] is False  # within the noise allowance
+
+    # Screened from memory: the quarantine insert is the only statement.
+    with query_budget(1):
+        assert ping(client, "FOB_1", offset(5000)) == {"stored": True, "quarantined": True}
+    assert ping(client, "FOB_1", offset(210))["quarantined"] is False
+
+    assert counts() == (3, 1)
+    with session_scope() as db:
+        row = db.scalars(select(QuarantinedPing)).one()
+    assert row.fob_uid == "FOB_1" and abs(row.distance_m - 4800) < 10 and row.elapsed_seconds < 5
+    assert pings_quarantined.value("shared") == before + 1
+    assert 'compass_pings_quarantined_total{tower="shared"}' in client.get("/metrics").text
+
+
+def test_fob_that_really_moved_is_accepted_after_one_ping(client, env):
+    env(TOWER_SHARED_KEY=TOWER_KEY)
+    ping(client, "FOB_1", offset(0))
+    assert ping(client, "FOB_1", offset(5000))["quarantined"] is True
+    # Agrees with the quarantined ping, so the fob is there now.
+    assert ping(client, "FOB_1", offset(5050))["quarantined"] is False
+    assert ping(client, "FOB_1", offset(5100))["quarantined"] is False
+    assert counts() == (3, 1)
+
+
+def test_slow_moves_sos_and_unknown_fobs_pass(client, env):
+    env(TOWER_SHARED_KEY=TOWER_KEY)
+    assert ping(client, "FOB_1", offset(5000))["quarantined"] is False  # nothing to compare with yet
+
+    # 5 km in ten minutes is about 8 m/s.
+    movement_filter.record("FOB_1", *offset(0), time.time() - 600, accepted=True)
+    assert ping(client, "FOB_1", offset(5000))["quarantined"] is False
+
+    assert ping(client, "FOB_1", offset(-5000), status=2)["quarantined"] is False
+    assert counts() == (3, 0)
+
+
+def test_filter_can_be_disabled(client, env):
+    env(TOWER_SHARED_KEY=TOWER_KEY, MOVEMENT_MAX_SPEED_MPS="0")
+    ping(client, "FOB_1", offset(0))
+    assert ping(client, "FOB_1", offset(5000))["quarantined"] is False
+    assert counts() == (2, 0)
+
+
+def test_check_batch_matches_ping_by_ping():
+    rng = random.Random(7)
+    pings = []
+    sos_at = set()
+    for fob in range(30):
+        north, at = 0.0, 1_000_000.0
+        for _ in range(rng.randint(1, 40)):
+            at += rng.uniform(0, 60)
+            north += rng.uniform(-100, 100)
+            r = rng.random()
+            if r < 0.1:
+                pings.append((f"FOB_{fob}", *offset(north + rng.choice((-1, 1)) * 5000), at))  # spike
+            elif r < 0.11:
+                sos_at.add(at)  # SOS spike: accepted anyway
+                pings.append((f"FOB_{fob}", *offset(north + 5000), at))
+            elif r < 0.13:
+                north += 8000  # real relocation
+                pings.append((f"FOB_{fob}", *offset(north), at))
+            else:
+                pings.append((f"FOB_{fob}", *offset(north), at))
+    limits = (30.0, 250.0)
+
+    sequential = MovementFilter()
+    expected = {}
+    for fob_uid, lat, lng, at in sorted(pings, key=lambda p: (p[0], p[3])):
+        accepted = at in sos_at or sequential.check(fob_uid, lat, lng, at, *limits) is None
+        sequential.record(fob_uid, lat, lng, at, accepted)
+        expected[(fob_uid, at)] = accepted
+    assert 0 < list(expected.values()).count(False) < len(pings) // 4
+
+    # In shuffled order and split in two batches: state carries over between them.
+    rng.shuffle(pings)
+    batched = MovementFilter()
+    got = {}
+    for batch in ([p for p in pings if p[3] < 1_000_600], [p for p in pings if p[3] >= 1_000_600]):
+        fob_uids, lats, lngs, ats = zip(*batch)
+        sos = [at in sos_at for at in ats]
+        verdicts = batched.check_batch(fob_uids, lats, lngs, ats, *limits, always_accept=sos)
+        for fob_uid, at, accepted in zip(fob_uids, ats, verdicts):
+            got[(fob_uid, at)] = bool(accepted)
+
+    assert got == expected
+    for fob in range(30):
+        assert batched.get(f"FOB_{fob}") == sequential.get(f"FOB_{fob}")
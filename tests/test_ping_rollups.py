@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+
+from app.db import session_scope
+from app.models import Fob, Ping, PingRollup
+from app.rollups import fob_history, rollup_pings
+from conftest import auth_headers
+
+
+def add_pings(fob_uid: str, points: list[tuple[datetime, float, float, int]]) -> None:
+    with session_scope() as db:
+        if db.get(Fob, fob_uid) is None:
+            db.add(Fob(fob_uid=fob_uid))
+            db.flush()
+        for received_at, lat, lng, status in points:
+            db.add(Ping(fob_uid=fob_uid, lat=lat, lng=lng, status=status, received_at=received_at))
+
+
+def test_rollups_are_incremental(client):
+    base = datetime(2026, 9, 1, 10, tzinfo=timezone.utc)
+    add_pings("FOB_ROLL", [
+        (base + timedelta(minutes=5), 43.0, -79.0, 0),
+        (base + timedelta(minutes=50), 44.0, -80.0, 2),
+        (base + timedelta(hours=1, minutes=1), 43.5, -79.5, 1),
+    ])
+
+    with session_scope() as db:
+        assert rollup_pings(db, settle_seconds=0) == 3
+    with session_scope() as db:
+        # Nothing new: the high-water mark prevents double counting.
+        assert rollup_pings(db, settle_seconds=0) == 0
+
+    add_pings("FOB_ROLL", [(base + timedelta(minutes=30), 42.0, -78.0, 0)])
+    with session_scope() as db:
+        assert rollup_pings(db, batch_size=10, settle_seconds=0) == 1
+        rows = db.query(PingRollup).order_by(PingRollup.hour).all()
+
+    assert [(r.hour, r.ping_count) for r in rows] == [(base, 3), (base + timedelta(hours=1), 1)]
+    first = rows[0]
+    assert (first.min_lat, first.max_lat, first.min_lng, first.max_lng) == (42.0, 44.0, -80.0, -78.0)
+    assert first.max_status == 2
+    assert first.first_received_at == base + timedelta(minutes=5)
+    assert first.last_received_at == base + timedelta(minutes=50)
+
+    with session_scope() as db:
+        days = fob_history(db, "FOB_ROLL", base - timedelta(days=1), base + timedelta(days=1), "day")
+    assert len(days) == 1
+    assert days[0]["ping_count"] == 4
+    assert days[0]["centroid_lat"] == (43.0 + 44.0 + 43.5 + 42.0) / 4
+
+
+def test_recent_pings_wait_for_settle_window(client):
+    add_pings("FOB_FRESH", [(datetime.now(timezone.utc), 43.0, -79.0, 0)])
+    with session_scope() as db:
+        assert rollup_pings(db, settle_seconds=60) == 0
+        assert rollup_pings(db, settle_seconds=0) == 1
+
+
+def test_pings_committed_late_are_not_skipped(client):
+    old = datetime.now(timezone.utc) - timedelta(hours=1)
+    add_pings("FOB_LATE", [])
+    with session_scope() as slow:
+        # A lower id that stays uncommitted while a later ping commits.
+        slow.add(Ping(fob_uid="FOB_LATE", lat=43.0, lng=-79.0, status=0, received_at=old))
+        slow.flush()
+        add_pings("FOB_LATE", [(old, 44.0, -80.0, 0)])
+        with session_scope() as db:
+            assert rollup_pings(db, settle_seconds=0) == 0
+    with session_scope() as db:
+        assert rollup_pings(db, settle_seconds=0) == 2
+        assert db.query(PingRollup).one().ping_count == 2
+
+
+def test_fob_history_endpoint(client):
+    token = client.post("/auth/signup", json={"username": "hist_user", "password": "pw"}).json()["access_token"]
+    r = client.get("/fob/me/history", headers=auth_headers(token))
+    assert r.status_code == 404
+
+    assert client.post("/fob/claim", json={"fob_uid": "FOB_HIST"}, headers=auth_headers(token)).status_code == 201
+    now = datetime.now(timezone.utc)
+    add_pings("FOB_HIST", [(now - timedelta(days=d), 43.0, -79.0, 0) for d in (1, 2, 20)])
+    with session_scope() as db:
+        rollup_pings(db, settle_seconds=0)
+
+    r = client.get("/fob/me/history", params={"bucket": "day"}, headers=auth_headers(token))
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["fob_uid"] == "FOB_HIST"
+    assert [b["ping_count"] for b in body["buckets"]] == [1, 1]
+
+    since = (now - timedelta(days=28)).isoformat()
+    r = client.get("/fob/me/history", params={"since": since, "bucket": "day"}, headers=auth_headers(token))
+    assert len(r.json()["buckets"]) == 3
+
+    r = client.get("/fob/me/history", params={"since": now.isoformat(), "until": since}, headers=auth_headers(token))
+    assert r.status_code == 400
@@ -0,0 +1,150 @@
+"""
+PATCH /auth/me avatar uploads against a local Vercel Blob stub.
+
+The stub is an ``httpx.MockTransport`` installed as the shared blob client, so
+uploads exercise the real streaming request path without network access.
+"""
+import asyncio
+import io
+
+import httpx
+import pytest
+from PIL import Image
+from starlette.datastructures import UploadFile
+
+from app import avatars, storage
+
+
+def make_png(color: tuple[int, int, int] = (200, 40, 40), size: tuple[int, int] = (400, 300)) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, format="PNG")
+    return out.getvalue()
+
+
+PNG_BYTES = make_png()
+
+
+def auth_headers(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture()
+def blob_stub(monkeypatch, env):
+    """Install a fake Vercel Blob endpoint; returns the list of received uploads."""
+    env(BLOB_READ_WRITE_TOKEN="fake-blob-token-for-test")
+    uploads: list[dict] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        uploads.append({"path": request.url.path, "body": body, "headers": request.headers})
+        return httpx.Response(
+            200, json={"url": f"https://public.blob.vercel-storage.com{request.url.path}"}
+        )
+
+    monkeypatch.setattr(storage, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return uploads
+
+
+def signup(client, username: str) -> str:
+    r = client.post("/auth/signup", json={"username": username, "password": "pw"})
+    assert r.status_code == 201, r.text
+    return r.json()["access_token"]
+
+
+def upload_avatar(client, token: str, content: bytes, filename: str = "me.png", **data):
+    return client.patch(
+        "/auth/me",
+        data=data,
+        files={"profile_picture": (filename, content, "image/png")},
+        headers=auth_headers(token),
+    )
+
+
+def test_avatar_upload_stores_original_and_thumbnails(client, blob_stub):
+    token = signup(client, "alice_avatar")
+
+    r = upload_avatar(client, token, PNG_BYTES, display_name="Alice")
+    assert r.status_code == 200, r.text
+    profile = r.json()
+    assert profile["display_name"] == "Alice"
+
+    digest = avatars.content_hash(PNG_BYTES)
+    assert profile["profile_picture_url"].endswith(f"/avatars/{digest}.png")
+    thumbs = profile["profile_picture_thumbnails"]
+    assert set(thumbs) == {str(size) for size in avatars.THUMBNAIL_SIZES}
+    assert thumbs["64"].endswith(f"/avatars/{digest}_64.webp")
+
+    # original + one WebP per thumbnail size
+    assert len(blob_stub) == 1 + len(avatars.THUMBNAIL_SIZES)
+    by_path = {u["path"]: u for u in blob_stub}
+    assert by_path[f"/avatars/{digest}.png"]["body"] == PNG_BYTES
+    assert by_path[f"/avatars/{digest}.png"]["headers"]["authorization"] == "Bearer fake-blob-token-for-test"
+    with Image.open(io.BytesIO(by_path[f"/avatars/{digest}_128.webp"]["body"])) as thumb:
+        assert thumb.format == "WEBP"
+        assert thumb.size == (128, 128)
+
+
+def test_identical_avatar_upload_reuses_blob(client, blob_stub):
+    alice = signup(client, "alice_dedup")
+    bob = signup(client, "bob_dedup")
+
+    first = upload_avatar(client, alice, PNG_BYTES)
+    assert first.status_code == 200, first.text
+    uploads_after_first = len(blob_stub)
+
+    second = upload_avatar(client, bob, PNG_BYTES, filename="other-name.png")
+    assert second.status_code == 200, second.text
+    assert len(blob_stub) == uploads_after_first
+    assert second.json()["profile_picture_url"] == first.json()["profile_picture_url"]
+    assert second.json()["profile_picture_thumbnails"] == first.json()["profile_picture_thumbnails"]
+
+    # Friends list exposes the thumbnails
+    r = client.post("/friends/add", json={"username": "bob_dedup"}, headers=auth_headers(alice))
+    assert r.json()["friend"]["profile_picture_thumbnails"] == second.json()["profile_picture_thumbnails"]
+    r = client.get("/friends", headers=auth_headers(alice))
+    assert r.json()["friends"][0]["profile_picture_thumbnails"] == second.json()["profile_picture_thumbnails"]
+
+
+def test_avatar_extension_follows_content_type_not_filename(client, blob_stub):
+    token = signup(client, "alice_ext")
+
+    r = upload_avatar(client, token, PNG_BYTES, filename="avatar.html")
+    assert r.status_code == 200, r.text
+    digest = avatars.content_hash(PNG_BYTES)
+    assert r.json()["profile_picture_url"].endswith(f"/avatars/{digest}.png")
+    assert f"/avatars/{digest}.png" in {u["path"] for u in blob_stub}
+
+
+def test_avatar_upload_rejects_undecodable_image(client, blob_stub):
+    token = signup(client, "alice_garbage")
+
+    r = upload_avatar(client, token, b"\x89PNG\r\n\x1a\n" + b"\x00" * 1024)
+    assert r.status_code == 400, r.text
+    assert "INVALID_IMAGE" in r.text
+    assert blob_stub == []
+
+
+def test_avatar_upload_rejects_oversized_file(client, blob_stub):
+    token = signup(client, "alice_big")
+
+    r = client.patch(
+        "/auth/me",
+        files={"profile_picture": ("big.png", b"\x00" * (storage.MAX_AVATAR_BYTES + 1), "image/png")},
+        headers=auth_headers(token),
+    )
+    assert r.status_code == 400, r.text
+    assert "FILE_TOO_LARGE" in r.text
+    assert blob_stub == []
+
+
+def test_iter_upload_aborts_past_limit():
+    upload = UploadFile(io.BytesIO(b"x" * 100))
+
+    async def consume(max_bytes: int) -> int:
+        return sum([len(chunk) async for chunk in storage.iter_upload(upload, max_bytes, chunk_size=16)])
+
+    with pytest.raises(storage.UploadTooLarge):
+        asyncio.run(consume(50))
+
+    upload.file.seek(0)
+    assert asyncio.run(consume(100)) == 100
@@ -0,0 +1,86 @@
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.db import session_scope
+from app.metrics import MetricsMiddleware
+
+
+TOWER_KEY = "test-tower-key"
+
+
+def auth_headers(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def signup(client, username: str) -> str:
+    r = client.post("/auth/signup", json={"username": username, "password": "pw"})
+    assert r.status_code == 201
+    return r.json()["access_token"]
+
+
+def test_endpoint_query_budgets(client, query_budget, env):
+    env(TOWER_SHARED_KEY=TOWER_KEY)
+    alice = auth_headers(signup(client, "alice"))
+    signup(client, "bob")
+    tower = {"X-Tower-Key": TOWER_KEY}
+
+    with query_budget(2):
+        assert client.post("/auth/signup", json={"username": "carol", "password": "pw"}).status_code == 201
+    with query_budget(1):
+        assert client.post("/auth/login", json={"username": "alice", "password": "pw"}).status_code == 200
+    with query_budget(1):
+        assert client.get("/auth/me", headers=alice).status_code == 200
+    # current user, friend lookup, one insert for both directions
+    with query_budget(3):
+        assert client.post("/friends/add", json={"username": "bob"}, headers=alice).status_code == 200
+    with query_budget(2):
+        assert client.get("/friends", headers=alice).status_code == 200
+    with query_budget(4):
+        assert client.post("/fob/claim", json={"fob_uid": "FOB_QB"}, headers=alice).status_code == 201
+    with query_budget(2):
+        assert client.get("/fob/me", headers=alice).status_code == 200
+    with query_budget(3):
+        assert client.post("/tower/pings", json={"fob_uid": "FOB_NEW", "lat": 1, "lng": 2}, headers=tower).status_code == 201
+    with query_budget(2):
+        assert client.post("/tower/pings", json={"fob_uid": "FOB_QB", "lat": 1, "lng": 2}, headers=tower).status_code == 201
+    with query_budget(2):
+        assert client.get("/map/latest", headers=alice).status_code == 200
+    with query_budget(2):
+        assert client.get("/map/latest?window_minutes=5", headers=alice).status_code == 200
+    with query_budget(3):
+        assert client.post("/friends/remove", json={"username": "bob"}, headers=alice).status_code == 200
+
+
+def n_plus_one_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/loop/{n}")
+    def loop(n: int):
+        with session_scope() as db:
+            for i in range(n):
+                db.execute(text("SELECT :i"), {"i": i})
+        return {"ok": True}
+
+    return app
+
+
+def test_repeated_statements_are_logged(env, caplog):
+    env(QUERY_REPEAT_WARN_THRESHOLD="3")
+    with TestClient(n_plus_one_app()) as client, caplog.at_level(logging.WARNING, logger="compass.db"):
+        client.get("/loop/2")
+        assert not caplog.records
+        client.get("/loop/5")
+
+    [record] = caplog.records
+    assert "GET /loop/{n} (request None) ran the same statement 5 times" in record.getMessage()
+    assert "SELECT %(i)s" in record.getMessage()
+
+
+def test_repeat_warnings_disabled_by_default(caplog):
+    with TestClient(n_plus_one_app()) as client, caplog.at_level(logging.WARNING, logger="compass.db"):
+        client.get("/loop/10")
+    assert not caplog.records
@@ -0,0 +1,209 @@
+"""
+Query-plan regression suite for the hot SQL paths.
+
+Migrates a scratch schema, loads a synthetic dataset at realistic scale, runs
+``EXPLAIN (FORMAT JSON)`` on each hot query and fails if an expected index is
+no longer used, if ``pings`` is sequentially scanned, or if the planner's
+estimated total cost jumps past ``PLAN_COST_TOLERANCE`` x the recorded
+baseline in ``query_plan_baselines.json``.
+
+Scale is tunable with ``PLAN_TEST_USERS`` / ``PLAN_TEST_PINGS``. After an
+intentional plan change, re-record baselines with ``UPDATE_PLAN_BASELINES=1``.
+"""
+import json
+import os
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, make_url, text
+
+from app.incident_feed import FEED_AFTER_SQL, FEED_SQL
+from app.routes.friends import FRIENDS_WITH_LATEST_PING_SQL
+from app.routes.map import LATEST_MAP_SINCE_SQL, LATEST_MAP_SQL
+from app.settings import get_settings, reload_settings
+
+
+SCHEMA = "plan_check"
+N_USERS = int(os.getenv("PLAN_TEST_USERS", "5000"))
+N_PINGS = int(os.getenv("PLAN_TEST_PINGS", "500000"))
+COST_TOLERANCE = float(os.getenv("PLAN_COST_TOLERANCE", "2.0"))
+BASELINES_PATH = Path(__file__).with_name("query_plan_baselines.json")
+
+FOB_BY_OWNER_SQL = text("SELECT fob_uid FROM fobs WHERE owner_user_id = :current_user_id")
+
+# name -> (statement, extra params, indexes that must appear in the plan)
+HOT_QUERIES = {
+    "latest_map": (
+        LATEST_MAP_SQL,
+        {},
+        {"ix_pings_fob_uid_received_at_desc", "ix_friendships_user_id"},
+    ),
+    "latest_map_window": (
+        LATEST_MAP_SINCE_SQL,
+        {"cutoff_minutes": 60},
+        {"ix_pings_fob_uid_received_at_desc", "ix_friendships_user_id"},
+    ),
+    "list_friends": (
+        FRIENDS_WITH_LATEST_PING_SQL,
+        {},
+        {"ix_pings_fob_uid_received_at_desc", "fobs_owner_user_id_key"},
+    ),
+    "fob_by_owner": (FOB_BY_OWNER_SQL, {}, {"fobs_owner_user_id_key"}),
+    "incident_feed": (FEED_SQL, {"limit": 21}, {"ix_incident_clusters_first_reported_at_desc"}),
+    "incident_feed_after": (
+        FEED_AFTER_SQL,
+        {"limit": 21, "cursor_at": "2000-01-01T00:00:00+00:00", "cursor_id": "ffffffff-ffff-ffff-ffff-ffffffffffff"},
+        {"ix_incident_clusters_first_reported_at_desc"},
+    ),
+}
+
+SEED_SQL = [
+    "SELECT setseed(0.42)",
+    """
+    INSERT INTO users (username, password_hash)
+    SELECT 'user_' || g, 'x' FROM generate_series(1, :n_users) g
+    """,
+    """
+    CREATE TEMP TABLE numbered_users ON COMMIT DROP AS
+    SELECT id, row_number() OVER (ORDER BY username) AS n FROM users
+    """,
+    # Skewed degree distribution: most users have a handful of friends, a few
+    # have dozens. Rows are inserted in both directions (mutual friendships).
+    """
+    INSERT INTO friendships (user_id, friend_id)
+    SELECT a.id, b.id
+    FROM numbered_users a
+    CROSS JOIN LATERAL generate_series(1, 1 + floor(60 * power(random(), 3))::int) AS o
+    JOIN numbered_users b ON b.n = (a.n + o * 7) % :n_users + 1
+    WHERE a.id <> b.id
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO friendships (user_id, friend_id)
+    SELECT friend_id, user_id FROM friendships
+    ON CONFLICT DO NOTHING
+    """,
+    # 90% of users own a fob; 500 more are auto-registered but unclaimed.
+    """
+    INSERT INTO fobs (fob_uid, owner_user_id)
+    SELECT 'FOB_' || n, id FROM numbered_users WHERE n % 10 <> 0
+    """,
+    "INSERT INTO fobs (fob_uid) SELECT 'FOB_UNCLAIMED_' || g FROM generate_series(1, 500) g",
+    """
+    CREATE TEMP TABLE numbered_fobs ON COMMIT DROP AS
+    SELECT fob_uid, row_number() OVER (ORDER BY fob_uid) AS n FROM fobs
+    """,
+    # A month of pings, spread across fobs.
+    """
+    INSERT INTO pings (fob_uid, lat, lng, status, received_at)
+    SELECT f.fob_uid,
+           43.6 + random() * 0.1,
+           -79.4 + random() * 0.1,
+           (random() < 0.01)::int * 2,
+           now() - random() * interval '30 days'
+    FROM generate_series(1, :n_pings) g
+    JOIN numbered_fobs f ON f.n = 1 + (g::bigint * 7919) % (SELECT count(*) FROM numbered_fobs)
+    """,
+    # A year of incident clusters.
+    """
+    INSERT INTO incident_clusters (lat, lng, cell, description, first_reported_at, last_reported_at)
+    SELECT 43.6 + random() * 0.1, -79.4 + random() * 0.1, 0, 'incident', t, t
+    FROM (SELECT now() - random() * interval '365 days' AS t FROM generate_series(1, :n_users * 10)) s
+    """,
+]
+
+
+def schema_url(url: str) -> str:
+    return make_url(url).update_query_dict({"options": f"-csearch_path={SCHEMA}"}).render_as_string(
+        hide_password=False
+    )
+
+
+@pytest.fixture(scope="module")
+def plan_db(setup_db):
+    base_url = get_settings().DATABASE_URL
+    admin = create_engine(base_url)
+    with admin.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+
+    url = schema_url(base_url)
+    reload_settings(DATABASE_URL=url)
+    try:
+        command.upgrade(Config("alembic.ini"), "head")
+    finally:
+        reload_settings()
+
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        for sql in SEED_SQL:
+            conn.execute(text(sql), {"n_users": N_USERS, "n_pings": N_PINGS})
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+        # Explain as a typical viewer: median friend count, with a fob.
+        viewer_id = conn.execute(
+            text(
+                """
+                SELECT user_id FROM friendships
+                GROUP BY user_id ORDER BY count(*), user_id
+                OFFSET (SELECT count(DISTINCT user_id) / 2 FROM friendships) LIMIT 1
+                """
+            )
+        ).scalar_one()
+
+    yield engine, str(viewer_id)
+
+    engine.dispose()
+    with admin.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+    admin.dispose()
+
+
+def walk(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk(child)
+
+
+def explain(engine, stmt, params: dict) -> dict:
+    with engine.connect() as conn:
+        return conn.execute(text("EXPLAIN (FORMAT JSON) " + stmt.text), params).scalar_one()[0]["Plan"]
+
+
+def load_baselines() -> dict:
+    return json.loads(BASELINES_PATH.read_text()) if BASELINES_PATH.exists() else {}
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_plan(plan_db, name):
+    engine, viewer_id = plan_db
+    stmt, extra, expected_indexes = HOT_QUERIES[name]
+    params = {"current_user_id": viewer_id, **extra}
+    if "cutoff_minutes" in extra:
+        with engine.connect() as conn:
+            params["cutoff"] = conn.execute(
+                text("SELECT now() - make_interval(mins => :m)"), {"m": extra["cutoff_minutes"]}
+            ).scalar_one()
+
+    plan = explain(engine, stmt, params)
+    nodes = list(walk(plan))
+
+    used_indexes = {node["Index Name"] for node in nodes if "Index Name" in node}
+    missing = expected_indexes - used_indexes
+    assert not missing, f"{name}: plan no longer uses {sorted(missing)}; uses {sorted(used_indexes)}"
+
+    seq_scanned = {node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"}
+    assert "pings" not in seq_scanned, f"{name}: sequential scan on pings"
+
+    cost = plan["Total Cost"]
+    baselines = load_baselines()
+    if os.getenv("UPDATE_PLAN_BASELINES") == "1":
+        baselines[name] = round(cost, 2)
+        BASELINES_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        return
+    assert name in baselines, f"{name}: no baseline cost; record one with UPDATE_PLAN_BASELINES=1"
+    assert cost <= baselines[name] * COST_TOLERANCE, (
+        f"{name}: estimated cost {cost:.0f} exceeds {COST_TOLERANCE}x baseline {baselines[name]:.0f}"
+    )
@@ -0,0 +1,52 @@
+import pytest
+
+from app import db as app_db
+from app.settings import get_settings, reload_settings
+from conftest import auth_headers
+
+
+@pytest.fixture()
+def replica(env):
+    """Point DATABASE_REPLICA_URL at the test DB (a stand-in replica with zero lag)."""
+    app_db.dispose_engine()
+    env(DATABASE_REPLICA_URL=get_settings().DATABASE_URL)
+    yield app_db.replica_lag
+    env(DATABASE_REPLICA_URL=None)
+    app_db.dispose_engine()
+
+
+def test_read_endpoints_use_primary_without_replica(client):
+    sessions = app_db.get_read_db()
+    assert not next(sessions).info.get("replica")
+    sessions.close()
+    assert app_db.get_replica_engine() is None
+
+
+def test_read_endpoints_route_to_replica(client, replica):
+    token = client.post("/auth/signup", json={"username": "replica_user", "password": "pw"}).json()["access_token"]
+
+    for path in ("/auth/me", "/friends", "/map/latest"):
+        r = client.get(path, headers=auth_headers(token))
+        assert r.status_code == 200, (path, r.text)
+    r = client.get("/fob/me", headers=auth_headers(token))
+    assert r.status_code == 404
+
+    assert replica.reads == 4
+    assert replica.fallbacks == 0
+    assert replica.lag_seconds == 0
+    assert client.get("/health/db").json()["replica"]["reads"] == 4
+
+
+def test_lagging_replica_falls_back_to_primary(client, replica, monkeypatch):
+    token = client.post("/auth/signup", json={"username": "lag_user", "password": "pw"}).json()["access_token"]
+    monkeypatch.setattr(replica, "measure", lambda engine: 120.0)
+
+    r = client.get("/friends", headers=auth_headers(token))
+    assert r.status_code == 200
+    assert (replica.reads, replica.fallbacks) == (0, 1)
+
+    # With fallback disabled the replica is used regardless of lag.
+    reload_settings(REPLICA_FALLBACK_TO_PRIMARY=False)
+    r = client.get("/friends", headers=auth_headers(token))
+    assert r.status_code == 200
+    assert (replica.reads, replica.fallbacks) == (1, 1)
@@ -0,0 +1,111 @@
+import math
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.db import session_scope
+from app.geo import cell_id
+from app.models import IncidentCluster
+from app.nearby import incident_cell_cache
+from app.route_score import score_points
+from conftest import offset
+
+
+@pytest.fixture(autouse=True)
+def empty_cell_cache():
+    incident_cell_cache.clear()
+
+
+def insert_cluster(point: tuple[float, float], reported_at: datetime) -> None:
+    with session_scope() as db:
+        db.add(
+            IncidentCluster(
+                lat=point[0],
+                lng=point[1],
+                cell=cell_id(*point),
+                description="incident",
+                report_count=1,
+                first_reported_at=reported_at,
+                last_reported_at=reported_at,
+            )
+        )
+
+
+def route(*points: tuple[float, float]) -> list[dict]:
+    return [{"lat": lat, "lng": lng} for lat, lng in points]
+
+
+def test_route_score_counts_corridor_with_time_decay(client, alice):
+    now = datetime.now(timezone.utc)
+    insert_cluster(offset(30, 500), now)  # beside the first leg
+    insert_cluster(offset(600, 1020), now - timedelta(hours=6))  # beside the second leg, one half-life old
+    insert_cluster(offset(-20, -20), now)  # past the start, within the rounded end
+    insert_cluster(offset(200, 500), now)  # outside the buffer
+    insert_cluster(offset(10, 200), now - timedelta(days=2))  # before the default window
+
+    # East 1 km, then north 1 km.
+    payload = {"points": route(offset(0, 0), offset(0, 1000), offset(1000, 1000)), "buffer_m": 50}
+    r = client.post("/incidents/route-score", json=payload, headers=alice)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["length_m"] == pytest.approx(2000, rel=1e-3)
+    assert body["incident_count"] == 3
+    assert body["score"] == pytest.approx(2.5, abs=1e-3)
+    assert body["segment_scores"] == pytest.approx([2.0, 0.5], abs=1e-3)
+    area_km2 = (2 * 50 * 2000 + math.pi * 50**2) / 1e6
+    assert body["density_per_km2"] == pytest.approx(2.5 / area_km2, rel=1e-3)
+
+    payload["since"] = (now - timedelta(days=3)).isoformat()
+    assert client.post("/incidents/route-score", json=payload, headers=alice).json()["incident_count"] == 4
+
+
+def test_route_score_spanning_many_cells(client, alice):
+    now = datetime.now(timezone.utc)
+    # A 6 km diagonal leg crosses several grid cells with nothing at its vertices.
+    for k in range(1, 6):
+        insert_cluster(offset(1000 * k, 1000 * k + 20), now)
+    r = client.post(
+        "/incidents/route-score",
+        json={"points": route(offset(0, 0), offset(6000, 6000)), "buffer_m": 25},
+        headers=alice,
+    )
+    assert r.json()["incident_count"] == 5
+
+
+def test_route_score_validation(client, alice):
+    def post(**payload):
+        r = client.post("/incidents/route-score", json=payload, headers=alice)
+        assert r.status_code == 400, r.text
+        return r.json()["detail"]["error"]["code"]
+
+    assert post(points=route(offset(0))) == "INVALID_ROUTE"
+    assert post(points=route(offset(0), (91.0, 0.0))) == "INVALID_ROUTE"
+    assert post(points=route(offset(0), offset(60_000))) == "INVALID_ROUTE"
+    assert post(points=route(offset(0), offset(100)), buffer_m=0) == "INVALID_RANGE"
+    assert post(points=route(offset(0), offset(100)), half_life_hours=0) == "INVALID_RANGE"
+    old = (datetime.now(timezone.utc) - timedelta(days=8)).isoformat()
+    assert post(points=route(offset(0), offset(100)), since=old) == "INVALID_RANGE"
+    assert client.post("/incidents/route-score", json={"points": route(offset(0), offset(1))}).status_code == 401
+
+
+def test_score_points_matches_brute_force():
+    rng = np.random.default_rng(7)
+    heading = np.cumsum(rng.normal(0, 0.5, 300))
+    north, east = np.cumsum(np.cos(heading) * 15), np.cumsum(np.sin(heading) * 15)
+    qn, qe = ((rng.random((5000, 2)) - 0.5) * 3000).T
+    route_lats, route_lngs = np.array([offset(n, e) for n, e in zip(north, east)]).T
+    lats, lngs = np.array([offset(n, e) for n, e in zip(qn, qe)]).T
+
+    result = score_points(route_lats, route_lngs, lats, lngs, np.zeros(len(lats)), 40, 0.0, 3600)
+
+    # Brute force over every segment, in offset()'s local meters.
+    best = np.full(len(qn), np.inf)
+    for i in range(len(north) - 1):
+        dn, de = north[i + 1] - north[i], east[i + 1] - east[i]
+        t = np.clip(((qn - north[i]) * dn + (qe - east[i]) * de) / (dn * dn + de * de), 0, 1)
+        best = np.minimum(best, np.hypot(qn - north[i] - t * dn, qe - east[i] - t * de))
+    # The two projections differ by centimeters, which can only flip points on the edge.
+    assert abs(result.incident_count - int((best <= 40).sum())) <= 1
+    assert result.score == result.incident_count  # every point reported "now"
+    assert sum(result.segment_scores) == pytest.approx(result.score)
@@ -0,0 +1,52 @@
+import os
+import signal
+
+import pytest
+
+from app import settings as settings_module
+from app.settings import get_settings, install_reload_signal_handler, reload_settings
+
+
+def test_settings_snapshot_is_cached_and_read_only():
+    settings = get_settings()
+    assert get_settings() is settings
+
+    with pytest.raises(AttributeError):
+        settings.TOWER_SHARED_KEY = "nope"
+
+
+def test_reload_settings_picks_up_env_and_overrides(env):
+    env(TOWER_SHARED_KEY="from-env")
+    assert get_settings().TOWER_SHARED_KEY == "from-env"
+
+    reload_settings(TOWER_SHARED_KEY="override")
+    assert get_settings().TOWER_SHARED_KEY == "override"
+
+    with pytest.raises(AttributeError):
+        reload_settings(NOT_A_SETTING=1)
+
+
+def test_tower_key_override_applies_to_requests(client):
+    body = {"fob_uid": "FOB_SETTINGS", "lat": 43.65, "lng": -79.38}
+
+    reload_settings(TOWER_SHARED_KEY="rotated-key")
+    r = client.post("/tower/pings", json=body, headers={"X-Tower-Key": "rotated-key"})
+    assert r.status_code == 201, r.text
+
+    r = client.post("/tower/pings", json=body, headers={"X-Tower-Key": "dev-tower-key"})
+    assert r.status_code == 401
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGHUP"), reason="no SIGHUP on this platform")
+def test_sighup_during_reload_does_not_deadlock(monkeypatch):
+    previous = signal.getsignal(signal.SIGHUP)
+    assert install_reload_signal_handler()
+    try:
+        # Not env(): the SIGHUP is what should pick this up.
+        monkeypatch.setenv("TOWER_SHARED_KEY", "from-sighup")
+        # The handler runs on the main thread, here while it holds the reload lock.
+        with settings_module._reload_lock:
+            os.kill(os.getpid(), signal.SIGHUP)
+        assert get_settings().TOWER_SHARED_KEY == "from-sighup"
+    finally:
+        signal.signal(signal.SIGHUP, previous)
@@ -0,0 +1,78 @@
+import json
+import logging
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.slow_queries import redact_params
+
+
+@pytest.fixture()
+def executed_statements():
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "after_cursor_execute", record)
+    yield statements
+    event.remove(Engine, "after_cursor_execute", record)
+
+
+def test_request_id_is_generated_or_propagated(client):
+    generated = client.get("/health").headers["X-Request-ID"]
+    assert len(generated) == 32
+
+    r = client.get("/health", headers={"X-Request-ID": "edge-42.a"})
+    assert r.headers["X-Request-ID"] == "edge-42.a"
+
+    # Anything that isn't safe to embed in SQL comments and logs is replaced.
+    r = client.get("/health", headers={"X-Request-ID": "x' */ DROP TABLE users; --"})
+    assert r.headers["X-Request-ID"] != "x' */ DROP TABLE users; --"
+
+
+def test_statements_carry_request_id_comment(client, executed_statements):
+    r = client.post("/auth/signup", json={"username": "alice", "password": "pw"}, headers={"X-Request-ID": "req-1"})
+    assert r.status_code == 201
+    assert executed_statements
+    assert all(s.endswith("/* request_id='req-1' */") for s in executed_statements)
+
+
+def test_request_id_comments_can_be_disabled(client, executed_statements, env):
+    env(SQL_REQUEST_ID_COMMENTS="false")
+    client.post("/auth/signup", json={"username": "alice", "password": "pw"}, headers={"X-Request-ID": "req-2"})
+    assert executed_statements
+    assert not any("request_id" in s for s in executed_statements)
+
+
+def test_slow_queries_are_logged_as_redacted_json(client, env, caplog):
+    env(SLOW_QUERY_MS="0.000001")
+    with caplog.at_level(logging.WARNING, logger="compass.sql"):
+        r = client.post("/auth/signup", json={"username": "alice", "password": "pw"})
+    request_id = r.headers["X-Request-ID"]
+
+    entries = [json.loads(record.getMessage()) for record in caplog.records if record.name == "compass.sql"]
+    insert = next(e for e in entries if e["statement"].startswith("INSERT INTO users"))
+    assert insert["event"] == "slow_query"
+    assert insert["request_id"] == request_id
+    assert insert["duration_ms"] >= 0
+    assert insert["params"]["username"] == "alice"
+    assert insert["params"]["password_hash"] == "<redacted>"
+
+
+def test_slow_query_log_disabled(client, env, caplog):
+    env(SLOW_QUERY_MS="0")
+    with caplog.at_level(logging.WARNING, logger="compass.sql"):
+        client.post("/auth/signup", json={"username": "alice", "password": "pw"})
+    assert not [record for record in caplog.records if record.name == "compass.sql"]
+
+
+def test_redact_params_shapes():
+    assert redact_params({"lat": 43.7, "fob_uid": "F1", "blob": "x" * 100}) == {
+        "lat": "<redacted>",
+        "fob_uid": "F1",
+        "blob": "x" * 64 + "...",
+    }
+    assert redact_params([{"token": "t"}, {"token": "u"}]) == {"rows": 2, "first": {"token": "<redacted>"}}
+    assert redact_params((1, "a")) == [1, "a"]
@@ -0,0 +1,98 @@
+import pytest
+from sqlalchemy import text
+
+from app.db import session_scope
+from app.metrics import sos_alerts
+from conftest import offset, signup
+
+
+TOWER_KEY = "test-tower-key"
+
+
+@pytest.fixture(autouse=True)
+def no_movement_filter(env):
+    # Friends' fobs move kilometres between pings sent milliseconds apart.
+    env(MOVEMENT_MAX_SPEED_MPS="0")
+
+
+def ping(client, fob_uid: str, point: tuple[float, float], status: int = 0) -> None:
+    r = client.post(
+        "/tower/pings",
+        json={"fob_uid": fob_uid, "lat": point[0], "lng": point[1], "status": status},
+        headers={"X-Tower-Key": TOWER_KEY},
+    )
+    assert r.status_code == 201, r.text
+
+
+def friend_with_fob(client, owner: dict[str, str], username: str, *points: tuple[float, float]) -> dict[str, str]:
+    headers = signup(client, username)
+    assert client.post("/friends/add", json={"username": "alice"}, headers=headers).status_code == 200
+    if points:
+        assert client.post("/fob/claim", json={"fob_uid": f"FOB_{username}"}, headers=headers).status_code == 201
+        for point in points:
+            ping(client, f"FOB_{username}", point)
+    return headers
+
+
+def alerts(client, headers) -> list[tuple[str, int]]:
+    r = client.get("/alerts/sos", headers=headers)
+    assert r.status_code == 200
+    return [(a["username"], a["priority"]) for a in r.json()["alerts"]]
+
+
+def test_sos_alerts_nearby_sharing_friends_by_distance(client, env):
+    env(TOWER_SHARED_KEY=TOWER_KEY)
+    alice = signup(client, "alice")
+    assert client.post("/fob/claim", json={"fob_uid": "FOB_alice"}, headers=alice).status_code == 201
+
+    bob = friend_with_fob(client, alice, "bob", offset(5000), offset(400))  # latest position is near
+    heidi = friend_with_fob(client, alice, "heidi", offset(0, 50))
+    gina = friend_with_fob(client, alice, "gina", offset(100), offset(3000))  # moved away
+    erin = friend_with_fob(client, alice, "erin", offset(100))
+    dave = friend_with_fob(client, alice, "dave", offset(100))
+    frank = friend_with_fob(client, alice, "frank")  # no fob
+    with session_scope() as db:
+        db.execute(text("UPDATE pings SET received_at = now() - interval '1 hour' WHERE fob_uid = 'FOB_erin'"))
+    client.patch("/friends/share-location", json={"username": "dave", "enabled": False}, headers=alice)
+
+    before = sos_alerts.value()
+    ping(client, "FOB_alice", offset(0), status=1)
+    assert sos_alerts.value() == before
+    ping(client, "FOB_alice", offset(0), status=2)
+
+    assert alerts(client, heidi) == [("alice", 1)]
+    assert alerts(client, bob) == [("alice", 2)]
+    for headers in (gina, erin, dave, frank, alice):
+        assert alerts(client, headers) == []
+    assert sos_alerts.value() == before + 2
+    body = client.get("/alerts/sos", headers=bob).json()["alerts"][0]
+    assert body["distance_m"] == round(body["distance_m"], 1) and abs(body["distance_m"] - 400) < 1
+
+    # Repeated SOS pings don't re-alert within the cooldown, but newly near friends are alerted.
+    ping(client, "FOB_gina", offset(10))
+    ping(client, "FOB_alice", offset(0), status=2)
+    assert alerts(client, heidi) == [("alice", 1)]
+    assert alerts(client, gina) == [("alice", 1)]
+
+
+def test_sos_fan_out_disabled(client, env):
+    env(TOWER_SHARED_KEY=TOWER_KEY, SOS_ALERT_RADIUS_M="0")
+    alice = signup(client, "alice")
+    assert client.post("/fob/claim", json={"fob_uid": "FOB_alice"}, headers=alice).status_code == 201
+    bob = friend_with_fob(client, alice, "bob", offset(10))
+    ping(client, "FOB_alice", offset(0), status=2)
+    assert alerts(client, bob) == []
+
+
+def test_fan_out_failure_still_stores_the_ping_once(client, monkeypatch, env):
+    env(TOWER_SHARED_KEY=TOWER_KEY)
+    alice = signup(client, "alice")
+    assert client.post("/fob/claim", json={"fob_uid": "FOB_alice"}, headers=alice).status_code == 201
+
+    def broken_fan_out(*args):
+        raise RuntimeError("fan-out failed")
+
+    monkeypatch.setattr("app.routes.tower_ingest.fan_out_sos", broken_fan_out)
+    ping(client, "FOB_alice", offset(0), status=2)  # 201, so the tower doesn't resend it
+    with session_scope() as db:
+        assert db.scalar(text("SELECT count(*) FROM pings WHERE fob_uid = 'FOB_alice' AND status = 2")) == 1
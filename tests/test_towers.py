@@ -0,0 +1,121 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from api.index import app
+from app.db import session_scope
+from app.metrics import tower_auth_failures, tower_ingest_duration, tower_pings
+from app.models import Ping, Tower
+from app.towers import create_tower, hash_key, notify_keys_changed, rotate_key, set_active, tower_keys
+
+
+PING = {"fob_uid": "FOB_T", "lat": 43.66, "lng": -79.39}
+
+
+@pytest.fixture(autouse=True)
+def clear_tower_keys():
+    tower_keys.clear()
+    yield
+    tower_keys.clear()
+
+
+def add_tower(tower_id: str) -> str:
+    with session_scope() as db:
+        return create_tower(db, tower_id, f"Tower {tower_id}", 43.66, -79.39)
+
+
+def send(client, tower_id: str | None, key: str):
+    headers = {"X-Tower-Key": key}
+    if tower_id is not None:
+        headers["X-Tower-Id"] = tower_id
+    return client.post("/tower/pings", json=PING, headers=headers)
+
+
+def test_per_tower_key_records_tower_and_metrics(client, query_budget):
+    key = add_tower("test-north")
+    with session_scope() as db:
+        assert db.get(Tower, "test-north").key_hash == hash_key(key) != key
+    before = tower_pings.value("test-north"), tower_ingest_duration.count("test-north")
+
+    assert send(client, "test-north", key).status_code == 201
+    # Verified from memory: the same statements as a shared-key ping.
+    loads = tower_keys.loads
+    with query_budget(2):
+        assert send(client, "test-north", key).status_code == 201
+    assert tower_keys.loads == loads
+
+    with session_scope() as db:
+        assert db.scalars(select(Ping.tower_id)).all() == ["test-north", "test-north"]
+    assert tower_pings.value("test-north") == before[0] + 2
+    assert tower_ingest_duration.count("test-north") == before[1] + 2
+    assert 'compass_tower_pings_total{tower="test-north"}' in client.get("/metrics").text
+
+
+def test_bad_keys_are_rejected(client, env):
+    env(TOWER_SHARED_KEY="shared-key")
+    key = add_tower("test-east")
+    before = tower_auth_failures.value("test-east"), tower_auth_failures.value("unknown")
+
+    for tower_id, presented in (("test-east", "wrong"), ("test-east", ""), ("test-nope", key), ("", key)):
+        r = send(client, tower_id, presented)
+        assert r.status_code == 401 and r.json()["detail"]["error"]["code"] == "TOWER_UNAUTHORIZED"
+    # A tower id means the tower's own key is required, even if the shared key is sent.
+    assert send(client, "test-east", "shared-key").status_code == 401
+    assert tower_auth_failures.value("test-east") == before[0] + 3
+    assert tower_auth_failures.value("unknown") == before[1] + 2
+
+    assert send(client, None, "shared-key").status_code == 201
+    with session_scope() as db:
+        assert db.scalar(select(Ping.tower_id)) is None
+    env(TOWER_SHARED_KEY="")
+    assert send(client, None, "").status_code == 401
+    assert send(client, "test-east", key).status_code == 201
+
+
+def test_rotation_and_revocation_reach_the_cache(client, env):
+    key = add_tower("test-west")
+    assert send(client, "test-west", key).status_code == 201
+
+    with session_scope() as db:
+        new = rotate_key(db, "test-west")
+        assert rotate_key(db, "test-missing") is None
+    # Cached until the cache expires...
+    assert send(client, "test-west", key).status_code == 201
+    env(TOWER_KEY_CACHE_SECONDS="0")
+    assert send(client, "test-west", key).status_code == 401
+    assert send(client, "test-west", new).status_code == 201
+
+    with session_scope() as db:
+        assert set_active(db, "test-west", False)
+    assert send(client, "test-west", new).status_code == 401
+
+
+def wait_for_notifications(listener, count: int) -> None:
+    deadline = time.monotonic() + 5
+    while listener.notifications < count:
+        assert time.monotonic() < deadline, "no tower key notification"
+        time.sleep(0.01)
+
+
+def test_listener_applies_revocation_at_once(env):
+    env(TOWER_KEY_LISTEN="true")
+    key = add_tower("test-south")
+    with TestClient(app) as client:
+        listener = app.state.tower_key_listener
+        # Notify until the listener is connected and hears one.
+        deadline = time.monotonic() + 5
+        while listener.notifications == 0:
+            assert time.monotonic() < deadline, "tower key listener never connected"
+            with session_scope() as db:
+                notify_keys_changed(db)
+            time.sleep(0.05)
+        assert send(client, "test-south", key).status_code == 201
+
+        seen = listener.notifications
+        with session_scope() as db:
+            assert set_active(db, "test-south", False)
+        wait_for_notifications(listener, seen + 1)
+        # Well within TOWER_KEY_CACHE_SECONDS.
+        assert send(client, "test-south", key).status_code == 401
@@ -0,0 +1,188 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from api.index import app
+from app import walks
+from app.db import session_scope
+from app.metrics import walk_alerts
+from app.walks import CHECKIN, OVERDUE, WalkScheduler, WalkTimers, load_active_walks, run_due, walk_timers
+from conftest import signup
+
+
+def start_walk(client, headers, **body) -> dict:
+    r = client.post("/walks", json={"dest_lat": 43.66, "dest_lng": -79.39, "eta_minutes": 30, **body}, headers=headers)
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def current(client, headers) -> dict | None:
+    r = client.get("/walks/current", headers=headers)
+    assert r.status_code == 200
+    return r.json()["walk"]
+
+
+@pytest.fixture(autouse=True)
+def clear_timers():
+    walk_timers.clear()
+    yield
+    walk_timers.clear()
+
+
+def test_walk_timers_order_reschedule_and_cancel():
+    timers = WalkTimers()
+    timers.schedule("a", OVERDUE, 30)
+    timers.schedule("b", OVERDUE, 10)
+    timers.schedule("c", CHECKIN, 20)
+    timers.schedule("b", OVERDUE, 40)  # moved later
+    timers.cancel("c")
+    assert len(timers) == 2 and timers.next_due() == 30
+    assert timers.pop_due(35) == [("a", OVERDUE, 30)]
+    assert timers.pop_due(35) == []
+    assert timers.pop_due(100) == [("b", OVERDUE, 40)]
+    assert timers.next_due() is None
+
+    for i in range(5000):  # stale entries get compacted away
+        timers.schedule("a", CHECKIN, i)
+    assert len(timers._heap) <= 2 * len(timers) + 1024
+    assert timers.pop_due(10_000) == [("a", CHECKIN, 4999)]
+
+
+def test_start_and_validate_walk(client):
+    alice = signup(client, "alice")
+    assert current(client, alice) is None
+    r = client.post("/walks", json={"dest_lat": 43.66, "dest_lng": -79.39, "eta_minutes": 0}, headers=alice)
+    assert r.status_code == 400 and r.json()["detail"]["error"]["code"] == "INVALID_WALK"
+
+    walk = start_walk(client, alice, destination=" Home ", checkin_interval_minutes=5)
+    assert walk["status"] == "active" and walk["destination"] == "Home"
+    assert walk["checkin_interval_seconds"] == 300 and walk["checkin_due_at"] is not None
+    assert current(client, alice)["id"] == walk["id"]
+    assert len(walk_timers) == 2
+
+    r = client.post("/walks", json={"dest_lat": 43.66, "dest_lng": -79.39, "eta_minutes": 10}, headers=alice)
+    assert r.status_code == 409 and r.json()["detail"]["error"]["code"] == "WALK_ACTIVE"
+
+
+def test_overdue_walk_is_flagged_once_and_visible_to_friends(client):
+    alice, bob = signup(client, "alice"), signup(client, "bob")
+    assert client.post("/friends/add", json={"username": "bob"}, headers=alice).status_code == 200
+    walk = start_walk(client, alice)
+    before = walk_alerts.value(OVERDUE)
+
+    assert run_due(time.time() + 29 * 60) == 0
+    assert run_due(time.time() + 31 * 60) == 1
+    assert current(client, alice)["status"] == "overdue"
+    client.__exit__(None, None, None)
+    assert walk_alerts.value(OVERDUE) == before + 1
+    assert run_due(time.time() + 60 * 60) == 0
+
+    friends = client.get("/walks/friends", headers=bob).json()["walks"]
+    assert [(w["id"], w["username"], w["status"]) for w in friends] == [(walk["id"], "alice", "overdue")]
+    client.patch("/friends/share-location", json={"username": "bob", "enabled": False}, headers=alice)
+    assert client.get("/walks/friends", headers=bob).json()["walks"] == []
+
+
+def test_missed_checkins_counted_and_reset_by_checkin(client):
+    alice = signup(client, "alice")
+    walk = start_walk(client, alice, eta_minutes=60, checkin_interval_minutes=5)
+    before = walk_alerts.value(CHECKIN)
+
+    # Three intervals have passed by +16 minutes; they're counted in one step.
+    run_due(time.time() + 16 * 60)
+    walk = current(client, alice)
+    assert walk["missed_checkins"] == 3 and walk["status"] == "active"
+    assert walk_alerts.value(CHECKIN) == before + 3
+
+    r = client.post(f"/walks/{walk['id']}/checkin", headers=alice)
+    assert r.status_code == 200 and r.json()["last_checkin_at"] is not None
+    assert run_due(time.time() + 4 * 60) == 0
+    run_due(time.time() + 6 * 60)
+    assert current(client, alice)["missed_checkins"] == 4
+
+
+def test_checkin_through_another_process_moves_the_deadline(client):
+    alice = signup(client, "alice")
+    walk = start_walk(client, alice, eta_minutes=60, checkin_interval_minutes=5)
+    with session_scope() as db:
+        db.execute(
+            text("UPDATE walks SET checkin_due_at = now() + interval '10 minutes' WHERE id = :id"), {"id": walk["id"]}
+        )
+    run_due(time.time() + 6 * 60)
+    assert current(client, alice)["missed_checkins"] == 0
+    assert 9 * 60 < walk_timers.next_due() - time.time() <= 10 * 60
+
+
+def test_ended_walk_fires_nothing(client):
+    alice = signup(client, "alice")
+    walk = start_walk(client, alice, checkin_interval_minutes=5)
+    r = client.post(f"/walks/{walk['id']}/end", json={"arrived": False}, headers=alice)
+    assert r.status_code == 200 and r.json()["status"] == "ended" and r.json()["end_reason"] == "cancelled"
+    assert len(walk_timers) == 0
+    assert current(client, alice) is None
+    assert client.post(f"/walks/{walk['id']}/end", headers=alice).status_code == 404
+    assert client.post(f"/walks/{walk['id']}/checkin", headers=alice).status_code == 404
+    assert client.post("/walks/not-a-uuid/end", headers=alice).json()["detail"]["error"]["code"] == "WALK_NOT_FOUND"
+
+    walk = start_walk(client, alice)  # a new walk can start once the last one ended
+    r = client.post(f"/walks/{walk['id']}/end", headers=alice)
+    assert r.json()["end_reason"] == "arrived"
+
+
+def test_active_walks_reload_after_restart(client):
+    alice, bob = signup(client, "alice"), signup(client, "bob")
+    start_walk(client, alice)
+    start_walk(client, bob, eta_minutes=90)
+    walk_timers.clear()  # what a fresh process starts with
+
+    assert load_active_walks() == 2
+    assert run_due(time.time() + 31 * 60) == 1
+    assert current(client, alice)["status"] == "overdue"
+    client.__exit__(None, None, None)
+    assert current(client, bob)["status"] == "active"
+
+
+def test_scheduler_flags_overdue_walk_in_process(env):
+    env(WALK_TIMER_TICK_SECONDS="0.05")
+    with TestClient(app) as client:
+        alice = signup(client, "alice")
+        start_walk(client, alice, eta_minutes=0.01)
+        deadline = time.time() + 5
+        while current(client, alice)["status"] != "overdue" and time.time() < deadline:
+            time.sleep(0.05)
+        assert current(client, alice)["status"] == "overdue"
+    client.__exit__(None, None, None)
+
+
+def test_scheduler_retries_loading_active_walks(env, monkeypatch):
+    env(WALK_TIMER_TICK_SECONDS="0")  # only the scheduler below runs
+    attempts = []
+
+    def flaky_load():
+        attempts.append(None)
+        if len(attempts) == 1:
+            raise RuntimeError("database unavailable")
+        return load_active_walks()
+
+    async def run() -> WalkScheduler:
+        scheduler = WalkScheduler(0.05)
+        scheduler.start()
+        deadline = time.time() + 5
+        while not scheduler.fired and time.time() < deadline:
+            await asyncio.sleep(0.05)
+        await scheduler.stop()
+        return scheduler
+
+    with TestClient(app) as client:
+        alice = signup(client, "alice")
+        start_walk(client, alice, eta_minutes=0.01)
+        walk_timers.clear()  # a fresh process whose first load fails
+        monkeypatch.setattr(walks, "load_active_walks", flaky_load)
+
+        scheduler = asyncio.run(run())
+        assert len(attempts) == 2
+        assert (scheduler.failures, scheduler.fired) == (1, 1)
+        assert current(client, alice)["status"] == "overdue"